@@ -2,7 +2,9 @@
 # Pulls directly from the On3 API
 import requests
 import json
+import os
 from datetime import datetime
+from profiling import profiled, enable_profiling_from_cli
 
 url = "https://api.on3.com/public/rdb/v1/coaches/salaries"
 params = {
@@ -13,6 +15,7 @@ params = {
     "page": "1" # Initial page number doesn't matter, as the code will run through all available pages
 }
 
+@profiled
 def pull_coach_slugs(url, params, output_file_name):
     """
     Uses the On3 API to pull the 'slug' for each coach, allowing for fast lookup of each coach's
@@ -87,21 +90,15 @@ def pull_coach_slugs(url, params, output_file_name):
 
 # Step 2: use the slugs to parse each coach's full coaching history from the On3 page using BeautifulSoup
 
-from bs4 import BeautifulSoup
-import re
-
+@profiled
 def generate_coaching_database_json(input_file_name, json_output_name):
     """
     Converts the slugs in the previously generated JSON file into a raw master database of coaching positions, in JSON format.
     Returns a JSON file saving each coaches position as a JSON object containing:
     { Name, Team, Position, Start Year, End Year, Seasons with Team }, however this data is raw and contains duplicates.
 
-    Each coach's full coaching history is parsed using BeautifulSoup on the Coaching History table from each coach's On3 page.
+    Each coach's full coaching history is parsed by :func:`scrape_coach_history`.
     Each position a coach has served in is saved seperately, meaning most coaches have multiple JSON objects for each of their stops on their career.
-
-    Of note: Coaches whose tenure is listed as 'XXXX - present' are given an end date of the current year.
-
-    This means a new coach with a tenure of '2024 - present' is interpreted as '2024 - 2025'.
     """
     with open(f'data/{input_file_name}.json', 'r') as f:
         json_data = json.load(f)
@@ -110,41 +107,7 @@ def generate_coaching_database_json(input_file_name, json_output_name):
 
     for year in json_data:
         for coach in json_data[year]:
-            coach_on3_url = f'https://www.on3.com/db/coach/{coach['Slug']}/'
-
-            page = requests.get(coach_on3_url)
-            contents = page.content
-
-            soup = BeautifulSoup(contents, features="html.parser")
-            all_jobs = soup.find_all('div', class_ = 'CoachHistory_historyListWrapper__i5n8y')
-            #print(f"{coach}'s Coaching History:"")
-            for job in all_jobs:
-                team = job.find('h5', class_ = 'MuiTypography-root MuiTypography-h5 CoachHistory_teamName__2E139 css-6od08f-MuiTypography-root').text
-                position = job.find('span', class_ = 'MuiTypography-root MuiTypography-caption CoachHistory_position__QN_5S css-d163s0-MuiTypography-root').text
-                years_raw = job.find('span', class_ = 'MuiTypography-root MuiTypography-caption CoachHistory_year__yMj7Z css-d163s0-MuiTypography-root')
-                regex_result = re.search(r"(\d+) - (\d+|\w+)", years_raw.get_text()) 
-                start_year = int(regex_result.group(1))
-                end_year = regex_result.group(2)
-                currently_employed = False
-                if end_year == 'present':
-                    end_year = datetime.now().year
-                else: 
-                    end_year = int(end_year)
-                
-                if currently_employed == True: # Does not include upcoming season
-                    seasons_at_position = list(range(start_year, end_year))
-                else:
-                    seasons_at_position = list(range(start_year, end_year + 1))
-                #print(f"{team}, {position}, from {start_year} to {end_year}")
-                # Print debugger to check if the parsing is accurate
-                job_json = {
-                    'Name': coach['Name'],
-                    'Team': team,
-                    'Position': position,
-                    'Starting Season': start_year,
-                    'Seasons at Position': seasons_at_position
-                }
-                coaching_megalist.append(job_json)
+            coaching_megalist.extend(scrape_coach_history(coach))
         print(f"finished parsing year {year}")
 
 
@@ -152,8 +115,67 @@ def generate_coaching_database_json(input_file_name, json_output_name):
         json.dump(coaching_megalist, raw_data_file, indent=4)
 
 
+def scrape_coach_history(coach, session=requests):
+    """
+    Parses a coach's full coaching history using BeautifulSoup on the Coaching History table of their On3 page.
+
+    Args:
+        coach (dict): {Name, Slug} of the coach, see :func:`pull_coach_slugs`
+        session (requests.Session, optional): Session to reuse connections across coaches
+
+    Returns:
+        list: One job JSON object per position: { Name, Slug, Team, Position, Starting Season, Seasons at Position }
+
+    Of note: Coaches whose tenure is listed as 'XXXX - present' are given an end date of the current year.
+
+    This means a new coach with a tenure of '2024 - present' is interpreted as '2024 - 2025'.
+    """
+    import re
+    from bs4 import BeautifulSoup
+
+    coach_on3_url = f'https://www.on3.com/db/coach/{coach['Slug']}/'
+
+    page = session.get(coach_on3_url)
+    contents = page.content
+
+    soup = BeautifulSoup(contents, features="html.parser")
+    all_jobs = soup.find_all('div', class_ = 'CoachHistory_historyListWrapper__i5n8y')
+    jobs = []
+    #print(f"{coach}'s Coaching History:"")
+    for job in all_jobs:
+        team = job.find('h5', class_ = 'MuiTypography-root MuiTypography-h5 CoachHistory_teamName__2E139 css-6od08f-MuiTypography-root').text
+        position = job.find('span', class_ = 'MuiTypography-root MuiTypography-caption CoachHistory_position__QN_5S css-d163s0-MuiTypography-root').text
+        years_raw = job.find('span', class_ = 'MuiTypography-root MuiTypography-caption CoachHistory_year__yMj7Z css-d163s0-MuiTypography-root')
+        regex_result = re.search(r"(\d+) - (\d+|\w+)", years_raw.get_text()) 
+        start_year = int(regex_result.group(1))
+        end_year = regex_result.group(2)
+        currently_employed = False
+        if end_year == 'present':
+            end_year = datetime.now().year
+        else: 
+            end_year = int(end_year)
+        
+        if currently_employed == True: # Does not include upcoming season
+            seasons_at_position = list(range(start_year, end_year))
+        else:
+            seasons_at_position = list(range(start_year, end_year + 1))
+        #print(f"{team}, {position}, from {start_year} to {end_year}")
+        # Print debugger to check if the parsing is accurate
+        job_json = {
+            'Name': coach['Name'],
+            'Slug': coach['Slug'], # Identifies the coach's page, for entity_resolution.py
+            'Team': team,
+            'Position': position,
+            'Starting Season': start_year,
+            'Seasons at Position': seasons_at_position
+        }
+        jobs.append(job_json)
+    return jobs
+
+
 # Step 3: clean the JSON file by comparing JSON objects and recreating a clean list
 
+@profiled
 def clean_duplicates_json(json_file_input, cleaned_file_name):
     """
     Cleans a the JSON file of coaching positions by creating a new list of JSON objects without duplicates and then writing a new file. 
@@ -171,44 +193,189 @@ def clean_duplicates_json(json_file_input, cleaned_file_name):
     with open(f'data/{cleaned_file_name}.json', 'w') as cleaned_data_file:
         json.dump(cleaned_list, cleaned_data_file, indent=4)
 
-import pandas as pd
-
+@profiled
 def cleaned_json_to_csv(cleaned_json_file, csv_file_name):  
     """
     Converts the cleaned master file of coaching jobs into a CSV file for easier visualization and human referencing.
     Reorders values into: Season the job took place (based on the year the season started), Team, Coach Name, and Coaching Position 
     """
+    import pandas as pd
+
     df = pd.read_json(f'data/{cleaned_json_file}.json')
-    coaching_database_reordered = df.loc[:, ['Starting Season', 'Team', 'Name', 'Position', 'Seasons at Position']]
+    columns = ['Starting Season', 'Team', 'Name', 'Position', 'Seasons at Position']
+    if 'Coach ID' in df.columns: # Added by entity_resolution.py
+        columns.append('Coach ID')
+    coaching_database_reordered = df.loc[:, columns]
 
 
 
     coaching_database = coaching_database_reordered.sort_values(by=['Starting Season', 'Team'], ascending=False)
     coaching_database.to_csv(f'data/{csv_file_name}.csv', index = False)
 
-# Function Calls
+# Delta refresh: re-scrape only the coaches whose current-season listing is new or changed
 
-url = "https://api.on3.com/public/rdb/v1/coaches/salaries"
-params = {
-    "sportKey": "1", 
-    "year": "2025",
-    "orderBy": "school",
-    "direction": "ASC",
-    "page": "1" # Initial page number doesn't matter, as the code will run through all available pages
-}
+SLUG_REGISTRY = 'data/coach_slug_registry.json'
+
+# Listing fields that change without the coach changing jobs (the list is a salary list)
+VOLATILE_LISTING_KEYS = ('salary', 'pay', 'bonus', 'buyout', 'rank', 'updated', 'created', 'date')
+
+
+def iter_salary_list(url, params, year, session=requests):
+    """
+    Yields every complete coach entry (with 'fullName' and 'slug') of one year of the On3 salary list, page by page.
+    """
+    params = dict(params, year=year, page=1)
+    response = session.get(url, params=params)
+    if response.status_code != 200:
+        print(f"Request failed on year {year}")
+        return
+    page_count = response.json()['pagination']['pageCount']
+
+    for page in range(1, page_count + 1):
+        params['page'] = page
+        response = session.get(url, params=params)
+        if response.status_code != 200:
+            print(f"Request failed on page {page} of year {year}")
+            continue
+        for coach in response.json()['list']:
+            if coach.get('fullName') is None or coach.get('slug') is None:
+                print(f"Error reading coach {coach.get('fullName')} for year {year}") # Track data that must be manually checked
+                continue
+            yield coach
+
+
+def listing_fingerprint(coach_listing):
+    """Hash of a coach's salary list entry without its volatile fields, so it only changes with the coach's job"""
+    import hashlib
+
+    stable_fields = {key: value for key, value in coach_listing.items()
+                     if not any(volatile in key.lower() for volatile in VOLATILE_LISTING_KEYS)}
+    return hashlib.sha256(json.dumps(stable_fields, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def merge_coach_histories(jobs, histories):
+    """
+    Replaces the jobs of re-scraped coaches in a cleaned list of jobs.
 
-pull_coach_slugs(url, params, 'coach_slugs')
-print("Generated slugs for each found coach, now parsing their coaching histories. This may take upwards of 10 minutes.")
+    Args:
+        jobs (list): Cleaned jobs, see :func:`clean_duplicates_json`
+        histories (list): ({Name, Slug}, freshly scraped jobs) per re-scraped coach
 
-generate_coaching_database_json('coach_slugs', 'coach_jobs_raw')
-print("Parsing complete, now cleaning the parsed data.")
+    Returns:
+        list: The jobs without duplicates, each re-scraped coach's previous jobs replaced by their new history. Jobs
+        scraped before 'Slug' was recorded are matched by name, to the profile (see
+        :func:`entity_resolution.split_profiles`) sharing the most team-seasons with the new history, so a coach with
+        the same name as the re-scraped one keeps their jobs
+    """
+    from entity_resolution import split_profiles, team_seasons
+
+    profiles = split_profiles(jobs)
+    for coach, new_jobs in histories:
+        slug_profiles = [idx for idx, profile in enumerate(profiles) if profile and profile[0].get('Slug') == coach['Slug']]
+        if not slug_profiles:
+            new_seasons = team_seasons(new_jobs)
+            shared = []
+            for idx, profile in enumerate(profiles):
+                if profile and not profile[0].get('Slug') and profile[0]['Name'] == coach['Name']:
+                    old_seasons = team_seasons(profile)
+                    overlap = sum(len(old_seasons[season] & new_seasons[season]) for season in old_seasons.keys() & new_seasons.keys())
+                    shared.append((overlap, idx))
+            best_overlap, best_idx = max(shared, default=(0, None))
+            slug_profiles = [best_idx] if best_overlap > 0 else []
+        for idx in slug_profiles:
+            profiles[idx] = []
+        profiles.append(new_jobs)
+
+    merged = []
+    seen = set()
+    for profile in profiles:
+        for job in profile:
+            job_key = json.dumps(job, sort_keys=True)
+            if job_key not in seen:
+                seen.add(job_key)
+                merged.append(job)
+    return merged
+
+
+@profiled
+def delta_refresh(url, params, cleaned_file_name='coach_jobs_clean', registry_path=SLUG_REGISTRY):
+    """
+    Refreshes the cleaned dataset from the current season only, instead of re-crawling every year and every history.
+
+    Pulls the current season of the salary list and compares each coach to the slug registry, which records the
+    fingerprint (see :func:`listing_fingerprint`) of every coach's listing at the last refresh. Only new coaches and
+    coaches whose listing changed (ex: a new team or position) have their history re-scraped, and the histories are
+    merged into 'data/{cleaned_file_name}.json' with :func:`merge_coach_histories`.
+
+    Without a registry, coaches of the listing already in the cleaned dataset (by slug, else by name) are recorded as
+    they are and not re-scraped, so the first delta refresh after a full crawl only fetches coaches it is missing.
+
+    Returns:
+        dict: Number of coaches listed, new and changed, and of jobs in the refreshed dataset
+    """
+    year = datetime.now().year
+    session = requests.Session()
+
+    registry = None
+    if os.path.exists(registry_path):
+        with open(registry_path, 'r') as registry_file:
+            registry = json.load(registry_file)
+    with open(f'data/{cleaned_file_name}.json', 'r') as cleaned_data_file:
+        jobs = json.load(cleaned_data_file)
+    known_slugs = {job['Slug'] for job in jobs if job.get('Slug')}
+    known_names = {job['Name'] for job in jobs}
+
+    listed = {coach['slug']: coach for coach in iter_salary_list(url, params, year, session)}
+    new_coaches, changed_coaches = [], []
+    for slug, listing in listed.items():
+        fingerprint = listing_fingerprint(listing)
+        registered = (registry or {}).get(slug)
+        if registered is None and registry is None and (slug in known_slugs or listing['fullName'] in known_names):
+            pass # Baseline: already scraped by the full crawl
+        elif registered is None:
+            new_coaches.append(slug)
+        elif registered['Fingerprint'] != fingerprint:
+            changed_coaches.append(slug)
+
+    histories = []
+    for slug in new_coaches + changed_coaches:
+        coach = {'Name': listed[slug]['fullName'], 'Slug': slug}
+        histories.append((coach, scrape_coach_history(coach, session)))
+    jobs = merge_coach_histories(jobs, histories)
+
+    with open(f'data/{cleaned_file_name}.json', 'w') as cleaned_data_file:
+        json.dump(jobs, cleaned_data_file, indent=4)
+
+    registry = registry or {}
+    for slug, listing in listed.items():
+        registry[slug] = {'Name': listing['fullName'], 'Fingerprint': listing_fingerprint(listing), 'Last Seen': year}
+    with open(registry_path, 'w') as registry_file:
+        json.dump(registry, registry_file, indent=4, sort_keys=True)
+
+    return {'listed': len(listed), 'new': len(new_coaches), 'changed': len(changed_coaches), 'jobs': len(jobs)}
+
+# Function Calls
 
-clean_duplicates_json('coach_jobs_raw', 'coach_jobs_clean')
-print("Cleaning complete, now sorting and generating a CSV file for easy reading.")
+if __name__ == '__main__':
+    import sys
+    from entity_resolution import resolve_coach_entities_json
 
-cleaned_json_to_csv('coach_jobs_clean', 'clean_sorted_coach_jobs')
+    enable_profiling_from_cli() # Run with '--profile' to profile each stage, see profiling.py
 
+    if '--delta' in sys.argv: # Weekly refresh: only re-scrape new coaches and coaches whose job changed
+        summary = delta_refresh(url, params, 'coach_jobs_clean')
+        print(f"Listed {summary['listed']} coaches this season, re-scraped {summary['new']} new and {summary['changed']} changed coaches.")
+    else:
+        pull_coach_slugs(url, params, 'coach_slugs')
+        print("Generated slugs for each found coach, now parsing their coaching histories. This may take upwards of 10 minutes.")
 
+        generate_coaching_database_json('coach_slugs', 'coach_jobs_raw')
+        print("Parsing complete, now cleaning the parsed data.")
 
+        clean_duplicates_json('coach_jobs_raw', 'coach_jobs_clean')
+    print("Cleaning complete, now resolving coach names into stable coach IDs.")
 
+    resolve_coach_entities_json('coach_jobs_clean', 'coach_jobs_resolved')
+    print("Resolution complete, now sorting and generating a CSV file for easy reading.")
 
+    cleaned_json_to_csv('coach_jobs_resolved', 'clean_sorted_coach_jobs')
@@ -1,8 +1,7 @@
-import networkx as nx
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import plotly.graph_objects as go
+# networkx and plotly are imported where they are used, so importing the position helpers stays cheap
+from profiling import profiled, enable_profiling_from_cli
 
 
 level1_coach = ['Head Coach']
@@ -54,12 +53,45 @@ def position_encoding(reference_df):
 
     reference_df["Encoded Position"] = reference_df["Position"].apply(encode_position)
 
-def create_nx_graph(coach_jobs_df):    
+def parse_seasons(val):
+    """
+    Parses the input value representing seasons into a list of integers.
+
+    Args:
+        val (Any): The value to parse. Can be NaN, a list, or a string representation of a list or comma-separated integers.
+
+    Returns:
+        list: A list of integers representing seasons. Returns an empty list if input is NaN or cannot be parsed.
+
+    Behavior:
+        - If val is NaN, returns an empty list.
+        - If val is already a list, returns it as is.
+        - If val is a string, attempts to parse it as a Python literal (e.g., '[1, 2, 3]').
+          If parsing fails, splits the string by commas and returns a list of integers found.
+        - For any other type, returns an empty list.
+    """
+
+    import ast
+    if pd.isna(val):
+        return []
+    if isinstance(val, list):
+        return val
+    if isinstance(val, str):
+        try:
+            return ast.literal_eval(val)
+        except Exception:
+            return [int(x) for x in val.split(',') if x.strip().isdigit()]
+    return []
+
+@profiled
+def create_nx_graph(coach_jobs_df, progress_callback=None):    
     """
     Creates a NetworkX graph of coaching connections, adds relevant data to edges (see below).
 
     Args:
         coach_jobs_df (pd.DataFrame): A pandas DataFrame generated from On3_coaching_parsing and updated with the function 'position_encoding'.
+        progress_callback (callable, optional): Called as progress_callback(teams_processed, total_teams) after each team
+            grouping is processed, used to report progress of long graph builds (ex: background Dash callbacks).
 
     Returns:
         coaching_graph (nx.MultiDiGraph): A directed NetworkX graph that allows for parallel edges (ex: coaches who work together at different schools). \n
@@ -80,42 +112,14 @@ def create_nx_graph(coach_jobs_df):
         - When a match is found, it is checked against a duplicate tracker
         - If it is not a duplicate, the above information is added to a dictionary, which is then added as edge attributes to the nx graph
     """
+    import networkx as nx
+
     coaching_graph = nx.MultiDiGraph()
 
     position_encoding(coach_jobs_df)
 
     grouped_coaches = coach_jobs_df.groupby(by=["Team"])
 
-    def parse_seasons(val):
-        """
-        Parses the input value representing seasons into a list of integers.
-
-        Args:
-            val (Any): The value to parse. Can be NaN, a list, or a string representation of a list or comma-separated integers.
-
-        Returns:
-            list: A list of integers representing seasons. Returns an empty list if input is NaN or cannot be parsed.
-
-        Behavior:
-            - If val is NaN, returns an empty list.
-            - If val is already a list, returns it as is.
-            - If val is a string, attempts to parse it as a Python literal (e.g., '[1, 2, 3]').
-              If parsing fails, splits the string by commas and returns a list of integers found.
-            - For any other type, returns an empty list.
-        """
-
-        import ast
-        if pd.isna(val):
-            return []
-        if isinstance(val, list):
-            return val
-        if isinstance(val, str):
-            try:
-                return ast.literal_eval(val)
-            except Exception:
-                return [int(x) for x in val.split(',') if x.strip().isdigit()]
-        return []
-
     encoded_connections = {}
     years_of_edges = {}
     teams_of_edges = {}
@@ -125,7 +129,8 @@ def create_nx_graph(coach_jobs_df):
     visualization_tracker = {} # Having an edge for each direction is important for searching, but not vizualization. Reduces vizualized edges by half
     
     duplicate_tracker = set()
-    for category, coach_grouping in grouped_coaches:
+    total_groups = grouped_coaches.ngroups
+    for group_idx, (category, coach_grouping) in enumerate(grouped_coaches):
         for idx1, coach in coach_grouping.iterrows():
             for idx2, other_coach in coach_grouping.iterrows(): # This double loop method generates bidirectional connections automatically
                 if idx1 == idx2:
@@ -158,6 +163,8 @@ def create_nx_graph(coach_jobs_df):
                             visualization_tracker[(coach['Name'], other_coach['Name'], edge_key)] = 0
                         if idx1 < idx2: 
                             visualization_tracker[(coach['Name'], other_coach['Name'], edge_key)] = 1
+        if progress_callback is not None:
+            progress_callback(group_idx + 1, total_groups)
     # Passing data to the nx graph edges
     nx.set_edge_attributes(coaching_graph, encoded_connections, "encoded_connection")
     nx.set_edge_attributes(coaching_graph, years_of_edges, "years_of_connection")
@@ -170,6 +177,136 @@ def create_nx_graph(coach_jobs_df):
     return coaching_graph
 
 
+class CoachAdjacency:
+    """
+    Undirected integer adjacency of the coaching graph, for fast shortest-connection searches between coaches.
+
+    Built once from the edges of the graph (see :meth:`from_graph` and :meth:`from_elements`). Parallel edges between
+    the same two coaches (different teams or time periods) are merged into one link listing every shared stint.
+
+    Attributes:
+        names (list): Coach names, indexed by coach id
+        coach_ids (dict): {coach name: coach id}
+        neighbors (list): For each coach id, a list of (neighbor id, link id)
+        link_stints (list): For each link, a tuple of (team, sorted tuple of shared years)
+    """
+    def __init__(self, edges):
+        self.names = []
+        self.coach_ids = {}
+        stints_by_pair = {}
+
+        def coach_id(name) -> int:
+            name = str(name)
+            if name not in self.coach_ids:
+                self.coach_ids[name] = len(self.names)
+                self.names.append(name)
+            return self.coach_ids[name]
+
+        for source, target, data in edges:
+            pair = tuple(sorted((coach_id(source), coach_id(target))))
+            if pair[0] == pair[1]:
+                continue
+            stints = stints_by_pair.setdefault(pair, {})
+            stints.setdefault(data.get('team_of_connection'), set()).update(data.get('years_of_connection', []))
+
+        self.neighbors = [[] for _ in self.names]
+        self.link_stints = []
+        for link_id, ((coach_a, coach_b), stints) in enumerate(stints_by_pair.items()):
+            self.neighbors[coach_a].append((coach_b, link_id))
+            self.neighbors[coach_b].append((coach_a, link_id))
+            self.link_stints.append(tuple((team, tuple(sorted(years))) for team, years in stints.items()))
+
+    @classmethod
+    def from_graph(cls, coaching_graph):
+        """Builds the adjacency from a graph created by :func:`create_nx_graph`"""
+        return cls(coaching_graph.edges(data=True))
+
+    @classmethod
+    def from_elements(cls, cytoscape_elements: list):
+        """Builds the adjacency from cytoscape elements (ex: the JSON dump written by export_elements.py)"""
+        return cls((el['data']['source'], el['data']['target'], el['data'])
+                   for el in cytoscape_elements if 'source' in el.get('data', {}))
+
+    def _best_stint(self, link_id: int, start_year, end_year, min_overlap: int):
+        """
+        Returns the (team, years) stint of a link with the most shared years within [start_year, end_year],
+        or None if no stint has at least min_overlap years in the range
+        """
+        best = None
+        for team, years in self.link_stints[link_id]:
+            years_in_range = tuple(year for year in years
+                                   if (start_year is None or year >= start_year) and (end_year is None or year <= end_year))
+            if len(years_in_range) >= min_overlap and (best is None or len(years_in_range) > len(best[1])):
+                best = (team, years_in_range)
+        return best
+
+    def find_connection(self, coach_a: str, coach_b: str, start_year: int = None, end_year: int = None, min_overlap: int = 1):
+        """
+        Finds the shortest chain of shared staffs between two coaches with a bidirectional breadth-first search.
+
+        Args:
+            coach_a (str): Coach to start from
+            coach_b (str): Coach to reach
+            start_year (int, optional): Only use shared years on or after start_year
+            end_year (int, optional): Only use shared years on or before end_year
+            min_overlap (int): Minimum number of shared years (within the year range) at one team for two coaches to be connected
+
+        Returns:
+            list or None: Hops from coach_a to coach_b as (coach, next coach, team, shared years), an empty list if
+            both coaches are the same, or None if either coach is unknown or no chain exists with these filters
+
+        Behavior:
+            - Expands the smaller of the two search frontiers one full level at a time
+            - Checks the year filters only on links reached by the search, so no filtered copy of the graph is built
+            - Stops as soon as the frontiers meet, then rebuilds the chain from the parent links of both sides
+        """
+        start, goal = self.coach_ids.get(coach_a), self.coach_ids.get(coach_b)
+        if start is None or goal is None:
+            return None
+        if start == goal:
+            return []
+
+        parents = ({start: None}, {goal: None}) # coach id -> (previous coach id, stint), one dict per side
+        frontiers = ([start], [goal])
+        meeting_coach = None
+        while frontiers[0] and frontiers[1] and meeting_coach is None:
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            own_parents, other_parents = parents[side], parents[1 - side]
+            next_frontier = []
+            for coach in frontiers[side]:
+                for neighbor, link_id in self.neighbors[coach]:
+                    if neighbor in own_parents:
+                        continue
+                    stint = self._best_stint(link_id, start_year, end_year, min_overlap)
+                    if stint is None:
+                        continue
+                    own_parents[neighbor] = (coach, stint)
+                    if neighbor in other_parents:
+                        meeting_coach = neighbor
+                        break
+                    next_frontier.append(neighbor)
+                if meeting_coach is not None:
+                    break
+            frontiers = (next_frontier, frontiers[1]) if side == 0 else (frontiers[0], next_frontier)
+
+        if meeting_coach is None:
+            return None
+
+        hops = []
+        coach = meeting_coach
+        while parents[0][coach] is not None:
+            previous, (team, years) = parents[0][coach]
+            hops.append((self.names[previous], self.names[coach], team, years))
+            coach = previous
+        hops.reverse()
+        coach = meeting_coach
+        while parents[1][coach] is not None:
+            following, (team, years) = parents[1][coach]
+            hops.append((self.names[coach], self.names[following], team, years))
+            coach = following
+        return hops
+
+
 def plotly_graph(encoded_df):
     """
     Generates and displays an interactive network graph using Plotly based on the provided encoded DataFrame.
@@ -187,6 +324,9 @@ def plotly_graph(encoded_df):
     Returns:
         None. Displays the interactive Plotly network graph in the default browser or notebook output.
     """
+    import networkx as nx
+    import plotly.graph_objects as go
+
     coaching_graph = create_nx_graph(encoded_df)
 
     pos = nx.forceatlas2_layout(coaching_graph, scaling_ratio = 5)                
@@ -317,6 +457,7 @@ def plotly_graph(encoded_df):
 
 
 if __name__ == "__main__":
+    enable_profiling_from_cli()
     input_file_name = input("Please enter the path to the CSV file you wish to read: ").strip()
     with open(f"{input_file_name}", "r") as coach_jobs_csv:
         coach_jobs_df = pd.read_csv(coach_jobs_csv)
@@ -0,0 +1,239 @@
+"""
+Latency and payload-size instrumentation for the Dash callbacks in 'dash_graph.py'.
+
+Every instrumented callback records its wall time and the number of cytoscape elements and stylesheet rules it returns.
+The size of its response is measured on the response Flask sends, so nothing is serialized twice. Helpers from 'dash_graph_internals.py' record the time spent in each of them,
+labelled with the callback they ran under. Everything is aggregated into histograms and served on '/metrics' in the
+Prometheus plain-text exposition format. Background callbacks run in another process, so their observations are
+passed back through the background callback manager's disk cache (see :func:`instrument_background_callback`).
+
+Only the standard library is used here, so importing this module is free for the rest of the app.
+"""
+import functools
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+if __name__ == '__main__':
+    print("Error: you are running a file of function definitions, please run 'dash_graph.py' to generate the webpage")
+
+# Upper bounds of the histogram buckets, '+Inf' is added automatically
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+COUNT_BUCKETS = (0, 10, 50, 100, 500, 1000, 5000, 10000, 50000)
+BYTES_BUCKETS = (1_000, 10_000, 50_000, 100_000, 500_000, 1_000_000, 5_000_000, 10_000_000)
+
+METRIC_DESCRIPTIONS = {
+    'dash_callback_duration_seconds': ('Wall time of Dash callbacks', DURATION_BUCKETS),
+    'dash_callback_elements': ('Cytoscape elements returned by Dash callbacks', COUNT_BUCKETS),
+    'dash_callback_stylesheet_rules': ('Cytoscape stylesheet rules returned by Dash callbacks', COUNT_BUCKETS),
+    'dash_callback_response_bytes': ('Size of Dash callback response bodies', BYTES_BUCKETS),
+    'dash_helper_duration_seconds': ('Time spent in dash_graph_internals helpers', DURATION_BUCKETS),
+}
+
+_current_callback = ContextVar('current_callback', default='none')
+# Set while a background callback runs, observations are collected there instead of in the worker's own registry
+_forwarded_observations = ContextVar('forwarded_observations', default=None)
+
+# Key prefix of the observation batches pushed to the disk cache by background callbacks
+FORWARDED_PREFIX = 'callback-metrics'
+
+
+class Histogram:
+    """Cumulative histogram of observed values with fixed bucket upper bounds"""
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for idx, upper_bound in enumerate(self.buckets):
+            if value <= upper_bound:
+                self.bucket_counts[idx] += 1
+
+
+class MetricsRegistry:
+    """
+    Thread-safe collection of histograms, keyed by metric name and label values, plus gauges read at scrape time.
+    """
+    def __init__(self):
+        self._histograms = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+
+    def observe(self, metric: str, value: float, **labels):
+        forwarded = _forwarded_observations.get()
+        if forwarded is not None:
+            forwarded.append((metric, value, labels))
+            return
+        key = (metric, tuple(sorted(labels.items())))
+        with self._lock:
+            if key not in self._histograms:
+                self._histograms[key] = Histogram(METRIC_DESCRIPTIONS[metric][1])
+            self._histograms[key].observe(value)
+
+    def merge_forwarded(self, cache):
+        """Records the observation batches pushed to cache by :func:`instrument_background_callback`"""
+        while True:
+            key, observations = cache.pull(prefix=FORWARDED_PREFIX)
+            if key is None:
+                return
+            for metric, value, labels in observations:
+                self.observe(metric, value, **labels)
+
+    def register_gauge(self, metric: str, description: str, read_value):
+        """Registers a gauge whose value is read by calling read_value() on every scrape"""
+        self._gauges[metric] = (description, read_value)
+
+    def render(self) -> str:
+        """Renders every metric in the Prometheus plain-text exposition format (version 0.0.4)"""
+        def format_labels(labels):
+            if not labels:
+                return ''
+            return '{' + ','.join(f'{name}="{value}"' for name, value in labels) + '}'
+
+        lines = []
+        with self._lock:
+            by_metric = {}
+            for (metric, labels), histogram in self._histograms.items():
+                by_metric.setdefault(metric, []).append((labels, histogram))
+            for metric in sorted(by_metric):
+                lines.append(f'# HELP {metric} {METRIC_DESCRIPTIONS[metric][0]}')
+                lines.append(f'# TYPE {metric} histogram')
+                for labels, histogram in sorted(by_metric[metric], key=lambda item: item[0]):
+                    for upper_bound, bucket_count in zip(histogram.buckets, histogram.bucket_counts):
+                        lines.append(f'{metric}_bucket{format_labels(labels + (("le", upper_bound),))} {bucket_count}')
+                    lines.append(f'{metric}_bucket{format_labels(labels + (("le", "+Inf"),))} {histogram.count}')
+                    lines.append(f'{metric}_sum{format_labels(labels)} {histogram.sum}')
+                    lines.append(f'{metric}_count{format_labels(labels)} {histogram.count}')
+
+        for metric, (description, read_value) in sorted(self._gauges.items()):
+            lines.append(f'# HELP {metric} {description}')
+            lines.append(f'# TYPE {metric} gauge')
+            lines.append(f'{metric} {read_value()}')
+
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def count_payload(value) -> tuple:
+    """
+    Counts the cytoscape elements and stylesheet rules in a callback's return value.
+
+    Elements are dicts with a 'data' key, stylesheet rules are dicts with a 'selector' key. Partial updates
+    (dash.Patch) count the elements they add.
+
+    Returns:
+        tuple: (number of elements, number of stylesheet rules)
+    """
+    outputs = value if isinstance(value, tuple) else (value,)
+    elements = 0
+    rules = 0
+    for output in outputs:
+        if type(output).__name__ == 'Patch':
+            output = [item for operation in output.to_plotly_json()['operations']
+                      if operation['operation'] == 'Extend' for item in operation['params']['value']]
+        if isinstance(output, list) and output and isinstance(output[0], dict):
+            elements += sum(1 for item in output if 'data' in item)
+            rules += sum(1 for item in output if 'selector' in item)
+    return elements, rules
+
+
+def instrument_callback(func):
+    """
+    Decorator for Dash callbacks (place it below @app.callback). Records wall time and the elements and stylesheet
+    rules returned, labelled with the callback's name. The name is also kept on the Flask request, for the response
+    size recorded by :func:`register_metrics_endpoint`.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        from flask import g, has_request_context
+
+        if has_request_context():
+            g.dash_callback = func.__name__
+        token = _current_callback.set(func.__name__)
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            registry.observe('dash_callback_duration_seconds', time.perf_counter() - start, callback=func.__name__)
+            _current_callback.reset(token)
+        elements, rules = count_payload(result)
+        registry.observe('dash_callback_elements', elements, callback=func.__name__)
+        registry.observe('dash_callback_stylesheet_rules', rules, callback=func.__name__)
+        return result
+    return wrapper
+
+
+def instrument_background_callback(cache):
+    """
+    Decorator for Dash background callbacks (place it below @app.callback), which Dash runs in another process.
+    Records the same metrics as :func:`instrument_callback`, plus the time spent in helpers, but pushes them to
+    cache (the diskcache.Cache of the background callback manager) for the metrics endpoint to merge on its next
+    scrape. Response bytes are not recorded, the result reaches the browser through Dash's polling requests.
+    """
+    def decorator(func):
+        instrumented = instrument_callback(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            observations = []
+            token = _forwarded_observations.set(observations)
+            try:
+                return instrumented(*args, **kwargs)
+            finally:
+                _forwarded_observations.reset(token)
+                cache.push(observations, prefix=FORWARDED_PREFIX)
+        return wrapper
+    return decorator
+
+
+def track_helper(func):
+    """
+    Decorator for 'dash_graph_internals' helpers. Records the time spent in the helper,
+    labelled with the helper's name and the callback it ran under ('none' outside of callbacks).
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            registry.observe('dash_helper_duration_seconds', time.perf_counter() - start,
+                             helper=func.__name__, callback=_current_callback.get())
+    return wrapper
+
+
+def register_metrics_endpoint(server, path: str = '/metrics', forwarded_cache=None):
+    """
+    Adds the metrics endpoint to the Flask server behind a Dash app, and records the body size of every response to
+    '/_dash-update-component' served by an instrumented callback. Observations of background callbacks are merged
+    from forwarded_cache (the cache given to :func:`instrument_background_callback`) on every scrape.
+
+    The endpoint only answers local requests, unless the 'COACHING_METRICS_PUBLIC' environment variable is set.
+    """
+    from flask import Response, abort, g, request
+
+    @server.after_request
+    def record_response_bytes(response):
+        callback = g.get('dash_callback')
+        if callback is not None and request.path.endswith('/_dash-update-component'):
+            size = response.calculate_content_length()
+            if size is not None:
+                registry.observe('dash_callback_response_bytes', size, callback=callback)
+        return response
+
+    @server.route(path)
+    def metrics():
+        if request.remote_addr not in ('127.0.0.1', '::1') and not os.environ.get('COACHING_METRICS_PUBLIC'):
+            abort(403)
+        if forwarded_cache is not None:
+            registry.merge_forwarded(forwarded_cache)
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+    return metrics
@@ -0,0 +1,64 @@
+"""
+JavaScript bodies for the clientside callbacks registered in 'dash_graph.py'.
+
+These callbacks only move UI state around (combination strings, resetting the stylesheet, restoring
+the cached element list), so running them in the browser removes a server round trip from the most
+frequent interactions. The full element list is cached browser-side in the 'full_elements_store' dcc.Store.
+"""
+import json
+from dash_graph_internals import default_stylesheet
+
+if __name__ == '__main__':
+    print("Error: you are running a file of callback definitions, please run 'dash_graph.py' to generate the webpage")
+
+show_full_elements_js = """
+function(fullElements) {
+    // Main graph mirrors the browser-side element cache whenever a new file is loaded
+    // Displayed ids are reset, so the next selection is sent in full rather than as a delta
+    return [fullElements || [], {'name': 'circle'}, null];
+}
+"""
+
+add_team_year_combos_js = """
+function(nClicks, currentCombos, teamSelection, yearSelections) {
+    const noUpdate = window.dash_clientside.no_update;
+    // If information is incomplete, don't update anything
+    if (!nClicks || teamSelection === null || teamSelection === undefined ||
+        yearSelections === null || yearSelections === undefined) {
+        return [noUpdate, noUpdate];
+    }
+    // Turn single values into lists for consistent iteration
+    const teams = Array.isArray(teamSelection) ? teamSelection : [teamSelection];
+    const years = Array.isArray(yearSelections) ? yearSelections : [yearSelections];
+
+    const combos = [];
+    const seen = new Set();
+    const addCombo = (combo) => {
+        const key = JSON.stringify(combo);
+        if (!seen.has(key)) {
+            seen.add(key);
+            combos.push(combo);
+        }
+    };
+    (currentCombos || []).forEach(addCombo);
+    teams.forEach(team => years.forEach(year => addCombo([team, year])));
+
+    const display = combos.map(([team, year]) => `${team} - ${year}`).join(', ');
+    return [display, combos];
+}
+"""
+
+clear_parameters_js = """
+function(nClicks, fullGraphToggle, fullElements) {
+    // Clear display and storage data, return to circle layout and default stylesheet, clear legend
+    const elements = fullGraphToggle ? (fullElements || []) : [];
+    return ["", [], {'name': 'circle'}, __DEFAULT_STYLESHEET__, elements, false, null, false, null];
+}
+""".replace('__DEFAULT_STYLESHEET__', json.dumps(default_stylesheet))
+
+reset_season_window_js = """
+function() {
+    // Another view replaced the main graph, so the season slider stops driving it until 'Show Season Network' is pressed again
+    return null;
+}
+"""
@@ -0,0 +1,87 @@
+"""
+Coach-keyed career index and prefix search over coach names.
+
+The index is built once from the staff rosters (see staff_roster.py), so a coach's full history is a dictionary
+lookup, and includes coaches who never shared a staff with another coach in the data (and so have no edges).
+"""
+from bisect import bisect_left
+from functools import lru_cache
+
+if __name__ == '__main__':
+    print("Error: you are running a file of function definitions, please run 'dash_graph.py' to generate the webpage")
+
+
+def normalize_search_text(text: str) -> str:
+    """Lowercases and strips punctuation so 'A.J. Milwee' and 'aj milwee' match"""
+    return ''.join(char for char in text.lower() if char.isalnum() or char.isspace()).strip()
+
+
+class CoachCareerIndex:
+    """
+    Career history of every coach, plus a sorted prefix index of their names for typeahead search.
+
+    Attributes:
+        careers (dict): {coach name: [(sentence, team, year, position), ...]}, sorted by year in descending order.
+            One entry per (team, year), positions on the same staff joined by ' / '
+        search_keys (list): Sorted (normalized key, coach name) pairs. Each coach is indexed by their full name and
+            by every later name part, so 'deb' finds 'Kalen DeBoer'
+    """
+    def __init__(self, roster: dict):
+        careers = {}
+        for (team, year), staff in roster.items():
+            for name, position, _level in staff:
+                sentence = f"{name} coached for {team} as the {position} in {year}"
+                careers.setdefault(name, []).append((sentence, team, year, position))
+        for history in careers.values():
+            history.sort(key=lambda job: (job[2], job[1]), reverse=True)
+        self.careers = careers
+
+        search_keys = set()
+        for name in careers:
+            name_parts = normalize_search_text(name).split()
+            for idx in range(len(name_parts)):
+                search_keys.add((' '.join(name_parts[idx:]), name))
+        self.search_keys = sorted(search_keys)
+
+    def history(self, coach: str) -> list:
+        """Returns the career of a coach (see `careers`), or an empty list for an unknown coach"""
+        return self.careers.get(coach, [])
+
+    def search(self, prefix: str, limit: int = 20) -> list:
+        """
+        Finds coaches whose full name, or any later part of it, starts with prefix.
+
+        Args:
+            prefix (str): Text typed so far
+            limit (int): Maximum number of names returned
+
+        Returns:
+            list: Matching coach names, in alphabetical order of the matched key
+        """
+        prefix = normalize_search_text(prefix)
+        if not prefix:
+            return []
+        matches = []
+        idx = bisect_left(self.search_keys, (prefix, ''))
+        while idx < len(self.search_keys) and len(matches) < limit:
+            key, name = self.search_keys[idx]
+            if not key.startswith(prefix):
+                break
+            if name not in matches:
+                matches.append(name)
+            idx += 1
+        return matches
+
+
+@lru_cache(maxsize=2)
+def _load_coach_index(csv_path: str, _version: str) -> CoachCareerIndex:
+    from staff_roster import load_staff_roster
+
+    return CoachCareerIndex(load_staff_roster(csv_path))
+
+
+def load_coach_index(csv_path: str = 'data/clean_sorted_coach_jobs.csv') -> CoachCareerIndex:
+    """Returns the career index of the jobs CSV, built once per version of the file"""
+    from dash_graph_internals import dataset_version
+
+    return _load_coach_index(csv_path, dataset_version(csv_path))
@@ -0,0 +1,136 @@
+"""
+Coaching "families": communities of coaches who repeatedly shared staffs.
+
+Community detection runs on a simple weighted graph that collapses the parallel, bidirectional edges of
+:func:`basic_graph_generation.create_nx_graph` into one undirected edge per coach pair, weighted by the number of
+seasons the pair shared (over every team). This is much smaller than the multigraph and counts each relationship once.
+
+Results are cached per (method, dataset version) in a disk cache (the Dash app passes its 'background_cache'), so
+detection only reruns when the data is regenerated. Run it from the pipeline with::
+
+    python coaching_communities.py [louvain|label_propagation] [output CSV]
+"""
+from functools import lru_cache
+
+COMMUNITY_METHODS = ('louvain', 'label_propagation')
+COMMUNITY_CACHE_DIR = '.dash_cache'
+
+
+def collapse_coaching_graph(edges):
+    """
+    Collapses coaching edges into a simple undirected graph, one edge per coach pair.
+
+    Args:
+        edges (iterable): (source, target, data) triples with 'years_of_connection' and 'team_of_connection' in data,
+            ex: coaching_graph.edges(data=True) for a graph built by :func:`basic_graph_generation.create_nx_graph`
+
+    Returns:
+        nx.Graph: Graph whose edges carry a 'weight' equal to the number of distinct (team, season) pairs the two
+        coaches shared. The two directions of a relationship, and repeats at the same team, are counted once
+    """
+    import networkx as nx
+
+    shared_seasons = {}
+    for source, target, data in edges:
+        if source == target:
+            continue
+        pair = (source, target) if source < target else (target, source)
+        years = data.get('years_of_connection') or []
+        years = years if isinstance(years, list) else [years]
+        shared_seasons.setdefault(pair, set()).update((data.get('team_of_connection'), year) for year in years)
+
+    collapsed_graph = nx.Graph()
+    collapsed_graph.add_weighted_edges_from((source, target, len(seasons)) for (source, target), seasons in shared_seasons.items())
+    return collapsed_graph
+
+
+def elements_to_edges(cytoscape_elements: list):
+    """Yields (source, target, data) triples from cytoscape elements, for :func:`collapse_coaching_graph`"""
+    for el in cytoscape_elements:
+        data = el.get('data', {})
+        if 'source' in data:
+            yield data['source'], data['target'], data
+
+
+def detect_communities(collapsed_graph, method: str = 'louvain', seed: int = 0) -> dict:
+    """
+    Detects communities on a collapsed coaching graph.
+
+    Args:
+        collapsed_graph (nx.Graph): Weighted graph from :func:`collapse_coaching_graph`
+        method (str): 'louvain' (modularity optimization, weighted) or 'label_propagation' (faster, unweighted)
+        seed (int): Random seed, so the same data always yields the same communities
+
+    Returns:
+        dict: {coach name: community number}, communities numbered by size (0 is the largest)
+    """
+    import networkx as nx
+
+    if method == 'louvain':
+        communities = nx.community.louvain_communities(collapsed_graph, weight='weight', seed=seed)
+    elif method == 'label_propagation':
+        communities = nx.community.label_propagation_communities(collapsed_graph)
+    else:
+        raise ValueError(f"Unknown community detection method {method}, expected one of {COMMUNITY_METHODS}")
+
+    ordered_communities = sorted(communities, key=lambda community: (-len(community), min(community)))
+    return {coach: number for number, community in enumerate(ordered_communities) for coach in community}
+
+
+@lru_cache(maxsize=4)
+def _load_communities(method: str, version: str, cache_dir: str) -> dict:
+    import diskcache
+    from dash_graph_internals import parse_json_file
+
+    with diskcache.Cache(cache_dir) as cache:
+        cache_key = ('coaching-communities', method, version)
+        communities = cache.get(cache_key)
+        if communities is None:
+            elements, _, _ = parse_json_file()
+            communities = detect_communities(collapse_coaching_graph(elements_to_edges(elements)), method)
+            cache.set(cache_key, communities)
+    return communities
+
+
+def load_communities(method: str = 'louvain', cache_dir: str = COMMUNITY_CACHE_DIR) -> dict:
+    """
+    Returns the communities of the loaded elements (see :func:`dash_graph_internals.parse_json_file`), read from the
+    disk cache in cache_dir when they were already detected for this dataset version, else detected and cached.
+    """
+    from dash_graph_internals import dataset_version
+
+    return _load_communities(method, dataset_version(), cache_dir)
+
+
+def community_stylesheet(communities: dict, colored_communities: int = 12) -> list:
+    """
+    Stylesheet rules coloring coaches by community (nodes need a 'community' data field). The largest
+    colored_communities communities get distinct colors, smaller ones are drawn in grey.
+    """
+    from dash_graph_internals import generate_color
+
+    total = min(colored_communities, len(set(communities.values())))
+    rules = [{'selector': 'node[community]', 'style': {'background-color': '#bbbbbb'}}]
+    rules += [{'selector': f'node[community = {number}]', 'style': {'background-color': generate_color(number, total)}}
+              for number in range(total)]
+    return rules
+
+
+def without_community_rules(stylesheet: list) -> list:
+    """Removes the rules added by :func:`community_stylesheet`, keeping every other rule in order"""
+    return [rule for rule in stylesheet if not rule.get('selector', '').startswith('node[community')]
+
+
+if __name__ == '__main__':
+    import csv
+    import sys
+
+    method = sys.argv[1] if len(sys.argv) > 1 else 'louvain'
+    found_communities = load_communities(method)
+    print(f"Found {len(set(found_communities.values()))} communities among {len(found_communities)} coaches with {method}")
+    if len(sys.argv) > 2:
+        with open(sys.argv[2], 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['Coach', 'Community'])
+            writer.writerows(sorted(found_communities.items(), key=lambda item: (item[1], item[0])))
+        print(f"Wrote communities to {sys.argv[2]}")
@@ -0,0 +1,163 @@
+"""
+Coaching trees: every coach descended from (or ancestor of) a coach through mentor relationships.
+
+A mentor relationship is an edge of the coaching graph between two coaches of different encoded levels (see
+'mentor_status' in :func:`basic_graph_generation.create_nx_graph`): the coach at the more senior level is the
+mentor. Edges between coaches at equal standing, or with an unlisted position, are not mentor relationships.
+
+:class:`MentorIndex` builds an integer, mentor-only adjacency once per dataset version, so a coaching tree is a
+breadth-first search over small int lists, and every tree is memoized per (root, direction, depth, year bounds).
+"""
+from bisect import bisect_left
+from functools import lru_cache
+
+if __name__ == '__main__':
+    print("Error: you are running a file of function definitions, please run 'dash_graph.py' to generate the webpage")
+
+
+def _is_level(level) -> bool:
+    """Encoded levels are ints, unlisted positions are NaN (or None once stored)"""
+    return level is not None and level == level
+
+
+class MentorIndex:
+    """
+    Mentor-only adjacency of the coaching graph.
+
+    Attributes:
+        names (list): Coach names, indexed by coach id
+        coach_ids (dict): {coach name: coach id}
+        mentees (list): For each coach id, the ids of the links to the coaches they mentored
+        mentors (list): For each coach id, the ids of the links to the coaches who mentored them
+        link_mentor (list): Mentor coach id of each link
+        link_mentee (list): Mentee coach id of each link
+        link_years (list): Sorted tuple of the years of each link, over every team it happened at
+        link_teams (list): Tuple of 'Team (first year-last year)' descriptions of each link
+    """
+    def __init__(self, cytoscape_elements: list):
+        self.names = []
+        self.coach_ids = {}
+
+        def coach_id(name: str) -> int:
+            if name not in self.coach_ids:
+                self.coach_ids[name] = len(self.names)
+                self.names.append(name)
+            return self.coach_ids[name]
+
+        links = {} # (mentor id, mentee id) -> {team: set of years}
+        for el in cytoscape_elements:
+            data = el.get('data', {})
+            if 'source' not in data:
+                continue
+            source_level, target_level = data.get('encoded_connection', (None, None))
+            if not _is_level(source_level) or not _is_level(target_level) or source_level == target_level:
+                continue
+            mentor, mentee = (data['source'], data['target']) if source_level < target_level else (data['target'], data['source'])
+            teams = links.setdefault((coach_id(mentor), coach_id(mentee)), {})
+            teams.setdefault(data.get('team_of_connection'), set()).update(data.get('years_of_connection', []))
+
+        self.mentees = [[] for _ in self.names]
+        self.mentors = [[] for _ in self.names]
+        self.link_mentor = []
+        self.link_mentee = []
+        self.link_years = []
+        self.link_teams = []
+        for link_id, ((mentor, mentee), teams) in enumerate(links.items()):
+            self.mentees[mentor].append(link_id)
+            self.mentors[mentee].append(link_id)
+            self.link_mentor.append(mentor)
+            self.link_mentee.append(mentee)
+            self.link_years.append(tuple(sorted(set().union(*teams.values()))))
+            self.link_teams.append(tuple(f"{team} ({min(years)}-{max(years)})" if years else str(team)
+                                         for team, years in sorted(teams.items(), key=lambda item: min(item[1], default=0))))
+
+        # Memoized per instance rather than with lru_cache on the method, so an old index is freed once
+        # _load_mentor_index drops it
+        self._tree_cache = lru_cache(maxsize=512)(self._build_tree)
+
+    def _link_in_years(self, link_id: int, start_year, end_year) -> bool:
+        """Whether the link has at least one year within [start_year, end_year] (either bound may be None)"""
+        years = self.link_years[link_id]
+        idx = bisect_left(years, start_year) if start_year is not None else 0
+        return idx < len(years) and (end_year is None or years[idx] <= end_year)
+
+    def tree(self, root: str, direction: str = 'descendants', max_depth: int = 2, start_year: int = None, end_year: int = None) -> tuple:
+        """
+        Computes the coaching tree of a coach.
+
+        Args:
+            root (str): Coach at the root of the tree
+            direction (str): 'descendants' (coaches the root mentored, and so on) or 'ancestors' (the root's mentors)
+            max_depth (int): Number of mentor generations to follow
+            start_year (int, optional): Only follow mentor relationships with a shared year on or after start_year
+            end_year (int, optional): Only follow mentor relationships with a shared year on or before end_year
+
+        Returns:
+            tuple: (coach, depth, parent, teams) rows in breadth-first order, starting with (root, 0, None, ()).
+            Each coach appears once, at the shallowest depth found, under the first parent found at that depth.
+            teams describes where the coach and their parent overlapped. Empty if the root is unknown
+        """
+        return self._tree_cache(root, direction, max_depth, start_year, end_year)
+
+    def _build_tree(self, root: str, direction: str, max_depth: int, start_year, end_year) -> tuple:
+        root_id = self.coach_ids.get(root)
+        if root_id is None:
+            return ()
+        adjacency, far_end = (self.mentees, self.link_mentee) if direction == 'descendants' else (self.mentors, self.link_mentor)
+
+        rows = [(root, 0, None, ())]
+        visited = {root_id}
+        frontier = [root_id]
+        for depth in range(1, max_depth + 1):
+            next_frontier = []
+            for coach in frontier:
+                for link_id in adjacency[coach]:
+                    other = far_end[link_id]
+                    if other in visited or not self._link_in_years(link_id, start_year, end_year):
+                        continue
+                    visited.add(other)
+                    next_frontier.append(other)
+                    rows.append((self.names[other], depth, self.names[coach], self.link_teams[link_id]))
+            if not next_frontier:
+                break
+            frontier = next_frontier
+        return tuple(rows)
+
+
+@lru_cache(maxsize=2)
+def _load_mentor_index(_version: str) -> MentorIndex:
+    from dash_graph_internals import parse_json_file
+
+    elements, _, _ = parse_json_file()
+    return MentorIndex(elements)
+
+
+def load_mentor_index() -> MentorIndex:
+    """Returns the mentor index of the loaded elements (see :func:`dash_graph_internals.parse_json_file`), built once per dataset version"""
+    from dash_graph_internals import dataset_version
+
+    return _load_mentor_index(dataset_version())
+
+
+def coaching_tree_elements(tree_rows: tuple, direction: str = 'descendants'):
+    """
+    Creates the elements of a coaching tree subgraph from the rows of :meth:`MentorIndex.tree`.
+
+    Returns:
+        tuple: A tuple containing:
+            - tree_elements (list): Nodes (with a 'subgraph_label' of the coach name) followed by mentor -> mentee edges
+            - node_levels (dict): {coach name: layer}, mentors above mentees, for
+              :func:`dash_graph_internals.hierarchy_layout_positions`
+    """
+    deepest = max((depth for _, depth, _, _ in tree_rows), default=0)
+    nodes = []
+    edges = []
+    node_levels = {}
+    for coach, depth, parent, teams in tree_rows:
+        nodes.append({'data': {'id': coach, 'coach_name': coach, 'subgraph_label': coach}})
+        node_levels[coach] = depth if direction == 'descendants' else deepest - depth
+        if parent is not None:
+            mentor, mentee = (parent, coach) if direction == 'descendants' else (coach, parent)
+            edges.append({'data': {'id': f"tree-edge-{len(edges)}", 'source': mentor, 'target': mentee,
+                                   'teams': ', '.join(teams)}})
+    return nodes + edges, node_levels
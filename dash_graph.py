@@ -1,15 +1,49 @@
 # Dash graph generation imports 
-from dash_graph_internals import *          
+from dash_graph_internals import (
+    QueryResultCache, aggregated_team_view, build_team_clusters, circle_layout_positions, dataset_version,
+    default_stylesheet, element_delta, generate_legend_and_highlights, get_id_of_triggered, hierarchy_layout_positions,
+    load_dropdown_options, load_selection_elements, lookup_element_details, patch_from_delta, normalize_combo_selection, parse_csv_file, parse_json_file,
+    subgraph_default_stylesheet, trim_elements, unselected_stylesheet, upload_cache_key
+)
+from clientside_callbacks import show_full_elements_js, add_team_year_combos_js, clear_parameters_js, reset_season_window_js
+from staff_roster import staff_hierarchy_elements
+from tenure_index import load_tenure_index
+from coach_index import load_coach_index
+from coaching_tree import load_mentor_index, coaching_tree_elements
+from staff_metrics import load_staff_metrics
+from team_flow import load_team_flows, flow_matrix
+from season_snapshots import load_season_snapshots
+from coaching_communities import load_communities, community_stylesheet, without_community_rules
+from profiling import enable_profiling_from_cli
+from callback_metrics import instrument_background_callback, instrument_callback, register_metrics_endpoint, registry as metrics_registry
 import dash_cytoscape as cyto    
 import dash                      
-from dash import dcc, html, callback_context
+from dash import dcc, html, callback_context, dash_table
 from dash.dependencies import Input, Output, State, ALL
 import dash_bootstrap_components as dbc
-import itertools
+import diskcache
+import functools
 import json
 
+# Background callbacks (CSV uploads) run in separate processes, sharing results through an on-disk cache
+background_cache = diskcache.Cache('.dash_cache')
+background_callback_manager = dash.DiskcacheManager(background_cache)
+
+app = dash.Dash('Coaching Connections Exploration Dashboard', external_stylesheets=[dbc.themes.JOURNAL],
+                background_callback_manager=background_callback_manager)
+
+# Results of the 'Update Parameters' path, keyed by normalized selection + dataset version
+query_cache = QueryResultCache()
 
-app = dash.Dash('Coaching Connections Exploration Dashboard', external_stylesheets=[dbc.themes.JOURNAL])
+# Query cache occupancy is reported next to the callback histograms on '/metrics', see callback_metrics.py
+for stat_name in ('hits', 'misses', 'evictions', 'entries', 'size'):
+    metrics_registry.register_gauge(f'query_cache_{stat_name}', f'Query result cache {stat_name}',
+                                    lambda stat_name=stat_name: query_cache.stats()[stat_name])
+
+# Jobs table the staff rosters are materialized from
+ROSTER_CSV_PATH = 'data/clean_sorted_coach_jobs.csv'
+
+COLLEAGUE_COLUMNS = ['Colleague', 'Team', 'First Season', 'Last Season', 'Shared Seasons']
 
 app.layout = html.Div([
     
@@ -31,6 +65,12 @@ app.layout = html.Div([
         },
         multiple=False
     ),
+    dbc.Row([
+        dbc.Col(dbc.Progress(id='upload-progress', value=0, label="", striped=True, animated=True,
+                             style={'height': '20px'}),
+                width={'size': 10, 'offset': 1}
+        )
+    ]),
     dbc.Row([ 
         dbc.Col(dbc.Button("Load graph from JSON File", id="JSON-direct-load-button", n_clicks=0, color="info"), 
                 width={'size': 'auto'}
@@ -42,6 +82,20 @@ app.layout = html.Div([
                 value=False,
             ), width={'size': 'auto'}
         ),    
+        dbc.Col(
+            dbc.Switch(
+                id="aggregate_toggle",
+                label="Collapse full network into teams? (Click a team to expand it)",
+                value=True,
+            ), width={'size': 'auto'}
+        ),
+        dbc.Col(
+            dbc.Switch(
+                id="community_toggle",
+                label="Color coaches by coaching family?",
+                value=False,
+            ), width={'size': 'auto'}
+        ),
     ], justify='center'
     ),
 
@@ -80,6 +134,20 @@ app.layout = html.Div([
             ),
         ),
     ]),
+
+    dbc.Row([
+        dbc.Col(dbc.Button("Show Season Network", id='season_button', n_clicks=0, color="info"),
+                width={'size': 'auto', 'offset': 1}),
+        dbc.Col(dcc.RangeSlider(
+                id='season_slider',
+                min=0, max=0, step=1, value=[0, 0],
+                allowCross=False,
+                tooltip={'placement': 'bottom'}
+            ), width={'size': 8}
+        ),
+    ], align='center'
+    ),
+    dcc.Store(id='season_window', storage_type='memory'), # Seasons shown in main_graph by the season slider
     
     dbc.Row([
         dbc.Col(dcc.Dropdown(
@@ -133,6 +201,9 @@ app.layout = html.Div([
     ], justify='center'
     ),
     dcc.Store(id='team_year_combo_store', storage_type='session'),
+    dcc.Store(id='full_elements_store', storage_type='memory'), # Browser-side cache of the full element list
+    dcc.Store(id='graph_source', storage_type='memory'), # Where the loaded elements came from, for drill-downs
+    dcc.Store(id='main_graph_element_ids', storage_type='memory'), # Ids displayed in main_graph, for delta updates
     
     dbc.Row([
         dbc.Col(
@@ -147,15 +218,32 @@ app.layout = html.Div([
         ], justify='center'
     ),
 
+    dbc.Row([
+        dbc.Col(html.Div(id='element-details', style={'whiteSpace': 'pre-wrap'}),
+                width={'size': 10, 'offset': 1}),
+    ],),
+
     dbc.Row([
         dbc.Col(html.H5('Coaching History'), width={'size': 'auto', 'offset': 1}),
     ],),
     
     dbc.Row([
-        dbc.Col(html.P("Click on a coach's node to view their full coaching history"), 
+        dbc.Col(html.P("Click on a coach's node, or search for a coach, to view their full coaching history"), 
                 width={'size': 'auto', 'offset': 1}),
     ],),
 
+    dbc.Row([
+        dbc.Col(dcc.Dropdown(
+                options= [],
+                multi= False,
+                searchable= True,
+                placeholder= 'Search for a coach',
+                id='coach_search'
+            ),
+            width={'size': 4, 'offset': 1}
+        ),
+    ],),
+
     dbc.Row([
         dbc.Col(html.H6(id='coach-name-click', style= {
                 'border': 'thin lightgrey solid',
@@ -183,300 +271,493 @@ app.layout = html.Div([
     cyto.Cytoscape(
         id='sub_graph',
         elements=[],  # Start empty
-        layout={'name': 'breadthfirst',
+        layout={'name': 'preset',
                 },
 
         stylesheet= subgraph_default_stylesheet,
         style={'width': '100%', 'height': '600px'}
-    )
+    ),
+
+    dbc.Row([
+        dbc.Col(html.H5('Coaching Tree'), width={'size': 'auto', 'offset': 1}),
+    ],),
+
+    dbc.Row([
+        dbc.Col(html.P("Shows the coaches mentored by (or the mentors of) the coach searched for above, or the last coach clicked"),
+                width={'size': 'auto', 'offset': 1}),
+    ],),
+
+    dbc.Row([
+        dbc.Col(dbc.RadioItems(
+                options=[{'label': 'Descendants', 'value': 'descendants'}, {'label': 'Ancestors', 'value': 'ancestors'}],
+                value='descendants',
+                inline=True,
+                id='tree_direction'
+            ), width={'size': 'auto', 'offset': 1}
+        ),
+        dbc.Col(dbc.Input(id='tree_depth', type='number', min=1, max=6, step=1, value=2, placeholder='Generations'),
+                width={'size': 1}),
+        dbc.Col(dbc.Input(id='tree_start_year', type='number', placeholder='From year'), width={'size': 1}),
+        dbc.Col(dbc.Input(id='tree_end_year', type='number', placeholder='To year'), width={'size': 1}),
+        dbc.Col(dbc.Button("Show Coaching Tree", id='tree_button', n_clicks=0, color="primary"),
+                width={'size': 'auto'}),
+    ],),
+
+    dbc.Row([ 
+            dbc.Col(html.H3(id='tree-header', style={
+                    'padding-inline': '20px'})
+            )
+        ]),
+
+    cyto.Cytoscape(
+        id='tree_graph',
+        elements=[],  # Start empty
+        layout={'name': 'preset'},
+        stylesheet= subgraph_default_stylesheet,
+        style={'width': '100%', 'height': '600px'}
+    ),
+
+    dbc.Row([
+        dbc.Col(html.H5('Colleagues'), width={'size': 'auto', 'offset': 1}),
+        dbc.Col(dbc.Input(id='colleague_start_year', type='number', placeholder='From year'), width={'size': 1}),
+        dbc.Col(dbc.Input(id='colleague_end_year', type='number', placeholder='To year'), width={'size': 1}),
+        dbc.Col(dbc.Button("Show Colleagues", id='colleagues_button', n_clicks=0, color="primary"), width={'size': 'auto'}),
+        dbc.Col(html.Div(id='colleagues-header'), width={'size': 'auto'}),
+    ],),
+
+    dbc.Row([
+        dbc.Col(dash_table.DataTable(
+                id='colleagues_table',
+                data=[],
+                columns=[{'name': column, 'id': column} for column in COLLEAGUE_COLUMNS],
+                filter_action='native',
+                sort_action='native',
+                page_size=15,
+                export_format='csv',
+                style_table={'overflowX': 'auto'}
+            ), width={'size': 10, 'offset': 1}
+        ),
+    ],),
+
+    dbc.Row([
+        dbc.Col(html.H5('Connect Two Coaches'), width={'size': 'auto', 'offset': 1}),
+    ],),
+
+    dbc.Row([
+        dbc.Col(html.P("Finds the shortest chain of shared staffs between two coaches"),
+                width={'size': 'auto', 'offset': 1}),
+    ],),
+
+    dbc.Row([
+        dbc.Col(dcc.Dropdown(options=[], multi=False, searchable=True, placeholder='First coach', id='connect_coach_a'),
+                width={'size': 3, 'offset': 1}),
+        dbc.Col(dcc.Dropdown(options=[], multi=False, searchable=True, placeholder='Second coach', id='connect_coach_b'),
+                width={'size': 3}),
+        dbc.Col(dbc.Input(id='connect_start_year', type='number', placeholder='From year'), width={'size': 1}),
+        dbc.Col(dbc.Input(id='connect_end_year', type='number', placeholder='To year'), width={'size': 1}),
+        dbc.Col(dbc.Input(id='connect_min_overlap', type='number', min=1, step=1, value=1, placeholder='Min. years'),
+                width={'size': 1}),
+        dbc.Col(dbc.Button("Connect", id='connect_button', n_clicks=0, color="primary"), width={'size': 'auto'}),
+    ],),
+
+    dbc.Row([
+        dbc.Col(html.Div(id='connection-path', style={'padding': '10px'}), width={'size': 10, 'offset': 1}),
+    ],),
+
+    dbc.Row([
+        dbc.Col(html.H5('Staff Continuity'), width={'size': 'auto', 'offset': 1}),
+        dbc.Col(dbc.Button("Load Staff Continuity Metrics", id='metrics_button', n_clicks=0, color="primary"),
+                width={'size': 'auto'}),
+    ],),
+
+    dbc.Row([
+        dbc.Col(dash_table.DataTable(
+                id='staff_metrics_table',
+                data=[],
+                columns=[],
+                filter_action='native',
+                sort_action='native',
+                page_size=20,
+                export_format='csv',
+                style_table={'overflowX': 'auto'}
+            ), width={'size': 10, 'offset': 1}
+        ),
+    ],),
+
+    dbc.Row([
+        dbc.Col(html.H5('Coaching Flow Between Programs'), width={'size': 'auto', 'offset': 1}),
+        dbc.Col(dbc.Input(id='flow_start_year', type='number', placeholder='From year'), width={'size': 1}),
+        dbc.Col(dbc.Input(id='flow_end_year', type='number', placeholder='To year'), width={'size': 1}),
+        dbc.Col(dbc.Input(id='flow_top_teams', type='number', min=2, step=1, value=25, placeholder='Teams'),
+                width={'size': 1}),
+        dbc.Col(dbc.Button("Show Coaching Flow", id='flow_button', n_clicks=0, color="primary"), width={'size': 'auto'}),
+        dbc.Col(html.Div(id='flow-message'), width={'size': 'auto'}),
+    ],),
+
+    dbc.Row([
+        dbc.Col(dcc.Graph(id='flow_heatmap', figure={}), width={'size': 10, 'offset': 1}),
+    ],),
+
+    dbc.Row([
+        dbc.Col(dash_table.DataTable(
+                id='flow_table',
+                data=[],
+                columns=[],
+                filter_action='native',
+                sort_action='native',
+                page_size=20,
+                export_format='csv',
+                style_table={'overflowX': 'auto'}
+            ), width={'size': 10, 'offset': 1}
+        ),
+    ],),
 ])
 
 @app.callback(
-    Output('main_graph', 'elements'),
+    Output('full_elements_store', 'data'),
     Output('team_select', 'options'),
     Output('year_select', 'options'),
+    Output('graph_source', 'data'),
+    State('full_graph_toggle', 'value'),
+    State('aggregate_toggle', 'value'),
+    Input('JSON-direct-load-button', 'n_clicks'),
+    prevent_initial_call=True
+)
+@instrument_callback
+def generate_graph(full_graph_toggle, aggregate_toggle, _json_clicks):
+    """
+    Generates graph from a local JSON file. May or not load initial network visualization based on user toggle.
+    Uploaded CSV files are handled separately in the background by :func:`process_csv_upload`.
+
+    With the aggregate toggle on, the full network is collapsed into team super-nodes
+    (see :func:`dash_graph_internals.aggregated_team_view`), which :func:`expand_team_cluster` drills into.
+
+    The elements are sent to 'full_elements_store', which caches them in the browser. The main graph
+    is filled from the store clientside, so resetting the graph never needs to reach the server.
+
+    Args:
+        full_graph_toggle (bool): Whether the full initial network should be displayed
+        aggregate_toggle (bool): Whether the full network should be collapsed into teams
+        _json_clicks (int): Part of how Dash tracks when buttons have been clicked, unused but needed
+
+    Returns:
+        elements (list): List of JSON objects representing nodes and edges, 
+        given to the browser-side element store to create the main cytoscape graph
+        teams_list (list): List of all unique teams found, given to the team selection dropdown
+        years_list (list): List of all unique years found, given to the year selection dropdown
+        graph_source (dict): Where the elements came from, stored in 'graph_source'
+    """
+    graph_source = {'type': 'json'}
+    teams_list, years_list = load_dropdown_options() # Manifest only, elements are loaded per selection
+    if full_graph_toggle == False:
+        return [], teams_list, years_list, graph_source
+    if aggregate_toggle:
+        return trim_elements(aggregated_team_view(load_team_clusters(graph_source))), teams_list, years_list, graph_source
+    
+    elements, _, _ = parse_json_file()
+    return trim_elements(elements), teams_list, years_list, graph_source
+
+@app.callback(
+    Output('full_elements_store', 'data', allow_duplicate=True),
+    Output('team_select', 'options', allow_duplicate=True),
+    Output('year_select', 'options', allow_duplicate=True),
+    Output('graph_source', 'data', allow_duplicate=True),
     Input('upload-data', 'contents'),
     State('upload-data', 'filename'),
     State('full_graph_toggle', 'value'),
-    Input('JSON-direct-load-button', 'n_clicks'),
+    State('aggregate_toggle', 'value'),
+    background=True,
+    progress=[Output('upload-progress', 'value'), Output('upload-progress', 'label')],
+    running=[(Output('upload-data', 'disabled'), True, False)],
+    prevent_initial_call=True
 )
-def generate_graph(contents, filename, full_graph_toggle, _json_clicks):
+@instrument_background_callback(background_cache)
+def process_csv_upload(set_progress, contents, filename, full_graph_toggle, aggregate_toggle):
     """
-    Generates graph from either an uploaded CSV file or from a local JSON file, 
-    depending on user action. May or not load initial network visualization based on user toggle.
+    Generates graph from an uploaded CSV file as a background callback, so building the graph does not block
+    a server worker or hit request timeouts. Progress is reported to the 'upload-progress' bar.
+
+    Results are cached in `background_cache` by the upload's content hash, re-uploading the same file
+    returns instantly. See :func:`dash_graph_internals.parse_csv_file`.
 
     Args:
+        set_progress (callable): Provided by Dash, updates the 'upload-progress' bar's value and label
         contents (file contents): Data uploaded to the html.A 'Select a CSV File', will be decoded
         filename (str): File name of file uploaded to the html.A
-        _json_clicks (int): Part of how Dash tracks when buttons have been clicked, unused but needed
+        full_graph_toggle (bool): Whether the full initial network should be displayed
+        aggregate_toggle (bool): Whether the full network should be collapsed into teams
 
     Returns:
         elements (list): List of JSON objects representing nodes and edges, 
-        given and read to create the main cytoscape graph
+        given to the browser-side element store to create the main cytoscape graph
         teams_list (list): List of all unique teams found, given to the team selection dropdown
         years_list (list): List of all unique years found, given to the year selection dropdown
+        graph_source (dict): Where the elements came from (the upload's cache key), stored in 'graph_source'
     """
-    ctx = callback_context
-    if not ctx.triggered:
-        return [], [], []
-    trigger_id = get_id_of_triggered(ctx)
+    if contents is None:
+        return dash.no_update, dash.no_update, dash.no_update, dash.no_update
 
-    if trigger_id == 'upload-data' and contents is not None:
-        # CSV logic
-        elements, teams_list, years_list = parse_csv_file(contents, filename)
-        if full_graph_toggle == False:
-            return [], teams_list, years_list
-        
-        return elements, teams_list, years_list
-    
-    elif trigger_id == 'JSON-direct-load-button':
-        # JSON logic
-        elements, teams_list, years_list = parse_json_file()
-        if full_graph_toggle == False:
-            return [], teams_list, years_list
-        
-        return elements, teams_list, years_list
-    
+    elements, teams_list, years_list = parse_csv_file(
+        contents, filename,
+        progress_callback=lambda percent, label: set_progress((percent, label)),
+        result_cache=background_cache
+    )
+    graph_source = {'type': 'csv', 'key': upload_cache_key(contents)}
+    if full_graph_toggle == False:
+        return [], teams_list, years_list, graph_source
+    if aggregate_toggle:
+        return trim_elements(aggregated_team_view(build_team_clusters(elements))), teams_list, years_list, graph_source
+
+    return trim_elements(elements), teams_list, years_list, graph_source
+
+def load_team_clusters(graph_source: dict) -> dict:
+    """
+    Returns the team index (see :func:`dash_graph_internals.build_team_clusters`) of the loaded elements,
+    built once per source and dataset version.
+
+    Args:
+        graph_source (dict): Contents of the 'graph_source' store, {'type': 'json'} or {'type': 'csv', 'key': cache key}
+    """
+    if graph_source.get('type') == 'csv':
+        return _cached_team_clusters('csv', graph_source['key'])
+    return _cached_team_clusters('json', dataset_version())
+
+@functools.lru_cache(maxsize=4)
+def _cached_team_clusters(source_type: str, key: str) -> dict:
+    if source_type == 'csv':
+        elements, _, _ = background_cache.get(key, ([], [], []))
     else:
-        return [], [], []
+        elements, _, _ = parse_json_file()
+    return build_team_clusters(elements)
 
 @app.callback(
+    Output('main_graph', 'elements', allow_duplicate=True),
+    Output('main_graph_element_ids', 'data', allow_duplicate=True),
+    Input('main_graph', 'tapNodeData'),
+    State('graph_source', 'data'),
+    prevent_initial_call=True
+)
+@instrument_callback
+def expand_team_cluster(clickData, graph_source):
+    """
+    Drills down into a team super-node of the aggregated full-network view when it is clicked. 
+    Only one team is expanded at a time, clicking another team collapses the previous one.
+
+    Args:
+        clickData (dict): Dash sends the data of the clicked node this way
+        graph_source (dict): Where the loaded elements came from, see :func:`load_team_clusters`
+
+    Returns:
+        elements (list): Aggregated view with the clicked team expanded into its coaches, \
+            created by :func:`dash_graph_internals.aggregated_team_view`
+        element_ids: Ids of the displayed elements, for later delta updates
+    """
+    if not clickData or 'cluster' not in clickData or not graph_source:
+        return dash.no_update, dash.no_update
+
+    return element_delta(None, trim_elements(aggregated_team_view(load_team_clusters(graph_source), expanded_team=clickData['cluster'])))
+
+# Pure UI-state transitions are handled in the browser, see `clientside_callbacks.py`
+app.clientside_callback(
+    show_full_elements_js,
+    Output('main_graph', 'elements'),
+    Output('main_graph', 'layout', allow_duplicate=True),
+    Output('main_graph_element_ids', 'data'),
+    Input('full_elements_store', 'data'),
+    prevent_initial_call=True
+)
+
+app.clientside_callback(
+    add_team_year_combos_js,
     Output('team_year_combo_display', 'children'),
     Output('team_year_combo_store', 'data'),
+    Input('team_year_combo_button', 'n_clicks'),
+    State('team_year_combo_store', 'data'),
+    State('team_select', 'value'),
+    State('year_select', 'value'),
+    prevent_initial_call=True
+)
+
+app.clientside_callback(
+    clear_parameters_js,
+    Output('team_year_combo_display', 'children', allow_duplicate=True),
+    Output('team_year_combo_store', 'data', allow_duplicate=True),
+    Output('main_graph', 'layout', allow_duplicate=True),
+    Output('main_graph', 'stylesheet', allow_duplicate=True),
+    Output('main_graph', 'elements', allow_duplicate=True),
+    Output('empty-parameter-warning', 'is_open', allow_duplicate=True),
+    Output('legend-container', 'children', allow_duplicate=True),
+    Output('all-all-warning', 'is_open', allow_duplicate=True),
+    Output('main_graph_element_ids', 'data', allow_duplicate=True),
+    Input('clear_params', 'n_clicks'),
+    State('full_graph_toggle', 'value'),
+    State('full_elements_store', 'data'),
+    prevent_initial_call=True
+)
+
+app.clientside_callback(
+    reset_season_window_js,
+    Output('season_window', 'data', allow_duplicate=True),
+    Input('update_button', 'n_clicks'),
+    Input('clear_params', 'n_clicks'),
+    Input('full_elements_store', 'data'),
+    prevent_initial_call=True
+)
+
+@app.callback(
     Output('main_graph', 'layout'),
     Output('main_graph', 'stylesheet'),
     Output('main_graph', 'elements', allow_duplicate=True),
     Output('empty-parameter-warning', 'is_open'),
     Output('legend-container', 'children'),
     Output('all-all-warning', 'is_open'),
-    Input('team_year_combo_button', 'n_clicks'),
+    Output('main_graph_element_ids', 'data', allow_duplicate=True),
     Input('update_button', 'n_clicks'),
-    Input('clear_params', 'n_clicks'),
     State('team_year_combo_store', 'data'),
-    State('team_select', 'value'),
-    State('year_select', 'value'),
-    State('main_graph', 'elements'),
     State('team_select', 'options'),
     State('year_select', 'options'),
-    State('full_graph_toggle', 'value'),
+    State('main_graph_element_ids', 'data'),
     prevent_initial_call=True
-) # Rework clear params to work with full graph toggle
-def update_main_graph(
-    combo_n_clicks, _update_n_clicks, _clear_n_clicks,
-    current_selected_combos, team_selection, year_selections,
-    current_elements, team_options, year_options, full_graph_toggle
-):   
+)
+@instrument_callback
+def update_main_graph(_update_n_clicks, current_selected_combos, team_options, year_options, current_element_ids):   
     """
-    Logic to handle all versions of updating the main graph interface, including adding
-    new (team, year) combinations, updating the graph based on selected combinations, and
-    clearing all parameters to reset the graph.
+    Logic to handle updating the main graph interface based on the selected (team, year) combinations.
+    Adding combinations and clearing parameters only change UI state, and are handled by the clientside
+    callbacks defined in `clientside_callbacks.py`.
 
     Args:
-        combo_n_clicks (int): How many times the 'Add combination' button has been selected. \
-            Required for callback_context tracking
         _update_n_clicks (int): How many times the 'Update Parameters' button has been selected. \
             Required for callback_context tracking
-        _clear_n_clicks: How many times the 'Clear Parameters' button has been selected. \
-            Required for callback_context tracking
         current_selected_combos (list): List of currently selected combinations pulled from \
             'team_year_combo_store'
-        team_selection (str): Current team selected in the team select dropdown
-        year_selections (list or str): Years currently being selected in the year select dropdown
-        elements (list): Elements from the main cytoscape graph (nodes + edges as JSON objects)
         team_options (list): All values from the team selection dropdown. Needed to handle 'All' selection
         year_options (list): All values from the year selection dropdown. Needed to handle 'All' selection
+        current_element_ids (list): Ids of the elements currently in the main graph, in display order
 
     Returns
-        Tuple[str, list, dict, dict, bool, list, bool]: A tuple containing:
-            - team_year_combo_display (str): String to be printed in html.Pre object of the same name. Lists all selected combinations
-            - team_year_combo_data (list): List of tuples to be stored in 'team_year_combo_store' and later pulled
+        Tuple[dict, dict, list, bool, list, bool, list]: A tuple containing:
             - layout: Layout arguments to be passed to the main cytoscape graph
             - stylesheet: Stylesheet arguments to be passed to the main cytoscape graph
+            - elements: Trimmed elements (nodes + edges) for the selected combinations, sent as a partial \
+            update of only the added and removed elements when that is smaller
             - display_empty_param_warning (bool): Whether the empty parameter warning (dcc.ConfirmDialog) shoud be displayed
             - legend: The color legend to be contained within 'legend-container'
             - all_all_warning_display (bool): Whether the warning (dcc.ConfirmDialog) for selecting 'All' and 'All' should be displayed
+            - element_ids (list): Ids of the elements in the main graph after the update
 
     ### Behavior
 
-    Clear Parameter Behavior:
-        Clear display and storage data, return to circle layout and default stylesheet, clear legend
-    
-    Adding Combinations Behavior:
-        - If information is incomplete, don't update anything
-        - Else, turn selections into lists and iterate to produce combinations
-        - Combine new combinations with combinations in data storage
-        - Return updated display and data storage, no update to other returns
-
     Update Button Behavior:
-        - Pull stored combinations, retuple for consistency
-        - Iterate through combinations
-            - Special behavior for 'All' selections, creates additional new combinations
-        - Generates selector arguments for the stylesheet and legend with 
-        :func:`dash_graph_internals.generate_legend_and_highlights`
+        - Pull stored combinations, expand 'All' selections and sort them with \
+        :func:`dash_graph_internals.normalize_combo_selection`
+        - Look up the normalized combinations (plus the dataset version) in `query_cache`
+            - On a hit, return the cached elements, stylesheet and legend without recomputation
+        - Otherwise, generates selector arguments for the stylesheet and legend with 
+        :func:`dash_graph_internals.generate_legend_and_highlights`, computes a circle of node positions \
+        with :func:`dash_graph_internals.circle_layout_positions` (sent as a preset layout) and caches the result
+        - Elements only keep the fields Cytoscape needs (:func:`dash_graph_internals.trim_elements`) and are \
+        sent as a delta against the displayed elements (:func:`dash_graph_internals.element_delta`)
     """
-    ctx = dash.callback_context
-    
-    full_elements_list, _, _ = parse_json_file()
-    
-    if not ctx.triggered:
-        # return all outputs as dash.no_update or empty
-        team_year_combo_display = ""
-        team_year_combo_data = []
+    if not current_selected_combos:
         layout = dash.no_update
         stylesheet = dash.no_update
-        new_elements = current_elements
-        display_empty_param_warning = False
-        legend = None
-        all_all_warning_display = False
-        
-        return team_year_combo_display, team_year_combo_data, layout, stylesheet, \
-            new_elements, display_empty_param_warning, legend, all_all_warning_display
-
-    trigger_id = get_id_of_triggered(ctx)
-
-    # Handle clear
-    if trigger_id == "clear_params":
-        if full_graph_toggle == False:
-            team_year_combo_display = ""
-            team_year_combo_data = []
-            layout = {'name': 'circle'}
-            stylesheet = default_stylesheet
-            new_elements = []
-            display_empty_param_warning = False
-            legend = None
-            all_all_warning_display = False
-
-            return team_year_combo_display, team_year_combo_data, layout, stylesheet, \
-            new_elements, display_empty_param_warning, legend, all_all_warning_display
-
-        team_year_combo_display = ""
-        team_year_combo_data = []
-        layout = {'name': 'circle'}
-        stylesheet = default_stylesheet
-        new_elements = full_elements_list
-        display_empty_param_warning = False
-        legend = None
+        new_elements = dash.no_update
+        display_empty_param_warning = True
+        legend = dash.no_update
         all_all_warning_display = False
-        
-        return team_year_combo_display, team_year_combo_data, layout, stylesheet, \
-            new_elements, display_empty_param_warning, legend, all_all_warning_display
-
-    # Handle triggering 'adding combinations' button
-    if trigger_id == "team_year_combo_button":
-        # If information is incomplete
-        if combo_n_clicks == 0 or team_selection is None or year_selections is None:
-            team_year_combo_display = dash.no_update
-            team_year_combo_data = dash.no_update
-            layout = dash.no_update
-            stylesheet = dash.no_update
-            new_elements = current_elements
-            display_empty_param_warning = False
-            legend = None
-            all_all_warning_display = False
-            
-            return team_year_combo_display, team_year_combo_data, layout, stylesheet, \
-            new_elements, display_empty_param_warning, legend, all_all_warning_display
-        
-        # Turn single values into lists for consistent iteration
-        if not isinstance(team_selection, list):
-            team_selection = [team_selection] 
-        if not isinstance(year_selections, list):
-            year_selections = [year_selections]
-        new_team_year_combos = list(itertools.product(team_selection, year_selections))
-        
-        if current_selected_combos is None:
-            current_selected_combos = []
-        # Convert everything to tuples for consistency
-        # dcc.storage unpacks tuples when converting to JSON
-        current_selected_combos = [tuple(x) for x in current_selected_combos]
-        new_team_year_combos = [tuple(x) for x in new_team_year_combos]
-        team_year_combos = list(set(current_selected_combos + new_team_year_combos))
-        combo_strings = [f"{team} - {year}" for team, year in team_year_combos]
-        
-        team_year_combo_display = ", ".join(combo_strings)
-        team_year_combo_data = team_year_combos
+
+        return layout, stylesheet, new_elements, display_empty_param_warning, legend, all_all_warning_display, dash.no_update
+    
+    # Expands 'All' selections and sorts, so repeated selections share a cache key
+    normalized_combos = normalize_combo_selection(current_selected_combos, team_options, year_options)
+
+    if normalized_combos is None: # ('All', 'All') selected
         layout = dash.no_update
         stylesheet = dash.no_update
-        new_elements = current_elements
+        new_elements = dash.no_update
         display_empty_param_warning = False
-        legend = None
-        all_all_warning_display = False
-        return team_year_combo_display, team_year_combo_data, layout, stylesheet, \
-            new_elements, display_empty_param_warning, legend, all_all_warning_display
-
-    # Handle update button
-    if trigger_id == "update_button":
-
-        if current_selected_combos == []:
-            team_year_combo_display = dash.no_update
-            team_year_combo_data = dash.no_update
-            layout = dash.no_update
-            stylesheet = dash.no_update
-            new_elements = current_elements
-            display_empty_param_warning = True
-            legend = dash.no_update
-            all_all_warning_display = False
-
-            return team_year_combo_display, team_year_combo_data, layout, stylesheet, \
-                new_elements, display_empty_param_warning, legend, all_all_warning_display
-        
-        # Re-tuple again when pulling from storage for consistency
-        tupled_current_combos = [tuple(x) for x in current_selected_combos] 
-
-        for combo in tupled_current_combos:
-            team, year = combo
-            if team == "All" and year == "All":
-                team_year_combo_display = dash.no_update
-                team_year_combo_data = dash.no_update
-                layout = dash.no_update
-                stylesheet = dash.no_update
-                new_elements = current_elements
-                display_empty_param_warning = False
-                legend = dash.no_update
-                all_all_warning_display = True
-                
-                return team_year_combo_display, team_year_combo_data, layout, stylesheet, \
-                    display_empty_param_warning, legend, all_all_warning_display
-            
-            elif team == "All":
-                tupled_current_combos = handle_all_selection(tupled_current_combos, team_options, year, team_or_year="team")
-            
-            elif year == "All":
-                tupled_current_combos = handle_all_selection(tupled_current_combos, year_options, team, team_or_year="year")
-
-        final_combo_list = list(set(tupled_current_combos))
+        legend = dash.no_update
+        all_all_warning_display = True
 
-        new_elements, highlight_styles, legend_items = generate_legend_and_highlights(final_combo_list, full_elements_list)
+        return layout, stylesheet, new_elements, display_empty_param_warning, legend, all_all_warning_display, dash.no_update
 
-        team_year_combo_display = dash.no_update
-        team_year_combo_data = dash.no_update
-        layout = {'name': 'circle', 
-                  'animate': True}
+    cache_key = query_cache.make_key(normalized_combos, dataset_version())
+    cached_result = query_cache.get(cache_key)
+    if cached_result is None:
+        selection_elements = load_selection_elements({team for team, _ in normalized_combos})
+        new_elements, highlight_styles, legend_items = generate_legend_and_highlights(list(normalized_combos), selection_elements)
+        new_elements = trim_elements(new_elements)
         stylesheet = unselected_stylesheet + highlight_styles
-        new_elements = new_elements
-        display_empty_param_warning = False
         legend = html.Div(legend_items, 
                           style={'padding': '10px', 'border': '1px solid #ccc', 'display': 'inline-block'})
-        all_all_warning_display = False
-        
-        import uuid
+        node_ids = [el['data']['id'] for el in new_elements if 'source' not in el['data']]
+        layout = {'name': 'preset', 
+                  'positions': circle_layout_positions(node_ids),
+                  'animate': True}
+        query_cache.put(cache_key, (new_elements, stylesheet, legend, layout))
+    else:
+        new_elements, stylesheet, legend, layout = cached_result
 
+    new_elements, new_element_ids = element_delta(current_element_ids, new_elements)
+    display_empty_param_warning = False
+    all_all_warning_display = False
 
-        return team_year_combo_display, team_year_combo_data, layout, stylesheet, \
-                new_elements, display_empty_param_warning, legend, all_all_warning_display
-    
-    else:
-        team_year_combo_display = dash.no_update
-        team_year_combo_data = dash.no_update
-        layout = dash.no_update
-        stylesheet = dash.no_update
-        new_elements = current_elements
-        display_empty_param_warning = False
-        legend = dash.no_update
-        all_all_warning_display = False
-        
-        return team_year_combo_display, team_year_combo_data, layout, stylesheet, \
-        new_elements, display_empty_param_warning, legend, all_all_warning_display
+    return layout, stylesheet, new_elements, display_empty_param_warning, legend, all_all_warning_display, new_element_ids
+
+@app.callback(
+    Output('element-details', 'children'),
+    Input('main_graph', 'tapEdgeData'),
+    State('graph_source', 'data'),
+    prevent_initial_call=True
+)
+@instrument_callback
+def display_edge_details(edgeData, graph_source):
+    """
+    Fetches the full details of a clicked edge on demand, as main graph elements only carry
+    the fields needed for drawing (see :func:`dash_graph_internals.trim_element`).
+
+    Args:
+        edgeData (dict): Dash sends the (trimmed) data of the clicked edge this way
+        graph_source (dict): Where the displayed elements came from, see :func:`load_team_clusters`
+
+    Returns:
+        A description of the connection: both coaches' positions, the team, shared years and mentor status
+    """
+    if not edgeData or 'id' not in edgeData or 'weight' in edgeData: # Aggregated team edges have no details
+        return dash.no_update
+
+    details = lookup_element_details(edgeData['id'], graph_source, result_cache=background_cache)
+    if details is None:
+        return ""
+
+    years = ", ".join(str(year) for year in sorted(details.get('years_of_connection', [])))
+    return (f"{details.get('source')} ({details.get('source_position')}) and {details.get('target')} "
+            f"({details.get('target_position')}) coached together at {details.get('team_of_connection')} in {years}. "
+            f"Mentor status: {details.get('mentor_status')}")
+
+def coach_history_display(coach: str):
+    """
+    Creates the display of a coach's employment history: a header and one button per (team, year) coached,
+    each button opening that staff's hierarchy in the subgraph (see :func:`handle_coach_button_click`).
+    The history is looked up in the career index built by :func:`coach_index.load_coach_index`.
+    """
+    coach_employment_history = load_coach_index(ROSTER_CSV_PATH).history(coach)
+
+    coached_buttons = [
+        dbc.Button(sentence, 
+                    id={'type': 'coach-btn', 'action': 'year-coach-tree', 'coach': coach, 'team': team, 'year': year},
+                    color='info',
+                    style={
+                        'marginBottom': '10px',
+                        'display': 'block',      
+                        'marginLeft': 'auto',  
+                        'marginRight': 'auto',
+                    }
+                )
+                    for sentence, team, year, _position in coach_employment_history
+    ]
+    return coached_buttons
 
 @app.callback(
     Output('coach-name-click', 'children'),
@@ -484,48 +765,360 @@ def update_main_graph(
     Input('main_graph', 'tapNodeData'),
     prevent_initial_call=True
 )
+@instrument_callback
 def display_click_data(clickData):
     """
     Reads when a user clicks a node, displays who they clicked and buttons for each year the coach was employed
 
     Args:
         clickData (dict): Dash sends the data of the clicked node this way
-        full_elements_list (list): List of all elements in the main cytoscape
     
     Returns
         - Sentence of which coach was clicked to be displayed
-        - Buttons for each year in the coaches employment history, generated by \
-            :func:`dash_graph_internals.gather_coaching_positions`
+        - Buttons for each year in the coaches employment history, generated by :func:`coach_history_display`
 
     Behavior:
         - Reads clicked coach's name
-        - Gathers their employment history with :func:`dash_graph_internals.gather_coaching_positions`
+        - Looks up their employment history in the coach career index
         - Uses the employment history to generate buttons for each year
     """
-    full_elements_list, _, _ = parse_json_file()
-    
+    if clickData and 'cluster' in clickData: # Team super-nodes are handled by expand_team_cluster
+        return dash.no_update, dash.no_update
+
     if clickData and 'id' in clickData: # id check ensures user clicked a node, not an edge
         clicked_coach = clickData['coach_name']
-        coach_employment_history = gather_coaching_positions(full_elements_list, clicked_coach)
-
-        coached_buttons = [
-            dbc.Button(sentence, 
-                        id={'type': 'coach-btn', 'action': 'year-coach-tree', 'coach': clicked_coach, 'team': team, 'year': year},
-                        color='info',
-                        style={
-                            'marginBottom': '10px',
-                            'display': 'block',      
-                            'marginLeft': 'auto',  
-                            'marginRight': 'auto',
-                        }
-                    )
-                        for sentence, team, year in coach_employment_history
-        ]
-            
-        return f"You clicked {clicked_coach}", coached_buttons
+        return f"You clicked {clicked_coach}", coach_history_display(clicked_coach)
     
     else:
         return "Click a node", []
+
+@app.callback(
+    Output('coach_search', 'options'),
+    Input('coach_search', 'search_value'),
+    State('coach_search', 'value'),
+    prevent_initial_call=True
+)
+@instrument_callback
+def update_coach_search_options(search_value, selected_coach):
+    """
+    Typeahead for the coach search box, finds coaches whose name (or last name) starts with the typed text
+    using the prefix index of :class:`coach_index.CoachCareerIndex`. Keeps the selected coach in the options.
+    """
+    return coach_search_options(search_value, selected_coach)
+
+def coach_search_options(search_value: str, selected_coach: str):
+    """Dropdown options for a coach typeahead box, shared by every coach search box"""
+    if not search_value:
+        return dash.no_update
+    matches = load_coach_index(ROSTER_CSV_PATH).search(search_value)
+    if selected_coach and selected_coach not in matches:
+        matches = [selected_coach] + matches
+    return [{'label': name, 'value': name} for name in matches]
+
+@app.callback(
+    Output('connect_coach_a', 'options'),
+    Input('connect_coach_a', 'search_value'),
+    State('connect_coach_a', 'value'),
+    prevent_initial_call=True
+)
+@instrument_callback
+def update_connect_coach_a_options(search_value, selected_coach):
+    return coach_search_options(search_value, selected_coach)
+
+@app.callback(
+    Output('connect_coach_b', 'options'),
+    Input('connect_coach_b', 'search_value'),
+    State('connect_coach_b', 'value'),
+    prevent_initial_call=True
+)
+@instrument_callback
+def update_connect_coach_b_options(search_value, selected_coach):
+    return coach_search_options(search_value, selected_coach)
+
+def parse_whole_number(value):
+    """
+    Converts the value of a numeric dbc.Input to an int, None when the input is blank. dbc.Input sends floats (and
+    strings from older clients), so this raises ValueError for anything that is not a whole number
+    """
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return None
+    number = float(value)
+    if not number.is_integer():
+        raise ValueError(f"{value} is not a whole number")
+    return int(number)
+
+def parse_season_input(value):
+    """Converts the value of a numeric season input to an int, None when the input is blank, see :func:`parse_whole_number`"""
+    return parse_whole_number(value)
+
+def parse_season_range(start_year, end_year) -> tuple:
+    """
+    Converts the values of a pair of season inputs to (first season, last season), blank ends staying None.
+
+    Raises:
+        ValueError: With a message for the user, if a season is not a whole year or the first is after the last
+    """
+    try:
+        start_year, end_year = parse_season_input(start_year), parse_season_input(end_year)
+    except ValueError:
+        raise ValueError("Please enter seasons as whole years, ex: 2015") from None
+    if start_year is not None and end_year is not None and start_year > end_year:
+        raise ValueError(f"The first season ({start_year}) must not be after the last season ({end_year})")
+    return start_year, end_year
+
+def parse_count_input(value, default: int, description: str) -> int:
+    """
+    Converts the value of a numeric count input (tree depth, number of teams...) to a positive int, default when blank.
+
+    Raises:
+        ValueError: With a message for the user naming the count (description), if it is not a whole number of at least 1
+    """
+    try:
+        count = parse_whole_number(value)
+    except ValueError:
+        count = 0
+    if count is None:
+        return default
+    if count < 1:
+        raise ValueError(f"Please enter a whole number of {description} of at least 1")
+    return count
+
+@app.callback(
+    Output('connection-path', 'children'),
+    Input('connect_button', 'n_clicks'),
+    State('connect_coach_a', 'value'),
+    State('connect_coach_b', 'value'),
+    State('connect_start_year', 'value'),
+    State('connect_end_year', 'value'),
+    State('connect_min_overlap', 'value'),
+    prevent_initial_call=True
+)
+@instrument_callback
+def display_coach_connection(_n_clicks, coach_a, coach_b, start_year, end_year, min_overlap):
+    """
+    Displays the shortest chain of shared staffs between two coaches, one hop per line with the team and
+    shared years, found by :meth:`basic_graph_generation.CoachAdjacency.find_connection`.
+    """
+    if not coach_a or not coach_b:
+        return "Please select two coaches to connect"
+    try:
+        start_year, end_year = parse_season_range(start_year, end_year)
+        min_overlap = parse_count_input(min_overlap, 1, 'shared seasons')
+    except ValueError as error:
+        return str(error)
+
+    hops = cached_coach_adjacency(dataset_version()).find_connection(coach_a, coach_b, start_year, end_year, min_overlap)
+    if hops is None:
+        return f"No connection found between {coach_a} and {coach_b} with these filters"
+    if not hops:
+        return f"{coach_a} is the same coach"
+
+    hop_lines = [html.Li(f"{coach} and {next_coach} coached together at {team} in {', '.join(str(year) for year in years)}")
+                 for coach, next_coach, team, years in hops]
+    return [html.H6(f"{coach_a} is {len(hops)} degree{'s' if len(hops) > 1 else ''} of separation from {coach_b}"),
+            html.Ol(hop_lines)]
+
+@app.callback(
+    Output('season_slider', 'min'),
+    Output('season_slider', 'max'),
+    Output('season_slider', 'marks'),
+    Output('season_slider', 'value'),
+    Input('year_select', 'options'),
+    prevent_initial_call=True
+)
+@instrument_callback
+def update_season_slider(year_options):
+    """Fits the season slider to the years of the loaded dataset, starting on the most recent season"""
+    years = [year for year in (year_options or []) if year != 'All']
+    if not years:
+        return dash.no_update, dash.no_update, dash.no_update, dash.no_update
+    first, last = min(years), max(years)
+    marks = {year: str(year) for year in range(first, last + 1) if year % 5 == 0}
+    return first, last, marks, [last, last]
+
+@app.callback(
+    Output('main_graph', 'elements', allow_duplicate=True),
+    Output('main_graph', 'layout', allow_duplicate=True),
+    Output('main_graph', 'stylesheet', allow_duplicate=True),
+    Output('main_graph_element_ids', 'data', allow_duplicate=True),
+    Output('season_window', 'data'),
+    Input('season_button', 'n_clicks'),
+    Input('season_slider', 'value'),
+    State('main_graph_element_ids', 'data'),
+    State('season_window', 'data'),
+    prevent_initial_call=True
+)
+@instrument_callback
+def show_season_network(_n_clicks, slider_value, current_element_ids, season_window):
+    """
+    Shows the network as it existed over the seasons selected on the slider, using the season index of
+    :class:`season_snapshots.SeasonSnapshots`.
+
+    The slider only drives the main graph once 'Show Season Network' was pressed, until the team/year selection, the
+    Clear button or a new file replaces the graph (which clears 'season_window'). When the graph still shows the
+    previous window, only the coaches and edges entering or leaving the window are sent (precomputed per season
+    for single-season moves). Otherwise the whole snapshot is sent with fixed preset positions for every coach.
+
+    Returns:
+        - elements (dash.Patch or list): Delta or full snapshot for main_graph
+        - layout (dict): Preset layout with every coach's position, or no_update for deltas
+        - stylesheet (list): Default stylesheet
+        - element_ids (list): Ids displayed after the update, for later delta updates
+        - season_window (list): [first season, last season] now displayed
+    """
+    if get_id_of_triggered(dash.callback_context) != 'season_button' and season_window is None:
+        return dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update
+    if not slider_value or slider_value == [0, 0]:
+        return dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update
+
+    snapshots = load_season_snapshots()
+    new_window = (int(slider_value[0]), int(slider_value[1]))
+    if season_window is not None and current_element_ids is not None \
+            and set(current_element_ids) == snapshots.snapshot_ids(*season_window):
+        removed_ids, added_elements = snapshots.delta(tuple(season_window), new_window)
+        elements, element_ids = patch_from_delta(current_element_ids, removed_ids, added_elements)
+        return elements, dash.no_update, dash.no_update, element_ids, list(new_window)
+
+    elements, element_ids = element_delta(current_element_ids, snapshots.snapshot(*new_window))
+    layout = {'name': 'preset', 'positions': snapshots.node_positions}
+    return elements, layout, default_stylesheet, element_ids, list(new_window)
+
+@app.callback(
+    Output('main_graph', 'elements', allow_duplicate=True),
+    Output('main_graph', 'stylesheet', allow_duplicate=True),
+    Input('community_toggle', 'value'),
+    State('main_graph_element_ids', 'data'),
+    State('main_graph', 'stylesheet'),
+    prevent_initial_call=True
+)
+@instrument_callback
+def color_by_community(community_toggle, current_element_ids, current_stylesheet):
+    """
+    Colors the displayed coaches by coaching family (see 'coaching_communities.py'). Communities are detected once
+    per dataset version and kept in the app's disk cache, so toggling only tags the displayed coaches with their
+    community number (a partial update of main_graph) and adds one stylesheet rule per colored community.
+    Only the community rules are added or removed, the highlights already in the stylesheet are kept.
+    """
+    stylesheet = without_community_rules(current_stylesheet or default_stylesheet)
+    if not community_toggle:
+        return dash.no_update, stylesheet
+    if not current_element_ids:
+        return dash.no_update, dash.no_update
+
+    communities = load_communities(cache_dir=background_cache.directory)
+    patched_elements = dash.Patch()
+    for idx, element_id in enumerate(current_element_ids):
+        if element_id in communities:
+            patched_elements[idx]['data']['community'] = communities[element_id]
+    return patched_elements, stylesheet + community_stylesheet(communities)
+
+@app.callback(
+    Output('staff_metrics_table', 'data'),
+    Output('staff_metrics_table', 'columns'),
+    Input('metrics_button', 'n_clicks'),
+    prevent_initial_call=True
+)
+@instrument_callback
+def display_staff_metrics(_n_clicks):
+    """
+    Loads the staff continuity metrics of every team-season (see :func:`staff_metrics.compute_staff_metrics`)
+    into a sortable, filterable table. Rates are rounded to 3 decimals for display.
+    """
+    metrics = load_staff_metrics(ROSTER_CSV_PATH).round(3)
+    columns = [{'name': column, 'id': column, 'type': 'text' if column in ('Team', 'Head Coach') else 'numeric'}
+               for column in metrics.columns]
+    return metrics.to_dict('records'), columns
+
+@app.callback(
+    Output('colleagues_table', 'data'),
+    Output('colleagues-header', 'children'),
+    Input('colleagues_button', 'n_clicks'),
+    State('coach_search', 'value'),
+    State('main_graph', 'tapNodeData'),
+    State('colleague_start_year', 'value'),
+    State('colleague_end_year', 'value'),
+    prevent_initial_call=True
+)
+@instrument_callback
+def display_colleagues(_n_clicks, searched_coach, tapped_node, start_year, end_year):
+    """
+    Lists every coach who shared a staff with the searched coach (or the last coach clicked in the main graph),
+    optionally within a range of seasons, from the tenure interval index (see :meth:`tenure_index.TenureIndex.colleagues`).
+    A blank year leaves that end of the range open.
+    """
+    coach = searched_coach or (tapped_node or {}).get('coach_name')
+    if not coach:
+        return [], "Search for or click on a coach to view their colleagues"
+
+    try:
+        start_year, end_year = parse_season_range(start_year, end_year)
+    except ValueError as error:
+        return [], str(error)
+
+    rows = load_tenure_index(ROSTER_CSV_PATH).colleagues(coach, start_year, end_year)
+    return [dict(zip(COLLEAGUE_COLUMNS, row)) for row in rows], f"{len(rows)} colleague stints of {coach}"
+
+@app.callback(
+    Output('flow_heatmap', 'figure'),
+    Output('flow_table', 'data'),
+    Output('flow_table', 'columns'),
+    Output('flow-message', 'children'),
+    Input('flow_button', 'n_clicks'),
+    State('flow_start_year', 'value'),
+    State('flow_end_year', 'value'),
+    State('flow_top_teams', 'value'),
+    prevent_initial_call=True
+)
+@instrument_callback
+def display_team_flow(_n_clicks, start_year, end_year, top_teams):
+    """
+    Displays how many coaches moved between programs over the selected seasons (see :func:`team_flow.compute_team_flows`):
+    a heatmap of the teams with the most movement, and the full exportable table of moves per season.
+    Invalid seasons or numbers of teams clear both and are explained in 'flow-message'.
+    """
+    import plotly.graph_objects as go
+
+    try:
+        start_year, end_year = parse_season_range(start_year, end_year)
+        top_teams = parse_count_input(top_teams, 25, 'teams')
+    except ValueError as error:
+        return {}, [], [], str(error)
+
+    flows = load_team_flows(ROSTER_CSV_PATH)
+    if start_year is not None:
+        flows = flows[flows['Season'] >= start_year]
+    if end_year is not None:
+        flows = flows[flows['Season'] <= end_year]
+    matrix = flow_matrix(flows, top_teams=top_teams)
+
+    figure = go.Figure(go.Heatmap(
+        z=matrix.to_numpy(), x=list(matrix.columns), y=list(matrix.index), colorscale='Blues',
+        hovertemplate='%{y} -> %{x}: %{z} coaches<extra></extra>'))
+    figure.update_layout(xaxis_title='To Team', yaxis_title='From Team', yaxis_autorange='reversed', height=700)
+    columns = [{'name': column, 'id': column, 'type': 'numeric' if column in ('Season', 'Coaches') else 'text'}
+               for column in flows.columns]
+    return figure, flows.to_dict('records'), columns, ""
+
+@functools.lru_cache(maxsize=2)
+def cached_coach_adjacency(_version: str):
+    """Integer adjacency of the loaded elements used for connection searches, built once per dataset version"""
+    from basic_graph_generation import CoachAdjacency
+
+    elements, _, _ = parse_json_file()
+    return CoachAdjacency.from_elements(elements)
+
+@app.callback(
+    Output('coach-name-click', 'children', allow_duplicate=True),
+    Output('coach-teams-buttons', 'children', allow_duplicate=True),
+    Input('coach_search', 'value'),
+    prevent_initial_call=True
+)
+@instrument_callback
+def display_searched_coach(selected_coach):
+    """Displays the employment history of the coach selected in the search box, see :func:`display_click_data`"""
+    if not selected_coach:
+        return dash.no_update, dash.no_update
+    return f"You searched for {selected_coach}", coach_history_display(selected_coach)
     
 @app.callback(
     Output('sub_graph', 'elements'),
@@ -536,6 +1129,7 @@ def display_click_data(clickData):
     State({'type': 'coach-btn', 'action': ALL, 'coach': ALL, 'team': ALL, 'year': ALL}, 'id'),
     prevent_initial_call=True
 )
+@instrument_callback
 def handle_coach_button_click(n_clicks_list, ids): # Error, not updating on second click
     """
     Triggers when one of the buttons created by :func:`display_click_data` is clicked, \
@@ -545,28 +1139,21 @@ def handle_coach_button_click(n_clicks_list, ids): # Error, not updating on seco
         n_clicks_list (list): List Dash uses to track the clicks on all created \
             buttons of class `coach-btn`
         ids (list): The ids of all the coach buttons
-        full_elements_list (list): List of all elements from the main cytoscape graph
 
     Returns
         - subgraph_elements (list): List of edges and nodes that make up subgraph, created by \
-        :func:`dash_graph_internals.created_bfs_graph_structure`
-        - subgraph_layout (dict): Arguments to add to the basic layout, defines the root as the analyzed \
-        staff's head coach
+        :func:`staff_roster.staff_hierarchy_elements`
+        - subgraph_layout (dict): Preset layout placing the staff in layers by encoded position, \
+        computed on the server by :func:`cached_staff_subgraph`
         - subgraph_stylesheet (dict): Default stylesheet for subgraphs defined in `dash_graph_internals` \
         plus an additional argument to highlight the coach the user initially selected for readability
 
     Behavior:
         - When a button is clicked, Dash sends an update to n_clicks_list
         - This is tracked and paired to the relevant id, which allows the code to pull needed information
-        - The unique encoded positions on the staff are found with \
-            :func:`dash_graph_internals.find_endcoded_levels_on_staff` (see definition for why this is needed)
-        - This list is passed to :func:`create_bfs_graph_structure` to generate the subgraph elements \
-            and identify the head coach
-        - The relevant subgraph_layout and subgraph_stylesheets are created based on the head coach and \
-            clicked coach data
-    """
-    full_elements_list, _, _ = parse_json_file()
-    
+        - The subgraph elements and layout are built by :func:`cached_staff_subgraph`, once per (team, year)
+        - The relevant subgraph_stylesheet is created based on the clicked coach data
+    """
     ctx = dash.callback_context
     if not ctx.triggered or all((n is None or n == 0) for n in n_clicks_list):
         subgraph_elements = dash.no_update
@@ -588,15 +1175,7 @@ def handle_coach_button_click(n_clicks_list, ids): # Error, not updating on seco
             team = btn_id['team']
             coach = btn_id['coach']
 
-            # First need to collect all encoded positions (solves issue of staff not having all levels listed)
-            encoded_pos_on_staff = find_encoded_levels_on_staff(full_elements_list, team, year)
-
-            subgraph_elements, graph_roots = create_bfs_graph_structure(full_elements_list, encoded_pos_on_staff, team, year)         
-
-            subgraph_layout = {
-                'name': 'breadthfirst',
-                'roots': ", ".join(f'[id = "{coach_name}"]' for coach_name in graph_roots)
-            }
+            subgraph_elements, subgraph_layout = cached_staff_subgraph(team, year, dataset_version(ROSTER_CSV_PATH))
         
             hightlight_clicked_coach = [{
                 'selector': f'node[id = "{coach}"]',
@@ -609,5 +1188,89 @@ def handle_coach_button_click(n_clicks_list, ids): # Error, not updating on seco
             return subgraph_elements, subgraph_layout, subgraph_stylesheet, staff_header
     return dash.no_update, dash.no_update, dash.no_update, ""
 
+@app.callback(
+    Output('tree_graph', 'elements'),
+    Output('tree_graph', 'layout'),
+    Output('tree_graph', 'stylesheet'),
+    Output('tree-header', 'children'),
+    Input('tree_button', 'n_clicks'),
+    State('coach_search', 'value'),
+    State('main_graph', 'tapNodeData'),
+    State('tree_direction', 'value'),
+    State('tree_depth', 'value'),
+    State('tree_start_year', 'value'),
+    State('tree_end_year', 'value'),
+    prevent_initial_call=True
+)
+@instrument_callback
+def show_coaching_tree(_n_clicks, searched_coach, tapped_node, direction, depth, start_year, end_year):
+    """
+    Displays the coaching tree of the searched coach (or the last coach clicked in the main graph),
+    computed by :meth:`coaching_tree.MentorIndex.tree` and laid out in mentor generations on the server.
+
+    Returns:
+        - tree_elements (list): Nodes and mentor -> mentee edges of the tree
+        - tree_layout (dict): Preset layout, one layer per generation
+        - tree_stylesheet (list): Default subgraph stylesheet with the root coach highlighted
+        - tree_header (str): Description of the tree, or why it could not be shown
+    """
+    root = searched_coach or (tapped_node or {}).get('coach_name')
+    if not root:
+        return dash.no_update, dash.no_update, dash.no_update, "Search for or click on a coach to view their coaching tree"
+
+    try:
+        start_year, end_year = parse_season_range(start_year, end_year)
+        depth = parse_count_input(depth, 1, 'generations')
+    except ValueError as error:
+        return dash.no_update, dash.no_update, dash.no_update, str(error)
+
+    tree_rows = load_mentor_index().tree(root, direction, depth, start_year, end_year)
+    if len(tree_rows) <= 1:
+        return [], dash.no_update, dash.no_update, f"No mentor relationships found for {root} with these filters"
+
+    tree_elements, node_levels = coaching_tree_elements(tree_rows, direction)
+    tree_layout = {
+        'name': 'preset',
+        'positions': hierarchy_layout_positions(node_levels)
+    }
+    highlight_root = [{
+        'selector': f'node[id = "{root}"]',
+        'style': {'background-color': '#336699', 'border-width': 1, 'border-color': 'black', 'opacity': 1}
+    }]
+    relation = 'Coaching tree' if direction == 'descendants' else 'Mentors'
+    tree_header = f"{relation} of {root} ({len(tree_rows) - 1} coaches)"
+    return tree_elements, tree_layout, subgraph_default_stylesheet + highlight_root, tree_header
+
+@functools.lru_cache(maxsize=256)
+def cached_staff_subgraph(team: str, year: int, _roster_version: str):
+    """
+    Builds the staff hierarchy subgraph of a team in a season, with node positions computed on the server.
+    Cached per (team, year) and version of the jobs data.
+
+    Behavior:
+        - The staff is a stabbing query on the tenure interval index, :meth:`tenure_index.TenureIndex.staff`
+        - Hierarchy edges are derived from adjacent encoded levels on the staff by \
+            :func:`staff_roster.staff_hierarchy_elements`
+        - Nodes are placed in layers by encoded level with :func:`dash_graph_internals.hierarchy_layout_positions`, \
+            sent as a preset layout
+
+    Returns:
+        - subgraph_elements (list): List of edges and nodes that make up the subgraph
+        - subgraph_layout (dict): Preset layout with the computed node positions
+    """
+    staff = load_tenure_index(ROSTER_CSV_PATH).staff(team, int(year))
+    subgraph_elements, node_levels = staff_hierarchy_elements(staff)
+
+    subgraph_layout = {
+        'name': 'preset',
+        'positions': hierarchy_layout_positions(node_levels)
+    }
+    return subgraph_elements, subgraph_layout
+
+# WSGI entry point for multi-worker deployments, see README ('Multi-Worker Deployment')
+server = app.server
+register_metrics_endpoint(server, forwarded_cache=background_cache)
+
 if __name__ == '__main__':
+    enable_profiling_from_cli()
     app.run()
\ No newline at end of file
@@ -1,6 +1,10 @@
 if __name__ == '__main__':
     print("Error: you are running a file of function definitions, please run 'dash_graph.py' to generate the webpage")
 
+from functools import lru_cache
+from callback_metrics import track_helper
+from profiling import profiled
+
 def nx_to_cytoscape(G):
     """
     Parses a NetworkX graph into nodes and edges usable for a Dash cytoscape graph
@@ -81,13 +85,35 @@ def get_id_of_triggered(callback_context: dict) -> str:
     """
     return callback_context.triggered[0]['prop_id'].split('.')[0]
 
-def parse_csv_file(input_file, filename: str):
+def upload_content_hash(input_file) -> str:
+    """
+    Returns the SHA-256 hex digest of an uploaded file's decoded contents, used to key cached upload results.
+
+    Args:
+        input_file (str): The base64-encoded contents of the uploaded file, in the format "data:<type>;base64,<content>".
+    """
+    import base64
+    import hashlib
+
+    content_type, content_string = input_file.split(',')
+    return hashlib.sha256(base64.b64decode(content_string)).hexdigest()
+
+def upload_cache_key(input_file) -> str:
+    """Returns the key an uploaded file's parsed result is cached under, see :func:`parse_csv_file`"""
+    return f"csv-upload:{upload_content_hash(input_file)}"
+
+@track_helper
+def parse_csv_file(input_file, filename: str, progress_callback=None, result_cache=None):
     """
     Parses a base64-encoded CSV file, extracts team and season information, and generates a network graph.
 
     Args:
         input_file (str): The base64-encoded contents of the uploaded file, typically in the format "data:<type>;base64,<content>".
         filename (str): The name of the uploaded file, used to check if it is a CSV.
+        progress_callback (callable, optional): Called as progress_callback(percent, label) as parsing advances,
+            used by the background upload callback to drive its progress bar.
+        result_cache (mapping, optional): Cache (ex: diskcache.Cache) of previous results, keyed by the upload's
+            content hash (see :func:`upload_content_hash`). Re-uploading the same file returns the cached result.
 
     Returns:
         tuple: A tuple containing:
@@ -102,30 +128,48 @@ def parse_csv_file(input_file, filename: str):
     import base64
     import io
     import pandas as pd
-    from basic_graph_generation import create_nx_graph
+    from basic_graph_generation import create_nx_graph, parse_seasons
+
+    def report(percent, label):
+        if progress_callback is not None:
+            progress_callback(percent, label)
+
+    if 'csv' not in filename:
+        return [], [], []
+
+    cache_key = upload_cache_key(input_file)
+    if result_cache is not None:
+        cached_result = result_cache.get(cache_key)
+        if cached_result is not None:
+            report(100, "Loaded from cache")
+            return cached_result
+
     content_type, content_string = input_file.split(',')
     decoded = base64.b64decode(content_string)
     try:
-        if 'csv' in filename:
-            df = pd.read_csv(io.StringIO(decoded.decode('utf-8')))
-            team_list = ['All'] + sorted(df['Team'].unique().tolist(), reverse=True)
-            years_list = set()
-            for _, row in df.iterrows():
-                years_worked = row['Seasons at Position']
-                if isinstance(years_worked, list):
-                    years_list.update(years_worked)
-                elif years_worked:
-                    years_list.add(years_worked)
-            years_list = ['All'] + sorted(years_list, reverse=True)
-            G = create_nx_graph(df)
-            elements = nx_to_cytoscape(G)
-            return elements, team_list, years_list
-        else:
-            return [], [], []
+        report(0, "Reading CSV")
+        df = pd.read_csv(io.StringIO(decoded.decode('utf-8')))
+        team_list = ['All'] + sorted(df['Team'].unique().tolist(), reverse=True)
+        seasons = df['Seasons at Position'].map(parse_seasons).explode().dropna()
+        years_list = ['All'] + sorted({int(year) for year in seasons.unique()}, reverse=True)
+
+        # Graph building is the long step, reserve 5-95% of the progress bar for it
+        report(5, "Building coaching graph")
+        G = create_nx_graph(df, progress_callback=lambda done, total: report(
+            5 + int(90 * done / total), f"Building coaching graph ({done}/{total} teams)"))
+        report(95, "Converting graph for display")
+        elements = nx_to_cytoscape(G)
+        result = (elements, team_list, years_list)
+        if result_cache is not None:
+            result_cache.set(cache_key, result)
+        report(100, "Done")
+        return result
     except Exception as e:
         print(e)
         return [], [], []
 
+@track_helper
+@profiled
 def parse_json_file():
     """
     Parses the 'visualization_elements_dump.json' file and extracts unique teams and years.
@@ -135,8 +179,23 @@ def parse_json_file():
             - elements (list): The list of elements loaded from the JSON file.
             - teams_list (list): A list of unique team names, sorted alphabetically, with 'All' as the first entry.
             - years_list (list): A list of unique years, sorted in descending order, with 'All' as the first entry.
+
+    Note:
+        If the 'COACHING_ELEMENT_STORE' environment variable names a store built by 'element_store.py',
+        the elements are rebuilt from that shared memory-mapped store instead of parsing the JSON dump.
+        Otherwise, if 'export_elements.py' wrote per-team shards (see 'element_shards.py'), every shard is read.
     """
     import json
+    from element_store import configured_element_store
+    from element_shards import available_element_shards
+
+    element_store = configured_element_store()
+    if element_store is not None:
+        return element_store.elements(), ['All'] + element_store.teams_list(), ['All'] + element_store.years_list()
+
+    element_shards = available_element_shards()
+    if element_shards is not None:
+        return element_shards.elements(), ['All'] + element_shards.teams, ['All'] + element_shards.years
 
     with open('data/visualization_elements_dump.json') as f:
         elements = json.load(f)
@@ -157,51 +216,57 @@ def parse_json_file():
 
     return elements, teams_list, years_list
 
-def gather_coaching_positions(elements: list, coach: str) -> list:
+@track_helper
+def load_dropdown_options():
+    """
+    Returns the team and year dropdown options without loading any elements when the element store or the
+    per-team shards are available (their manifests hold both lists). Falls back to :func:`parse_json_file`.
+
+    Returns:
+        tuple: (teams_list, years_list), each with 'All' as the first entry
+    """
+    from element_store import configured_element_store
+    from element_shards import available_element_shards
+
+    element_store = configured_element_store()
+    if element_store is not None:
+        return ['All'] + element_store.teams_list(), ['All'] + element_store.years_list()
+
+    element_shards = available_element_shards()
+    if element_shards is not None:
+        return ['All'] + element_shards.teams, ['All'] + element_shards.years
+
+    _, teams_list, years_list = parse_json_file()
+    return teams_list, years_list
+
+@track_helper
+def load_selection_elements(teams) -> list:
     """
-    Creates list of all years a coach has been employed, includes information on each job.
+    Loads the elements needed to highlight a selection of teams.
+
+    With a configured element store (see :func:`parse_json_file`), only the edges of the selected teams and the
+    nodes they touch are rebuilt through the store's team index. With per-team shards, only the shards of the
+    selected teams are read. Otherwise falls back to the full JSON dump.
 
     Args:
-        elements (list): List of all nodes and edges of the Dash cytoscape. Further information in 'nx_to_cytoscape'.
-        coach (str): The coach the function gathers employment data for
+        teams (iterable): Teams in the current selection
 
     Returns:
-        coached_info (list(tuple)): List of all years the coach has coached, sorted by year in descending order.
-        Each tuple contains the sentence to be displayed, the team coached for, and the year of the position.
+        list: Cytoscape elements containing at least every edge and node relevant to the selected teams
+    """
+    from element_store import configured_element_store
+    from element_shards import available_element_shards
 
-    Behavior:
-        - Searches elements for edges that contain the coach
-        - When function gets a hit, adds all years in that edge to a list to prevent double counting of years
-        - Determines if the coach is the 'source' or 'target' of the edge
-            - Assigns either the 'source_position' or 'target_position' to the coach when constructing the display sentence
-        - Generates the tuple of (display sentence, team, year)
-        - Adds the tuple to a list to be returned
-        - Sorts the list by the 3rd element in the tuple (year) in descending order
-    """
-    years_coached = []
-    coached_info = []
-    for el in elements:
-        data = el.get('data', {})
-        # Check if the clicked coach is involved in this edge
-        if data.get('source', "") == coach or data.get('target', "") == coach:
-            # Determine role
-            is_source = data.get('source', "") == coach
-            is_target = data.get('target', "") == coach
-            team = data.get('team_of_connection')
-            for year in data.get('years_of_connection', []):
-                # Only need to hit on one edge per year
-                if year not in years_coached:
-                    years_coached.append(year)
-                    if is_source:
-                        sentence = f"{coach} coached for {team} as the {data['source_position']} in {year}"
-                        coached_info.append((sentence, team, year))
-                    if is_target:
-                        sentence = f"{coach} coached for {team} as the {data['target_position']} in {year}"
-                        coached_info.append((sentence, team, year))
-    # Sort all years the coach has been employed by year (3rd item in each tuple)
-    coached_info.sort(key=lambda tup: tup[2], reverse=True)
-
-    return coached_info
+    element_store = configured_element_store()
+    if element_store is not None:
+        return element_store.elements_for_teams(teams)
+
+    element_shards = available_element_shards()
+    if element_shards is not None:
+        return element_shards.elements_for_teams(teams)
+
+    elements, _, _ = parse_json_file()
+    return elements
 
 def handle_all_selection(current_combos: list, possible_values: list, constant_value, team_or_year: str) -> list:
     """
@@ -218,6 +283,260 @@ def handle_all_selection(current_combos: list, possible_values: list, constant_v
 
     return current_combos
 
+def dataset_version(file_path: str = None) -> str:
+    """
+    Returns a cheap version string for a data file, used to invalidate cached query results
+    whenever the underlying data is regenerated.
+
+    Args:
+        file_path (str): Path of the data file backing the main cytoscape graph. Defaults to the configured
+            element store's manifest if there is one, else the per-team shards' manifest if it exists,
+            else 'data/visualization_elements_dump.json'
+
+    Returns:
+        str: '{modification time in ns}-{file size}', or 'missing' if the file does not exist
+    """
+    import os
+
+    if file_path is None:
+        store_dir = os.environ.get('COACHING_ELEMENT_STORE')
+        if store_dir:
+            file_path = store_dir if store_dir.endswith('.npz') else os.path.join(store_dir, 'manifest.json')
+        elif os.path.exists('data/element_shards/manifest.json'):
+            file_path = 'data/element_shards/manifest.json'
+        else:
+            file_path = 'data/visualization_elements_dump.json'
+
+    try:
+        stats = os.stat(file_path)
+    except OSError:
+        return 'missing'
+    return f"{stats.st_mtime_ns}-{stats.st_size}"
+
+@track_helper
+def normalize_combo_selection(current_combos: list, team_options: list, year_options: list):
+    """
+    Expands 'All' selections and sorts the stored (team, year) combinations, so that the same
+    selection always produces the same key regardless of the order it was built in.
+
+    Args:
+        current_combos (list): Combinations pulled from 'team_year_combo_store' (lists or tuples of [team, year])
+        team_options (list): All values from the team selection dropdown, 'All' first
+        year_options (list): All values from the year selection dropdown, 'All' first
+
+    Returns:
+        tuple or None: Sorted tuple of unique (team, year) combinations, or None if the selection
+        contains an ('All', 'All') combination, which cannot be accommodated
+    """
+    # Re-tuple when pulling from storage, dcc.Store unpacks tuples into lists
+    tupled_current_combos = [tuple(x) for x in current_combos]
+
+    for team, year in list(tupled_current_combos):
+        if team == "All" and year == "All":
+            return None
+        elif team == "All":
+            tupled_current_combos = handle_all_selection(tupled_current_combos, team_options, year, team_or_year="team")
+        elif year == "All":
+            tupled_current_combos = handle_all_selection(tupled_current_combos, year_options, team, team_or_year="year")
+
+    return tuple(sorted(set(tupled_current_combos), key=lambda combo: (str(combo[0]), int(combo[1]))))
+
+class QueryResultCache:
+    """
+    Least recently used cache for the results of the 'Update Parameters' path of the main graph.
+
+    Keys are built from a normalized combination selection (see :func:`normalize_combo_selection`)
+    plus the dataset version (see :func:`dataset_version`), values are the (elements, stylesheet, legend, layout)
+    returned to the main cytoscape graph.
+
+    Entries are evicted by size, measured as the number of elements plus stylesheet rules stored,
+    as large 'All' selections cost far more memory than a single team-season.
+
+    Attributes:
+        max_size (int): Maximum total size of all cached entries
+        hits (int): Number of lookups answered from the cache
+        misses (int): Number of lookups that required recomputation
+        evictions (int): Number of entries removed to make space
+    """
+    def __init__(self, max_size: int = 500_000):
+        from collections import OrderedDict
+        from threading import Lock
+
+        self.max_size = max_size
+        self.current_size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    @staticmethod
+    def make_key(normalized_combos: tuple, version: str) -> tuple:
+        return (version, normalized_combos)
+
+    @staticmethod
+    def entry_size(result: tuple) -> int:
+        elements, stylesheet = result[0], result[1]
+        return len(elements) + len(stylesheet)
+
+    def get(self, key):
+        """Returns the cached result for key (marking it as recently used), or None on a miss"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, result: tuple):
+        """Stores a result, evicting the least recently used entries until the cache fits within max_size"""
+        size = self.entry_size(result)
+        if size > self.max_size:
+            return # Result would flush the whole cache, not worth storing
+        with self._lock:
+            if key in self._entries:
+                self.current_size -= self.entry_size(self._entries.pop(key))
+            self._entries[key] = result
+            self.current_size += size
+            while self.current_size > self.max_size:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_size -= self.entry_size(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_size = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> dict:
+        """Returns the hit-rate counters and current occupancy of the cache"""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hit_rate,
+            'entries': len(self._entries),
+            'size': self.current_size,
+            'max_size': self.max_size,
+        }
+
+# Data fields Cytoscape needs to draw and style elements, everything else is fetched on demand when tapped
+DISPLAY_DATA_FIELDS = ('id', 'source', 'target', 'coach_name', 'cluster', 'cluster_label', 'size', 'weight')
+
+def trim_element(el: dict) -> dict:
+    """
+    Strips an element down to the data fields in `DISPLAY_DATA_FIELDS`, cutting the size of element payloads.
+    Full details of an element are looked up with :func:`lookup_element_details` when it is tapped.
+    """
+    data = el.get('data', {})
+    trimmed = {'data': {k: data[k] for k in DISPLAY_DATA_FIELDS if k in data}}
+    if 'position' in el:
+        trimmed['position'] = el['position']
+    return trimmed
+
+@track_helper
+def trim_elements(elements: list) -> list:
+    """Trims every element with :func:`trim_element`, dropping repeated ids (duplicate node copies)"""
+    seen_ids = set()
+    trimmed_elements = []
+    for el in elements:
+        element_id = el.get('data', {}).get('id')
+        if element_id in seen_ids:
+            continue
+        seen_ids.add(element_id)
+        trimmed_elements.append(trim_element(el))
+    return trimmed_elements
+
+@track_helper
+def element_delta(current_ids: list, new_elements: list):
+    """
+    Builds a partial update (dash.Patch) that turns the elements currently displayed into new_elements,
+    sending only the elements that were added or removed.
+
+    Args:
+        current_ids (list or None): Ids of the displayed elements, in display order (see 'main_graph_element_ids').
+            None means the displayed elements are unknown, so the full list is sent
+        new_elements (list): Trimmed elements that should be displayed
+
+    Returns:
+        tuple: A tuple containing:
+            - elements (dash.Patch or list): Patch of removals and additions, or the full list when the
+              delta would not be smaller than the full list
+            - new_ids (list): Ids of the displayed elements after the update, in display order
+    """
+    new_ids = [el['data']['id'] for el in new_elements]
+    if current_ids is None:
+        return new_elements, new_ids
+
+    new_id_set = set(new_ids)
+    current_id_set = set(current_ids)
+    removed_ids = current_id_set - new_id_set
+    added_elements = [el for el in new_elements if el['data']['id'] not in current_id_set]
+    if len(removed_ids) + len(added_elements) >= len(new_elements):
+        return new_elements, new_ids
+
+    return patch_from_delta(current_ids, removed_ids, added_elements)
+
+def patch_from_delta(current_ids: list, removed_ids: set, added_elements: list):
+    """
+    Builds the partial update (dash.Patch) removing removed_ids from, and appending added_elements to,
+    the elements currently displayed. Used by :func:`element_delta`, and directly when the delta is already
+    known (ex: precomputed season deltas, see 'season_snapshots.py').
+
+    Returns:
+        tuple: (elements Patch, ids of the displayed elements after the update, in display order)
+    """
+    from dash import Patch
+
+    removed_indices = [idx for idx, element_id in enumerate(current_ids) if element_id in removed_ids]
+    patched_elements = Patch()
+    for idx in reversed(removed_indices): # Delete from the back so earlier indices stay valid
+        del patched_elements[idx]
+    patched_elements.extend(added_elements)
+
+    kept_ids = [element_id for element_id in current_ids if element_id not in removed_ids]
+    return patched_elements, kept_ids + [el['data']['id'] for el in added_elements]
+
+@track_helper
+def lookup_element_details(element_id: str, graph_source: dict = None, result_cache=None):
+    """
+    Finds the full data of an element from its (possibly trimmed and year-suffixed) id, in the source the
+    displayed graph was loaded from, as edge ids ('edge-{idx}') are only unique within one source.
+
+    Args:
+        element_id (str): Id of a displayed element. Highlighted edges carry an '@{year}' suffix, see
+            :func:`generate_legend_and_highlights`
+        graph_source (dict, optional): Contents of the 'graph_source' store, {'type': 'json'} (the default) or
+            {'type': 'csv', 'key': upload cache key}
+        result_cache (mapping, optional): Cache holding parsed uploads (see :func:`parse_csv_file`), required to
+            look up elements of an uploaded CSV
+
+    Returns:
+        dict or None: The element's full 'data' dict, or None if it is not part of the loaded dataset
+    """
+    base_id = element_id.split('@')[0]
+    if graph_source and graph_source.get('type') == 'csv':
+        if result_cache is None:
+            return None
+        return _element_details_index('csv', graph_source['key'], result_cache).get(base_id)
+    return _element_details_index('json', dataset_version()).get(base_id)
+
+@lru_cache(maxsize=4)
+def _element_details_index(source_type: str, key: str, result_cache=None) -> dict:
+    if source_type == 'csv':
+        elements, _, _ = result_cache.get(key, ([], [], []))
+    else:
+        elements, _, _ = parse_json_file()
+    return {el['data']['id']: el['data'] for el in elements}
+
+@track_helper
+@profiled
 def generate_legend_and_highlights(combo_list: list, cytoscape_elements: list):
     """
     Iterates through combinations, finding relevant edges and nodes. Generates a legend for all combinations
@@ -256,7 +575,6 @@ def generate_legend_and_highlights(combo_list: list, cytoscape_elements: list):
     all_highlighted_edges = {}
     all_highlighted_nodes = {}
     new_elements_list = []
-    new_elements_id_counter = len(cytoscape_elements) + 2
     for team, year in combo_list:
         team_highlighted_edges = set()
         team_highlighted_nodes = set()
@@ -269,8 +587,7 @@ def generate_legend_and_highlights(combo_list: list, cytoscape_elements: list):
                 team_highlighted_nodes.add(data.get('target'))
                 edge_copy = deepcopy(el) # Deepcopy to be able to change id (allow parallel edges to exist for same job over multiple years)
                 edge_copy_data = edge_copy.get('data', {})
-                edge_copy_data['id'] = f"edge-{new_elements_id_counter}"
-                new_elements_id_counter += 1
+                edge_copy_data['id'] = f"{data.get('id')}@{year}" # Stable per (edge, year), allows delta updates between selections
                 team_highlighted_edges.add(( edge_copy_data.get('id'), edge_copy_data.get('source'), edge_copy_data.get('target') ))
                 new_elements_list.append(edge_copy)
 
@@ -363,106 +680,163 @@ def generate_legend_and_highlights(combo_list: list, cytoscape_elements: list):
   
     return new_elements_list, highlight_styles, legend_items
 
-def find_encoded_levels_on_staff(main_elements: list, team: str, year: int) -> list:
+@track_helper
+def build_team_clusters(cytoscape_elements: list) -> dict:
     """
-    Finds all encoded positions on the current staff. Handles the staff not having continous values
-    (ex: 1,2,5) by allowing comparison by index location instead of raw value
+    Indexes the full element list by team, so the full network can be shown as team super-nodes
+    (see :func:`aggregated_team_view`) without scanning every element on each drill-down.
 
     Args:
-        main_elements (list): elements from the main cytoscape
-        team (str): team selected for analysis
-        year (int): year selected for analysis
+        cytoscape_elements (list): list of elements from the main cytoscape (all possible data)
 
     Returns:
-        encoded_pos_list (list): a sorted list of all encoded positions on the staff
-
-    Behavior:
-        - Search through main cytoscape elements to find relevant edges
-        - Pull out encoded positions from the edge data and add to a set
-        - Turn the set into a list and sort it
+        team_clusters (dict): A dict containing:
+            - 'coach_nodes': {coach_name: node element}
+            - 'coach_teams': {coach_name: set of teams the coach has a connection on}
+            - 'team_coaches': {team: set of coaches with a connection on that team}
+            - 'team_edges': {team: list of edge elements, one per coach pair}
+            - 'team_pair_weights': {(team1, team2): number of coaches connected on both teams}, team1 < team2
     """
-    encoded_pos_list = set()
-    for el in main_elements:
+    from collections import Counter, defaultdict
+    from itertools import combinations
+
+    coach_nodes = {}
+    coach_teams = defaultdict(set)
+    team_coaches = defaultdict(set)
+    team_edges = defaultdict(list)
+    seen_pairs = set()
+    for el in cytoscape_elements:
         data = el.get('data', {})
-        if data.get('team_of_connection') == team and (year in data.get('years_of_connection')):
-            encoded_pos1, encoded_pos2 = data.get('encoded_connection')
-            encoded_pos_list.add(encoded_pos1)
-            encoded_pos_list.add(encoded_pos2)
-    
-    encoded_pos_list = sorted(list(encoded_pos_list))
-    return encoded_pos_list
+        if 'source' not in data:
+            coach_nodes[data.get('id')] = el
+            continue
+        team = data.get('team_of_connection')
+        source, target = data.get('source'), data.get('target')
+        for coach in (source, target):
+            coach_teams[coach].add(team)
+            team_coaches[team].add(coach)
+        pair = (team, frozenset((source, target)))
+        if pair not in seen_pairs: # Parallel edges (same pair over different stints) collapse into one
+            seen_pairs.add(pair)
+            team_edges[team].append(el)
+
+    team_pair_weights = Counter()
+    for teams in coach_teams.values():
+        team_pair_weights.update(combinations(sorted(teams), 2))
+
+    return {
+        'coach_nodes': coach_nodes,
+        'coach_teams': dict(coach_teams),
+        'team_coaches': dict(team_coaches),
+        'team_edges': dict(team_edges),
+        'team_pair_weights': dict(team_pair_weights),
+    }
+
+@track_helper
+def aggregated_team_view(team_clusters: dict, expanded_team: str = None, max_cluster_edges: int = 400) -> list:
+    """
+    Creates a level-of-detail view of the full network: every team is collapsed into a super-node, joined by
+    edges weighted by the number of coaches the two teams share. Optionally expands one team into its coaches.
 
-def create_bfs_graph_structure(cytoscape_elements: list, encoded_pos_list: list, team: str, year: int) -> list:
+    Args:
+        team_clusters (dict): Team index of the full network, see :func:`build_team_clusters`
+        expanded_team (str, optional): Team to drill down into. Its coaches are shown as regular nodes with
+            their connections on that team, plus an edge to each other team they have connections on
+        max_cluster_edges (int): Only the strongest team-to-team edges are kept, so the browser
+            renders a few hundred elements at most
+
+    Returns:
+        elements (list): Cytoscape elements. Super-nodes have the id 'cluster::{team}' and the data fields
+        'cluster' (team name), 'cluster_label' and 'size' (number of coaches); super-edges carry a 'weight'
     """
-    Creates a list of elements that allows the BFS layout style to correctly show a coaching staff 
-    hierarchy tree in the subgraph.
+    def cluster_id(team):
+        return f"cluster::{team}"
+
+    elements = []
+    for team, coaches in sorted(team_clusters['team_coaches'].items()):
+        if team == expanded_team:
+            continue
+        elements.append({'data': {
+            'id': cluster_id(team),
+            'cluster': team,
+            'cluster_label': f"{team} ({len(coaches)})",
+            'size': len(coaches)
+        }})
+
+    strongest_pairs = sorted(
+        ((pair, weight) for pair, weight in team_clusters['team_pair_weights'].items() if expanded_team not in pair),
+        key=lambda item: item[1], reverse=True
+    )[:max_cluster_edges]
+    for (team1, team2), weight in strongest_pairs:
+        elements.append({'data': {
+            'id': f"cluster-edge::{team1}::{team2}",
+            'source': cluster_id(team1),
+            'target': cluster_id(team2),
+            'weight': weight
+        }})
+
+    if expanded_team in team_clusters['team_coaches']:
+        for coach in sorted(team_clusters['team_coaches'][expanded_team]):
+            elements.append(team_clusters['coach_nodes'].get(coach, {'data': {'id': coach, 'coach_name': coach}}))
+            for other_team in sorted(team_clusters['coach_teams'][coach] - {expanded_team}):
+                elements.append({'data': {
+                    'id': f"cluster-link::{coach}::{other_team}",
+                    'source': coach,
+                    'target': cluster_id(other_team),
+                    'weight': 1
+                }})
+        elements.extend(team_clusters['team_edges'][expanded_team])
+
+    return elements
+
+@track_helper
+def circle_layout_positions(node_ids: list, node_spacing: float = 30) -> dict:
+    """
+    Computes a circle layout on the server, to be sent to cytoscape as a 'preset' layout
+    so the browser does not need to run the layout itself.
 
     Args:
-        cytoscape_elements (list): A list of all elements from the main cytoscape (all possible data)
-        encoded_pos_list (list): A list of all available encoded positions on the current staff. \
-            For more information see :func:`find_encoded_levels_on_staff`
-        team (str): team being analyzed
-        year (int): year being analyzed
+        node_ids (list): Ids of the nodes to place, in order around the circle (starting at the top, clockwise)
+        node_spacing (float): Distance between neighbouring nodes along the circle, the radius grows with the node count
 
-    Returns
-        sub_graph_elements (list): A list of elements that allow the graph to form properly
-        most_senior_coaches (str): Namea of the most senior coaches available in teh data set, \
-        passed to the layout of the cytoscape to correctly set the BFS root(s)
+    Returns:
+        positions (dict): {node id: {'x': x, 'y': y}}, passed as the 'positions' of a preset layout
+    """
+    import numpy as np
+
+    node_count = len(node_ids)
+    if node_count == 0:
+        return {}
+    radius = max(node_count * node_spacing / (2 * np.pi), node_spacing)
+    angles = 2 * np.pi * np.arange(node_count) / node_count - np.pi / 2
+    xs = np.round(radius * np.cos(angles), 2)
+    ys = np.round(radius * np.sin(angles), 2)
+    return {node_id: {'x': float(x), 'y': float(y)} for node_id, x, y in zip(node_ids, xs, ys)}
+
+@track_helper
+def hierarchy_layout_positions(node_levels: dict, level_spacing: float = 150, node_spacing: float = 220) -> dict:
+    """
+    Computes a layered (top-down) layout on the server, to be sent to cytoscape as a 'preset' layout.
+    Replaces the browser-side 'breadthfirst' layout for the staff hierarchy subgraph.
 
-    Behavior:
-        - Iterates through all elements, first checking if the edge data is for the same team and year
-            - If so, tries to see if the coach's encoded position is the most senior possible ( min(encoded_pos_list) )
-            - If the coaches are an index distance of 1 from each other (ex: 2 and 4 in a list of [1,2,4]),
-            adds this edge to valid edges. This is what lets a BFS form the hierarchical structure desired
-        - For each valid edge:
-            - Iterates through all elements to find nodes that match edge source and target (tracks and skips duplicates)
-            - Copies data from main element list
-            - Adds new information to the copy, a longer to be displayed in the subgraph
-            - Adds this copy to the valid nodes list
-        - Combines valid_nodes and valid_edges
-    """
-    valid_nodes = []
-    valid_edges = []
-    highest_encoded_pos = min(encoded_pos_list)
-    most_senior_coaches = []
+    Args:
+        node_levels (dict): {node id: level}, where lower levels are placed higher (ex: index of the
+            node's encoded level on the staff, see :func:`staff_roster.staff_hierarchy_elements`)
+        level_spacing (float): Vertical distance between levels
+        node_spacing (float): Horizontal distance between nodes on the same level
 
-    for el in cytoscape_elements:
-        data = el.get('data', {})
-        if data.get('team_of_connection') == team and (year in data.get('years_of_connection')):
-            source_encoded_pos, target_encoded_pos = data.get('encoded_connection')
-            if source_encoded_pos == highest_encoded_pos:
-                most_senior_coaches.append(data.get('source'))
-            if target_encoded_pos == highest_encoded_pos:
-                most_senior_coaches.append(data.get('target'))
-            if (encoded_pos_list.index(target_encoded_pos) - 1 == encoded_pos_list.index(source_encoded_pos) or 
-                encoded_pos_list.index(target_encoded_pos) + 1 == encoded_pos_list.index(source_encoded_pos)):
-                valid_edges.append(el)
-    
-    processed_coaches = []
-    for edge in valid_edges:
-        edge_data = edge.get('data', {})
-        source_name = edge_data.get('source')
-        target_name = edge_data.get('target')
-        for el in cytoscape_elements:
-            el_data = el.get('data', {})
-            # For source node
-            if el_data.get('coach_name') == source_name and el_data.get('coach_name'): #not in processed_coaches:
-                node_copy = el.copy()
-                copy_data = node_copy.get('data', {})
-                copy_data['subgraph_label'] = f"{copy_data.get('coach_name', "")}: {edge_data.get('source_position')}"
-                processed_coaches.append(el_data.get('coach_name'))
-                valid_nodes.append(el)
-                
-            # For target node
-            if el_data.get('coach_name') == target_name and el_data.get('coach_name'): #not in processed_coaches:
-                node_copy = el.copy()
-                copy_data = node_copy.get('data', {})
-                copy_data['subgraph_label'] = f"{copy_data.get('coach_name', "")}: {edge_data.get('target_position')}"
-                processed_coaches.append(el_data.get('coach_name'))
-                valid_nodes.append(el)
-    sub_graph_elements = valid_nodes + valid_edges  
-
-    return sub_graph_elements, most_senior_coaches
+    Returns:
+        positions (dict): {node id: {'x': x, 'y': y}}, each level centered horizontally
+    """
+    import numpy as np
+
+    positions = {}
+    for level_rank, level in enumerate(sorted(set(node_levels.values()))):
+        level_nodes = sorted(node_id for node_id, node_level in node_levels.items() if node_level == level)
+        xs = (np.arange(len(level_nodes)) - (len(level_nodes) - 1) / 2) * node_spacing
+        for node_id, x in zip(level_nodes, xs):
+            positions[node_id] = {'x': float(x), 'y': float(level_rank * level_spacing)}
+    return positions
 
 default_stylesheet=[
     {'selector': 'node', 'style': {
@@ -478,6 +852,19 @@ default_stylesheet=[
         'curve-style': 'bezier',
         'width': 1,
         'opacity': .1
+    }},
+
+    # Team super-nodes and weighted edges of the aggregated full-network view, see `aggregated_team_view`
+    {'selector': 'node[cluster]', 'style': {
+        'label': 'data(cluster_label)',
+        'height': 'mapData(size, 1, 80, 10, 40)',
+        'width': 'mapData(size, 1, 80, 10, 40)',
+        'background-color': '#336699'
+        }},
+
+    {'selector': 'edge[weight]', 'style': {
+        'width': 'mapData(weight, 1, 15, 0.5, 6)',
+        'opacity': .4
     }}
 ]
 
@@ -0,0 +1,191 @@
+"""
+Per-team shards of the cytoscape elements, with a small manifest the Dash app can read on its own.
+
+The JSON dump has to be parsed in full even to fill the team and year dropdowns. The shard directory written by
+:func:`write_element_shards` instead holds:
+    - 'manifest.json': the team list, the year list, and the byte offset, length and edge count of every shard
+    - 'shards.jsonl': one compact JSON array per line, first every node, then the edges of each team
+
+The app reads the manifest at startup and only the shards of the teams in the current selection afterwards,
+so startup time and memory do not grow with the size of the dataset.
+
+'export_elements.py' writes the shards next to the JSON dump, in 'data/element_shards'.
+"""
+import json
+import os
+from functools import lru_cache
+
+if __name__ == '__main__':
+    print("Error: you are running a file of function definitions, please run 'dash_graph.py' to generate the webpage")
+
+SHARDS_FORMAT_VERSION = 1
+ELEMENT_SHARDS_DIR = 'data/element_shards'
+
+
+def write_element_shards(elements, shard_dir: str = ELEMENT_SHARDS_DIR) -> None:
+    """
+    Writes cytoscape elements as per-team shards plus a manifest.
+
+    Args:
+        elements (iterable): Cytoscape elements, as produced by :func:`export_elements.iter_elements`
+        shard_dir (str): Directory to write the shards into, created if needed
+
+    Behavior:
+        - Streams the elements through an :class:`ElementShardWriter`, so they never have to be in memory at once
+    """
+    writer = ElementShardWriter(shard_dir)
+    try:
+        for el in elements:
+            writer.write(el)
+    finally:
+        writer.close()
+
+
+class ElementShardWriter:
+    """
+    Writes per-team shards one element at a time.
+
+    Behavior:
+        - Groups edges by 'team_of_connection' (edges without a team go in a shard keyed by '') into one temporary
+          file per team, holding only the team and year lists in memory
+        - On close, writes the nodes, then each team's edges, as one compact JSON line each
+        - Records each line's byte offset and length in the manifest, with the sorted team and year lists
+        - Writes the manifest last, so a partially written directory is never picked up by the app
+    """
+    def __init__(self, shard_dir: str = ELEMENT_SHARDS_DIR):
+        import tempfile
+
+        os.makedirs(shard_dir, exist_ok=True)
+        self.shard_dir = shard_dir
+        self._temp_dir = tempfile.TemporaryDirectory(dir=shard_dir)
+        self._files = {} # shard key (None for the nodes, else the team) -> [temporary file, element count]
+        self.years = set()
+
+    def write(self, el: dict) -> None:
+        data = el.get('data', {})
+        if 'source' in data:
+            key = data.get('team_of_connection') or ''
+            years_of_connection = data.get('years_of_connection')
+            if isinstance(years_of_connection, list):
+                self.years.update(years_of_connection)
+            elif years_of_connection:
+                self.years.add(years_of_connection)
+        else:
+            key = None
+
+        if key not in self._files:
+            self._files[key] = [open(os.path.join(self._temp_dir.name, str(len(self._files))), 'w+b'), 0]
+        shard_file = self._files[key]
+        if shard_file[1]:
+            shard_file[0].write(b',')
+        shard_file[0].write(json.dumps(el, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+        shard_file[1] += 1
+
+    def close(self) -> None:
+        import shutil
+
+        shards = {}
+        offset = 0
+        with open(os.path.join(self.shard_dir, 'shards.jsonl'), 'wb') as f:
+            def write_shard(key):
+                nonlocal offset
+                temp_file, count = self._files.get(key, (None, 0))
+                f.write(b'[')
+                length = 1
+                if temp_file is not None:
+                    length += temp_file.tell()
+                    temp_file.seek(0)
+                    shutil.copyfileobj(temp_file, f)
+                f.write(b']\n')
+                length += 2
+                location = [offset, length, count]
+                offset += length
+                return location
+
+            nodes_location = write_shard(None)
+            teams = sorted(key for key in self._files if key is not None)
+            for team in teams:
+                shards[team] = write_shard(team)
+
+        for temp_file, _ in self._files.values():
+            temp_file.close()
+        self._temp_dir.cleanup()
+
+        manifest = {
+            'format_version': SHARDS_FORMAT_VERSION,
+            'teams': [team for team in teams if team],
+            'years': sorted(self.years, reverse=True),
+            'nodes': nodes_location,
+            'shards': shards,
+        }
+        with open(os.path.join(self.shard_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+
+
+class ElementShards:
+    """
+    Read access to a shard directory written by :func:`write_element_shards`.
+
+    Only the manifest is read when opening, shards are read (and parsed) on demand.
+
+    Attributes:
+        shard_dir (str): Directory the shards were opened from
+        teams (list): Teams with at least one edge, sorted alphabetically
+        years (list): Years of connection found in the edges, sorted in descending order
+    """
+    def __init__(self, shard_dir: str):
+        with open(os.path.join(shard_dir, 'manifest.json'), encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('format_version') != SHARDS_FORMAT_VERSION:
+            raise ValueError(f"Element shards at {shard_dir} have format {manifest.get('format_version')}, "
+                             f"expected {SHARDS_FORMAT_VERSION}. Please rerun export_elements.py")
+
+        self.shard_dir = shard_dir
+        self.teams = manifest['teams']
+        self.years = manifest['years']
+        self._nodes_location = manifest['nodes']
+        self._shard_locations = manifest['shards']
+
+    def _read_shard(self, location: list) -> list:
+        offset, length, _ = location
+        with open(os.path.join(self.shard_dir, 'shards.jsonl'), 'rb') as f:
+            f.seek(offset)
+            return json.loads(f.read(length))
+
+    def nodes(self) -> list:
+        return self._read_shard(self._nodes_location)
+
+    def team_edges(self, team: str) -> list:
+        """Returns the edges of one team, or an empty list for an unknown team"""
+        location = self._shard_locations.get(team)
+        return self._read_shard(location) if location else []
+
+    def elements(self) -> list:
+        """Reads every shard, nodes first then edges (the same elements as the JSON dump)"""
+        return self.nodes() + [el for team in self._shard_locations for el in self.team_edges(team)]
+
+    def elements_for_teams(self, teams) -> list:
+        """
+        Reads only the shards of the given teams, and rebuilds the nodes their edges touch,
+        which is all :func:`dash_graph_internals.generate_legend_and_highlights` needs for a selection.
+        """
+        edges = [el for team in sorted(set(teams)) for el in self.team_edges(team)]
+        coach_names = dict.fromkeys(name for el in edges for name in (el['data']['source'], el['data']['target']))
+        return [{'data': {'id': name, 'coach_name': name}} for name in coach_names] + edges
+
+
+@lru_cache(maxsize=2)
+def _open_element_shards(shard_dir: str, _version: str) -> ElementShards:
+    return ElementShards(shard_dir)
+
+
+def available_element_shards(shard_dir: str = ELEMENT_SHARDS_DIR):
+    """
+    Returns the shards in shard_dir (reopened whenever the manifest changes), or None if no shards were exported.
+    """
+    from dash_graph_internals import dataset_version
+
+    version = dataset_version(os.path.join(shard_dir, 'manifest.json'))
+    if version == 'missing':
+        return None
+    return _open_element_shards(shard_dir, version)
@@ -0,0 +1,390 @@
+"""
+Precomputed, memory-mapped binary store of the cytoscape elements used by the Dash app.
+
+Parsing 'visualization_elements_dump.json' gives every worker process a full private copy of the element list. The
+store written by :func:`build_element_store` keeps nodes, edges and indexes as flat NumPy arrays that are opened with
+``mmap_mode='r'``, so any number of workers share one read-only copy through the OS page cache and open the store in
+milliseconds. Team selections only rebuild the edges of their teams, through the team index. Rebuilding the full
+element list decodes every column in bulk and costs about as much as parsing the JSON dump.
+
+Build the store once from the JSON dump::
+
+    python element_store.py data/visualization_elements_dump.json data/element_store
+
+Then point the Dash app at it (see README, 'Multi-Worker Deployment')::
+
+    COACHING_ELEMENT_STORE=data/element_store gunicorn -w 4 dash_graph:server
+
+The same dictionary-encoded columns can also be written as one compressed '.npz' archive with
+:func:`write_element_archive`, which is far smaller than the JSON dump and easy to copy around::
+
+    python element_store.py data/visualization_elements_dump.json data/elements.npz [--uncompressed]
+
+COACHING_ELEMENT_STORE accepts an archive path too, see :class:`ElementArchive`.
+"""
+import json
+import os
+from functools import lru_cache
+
+import numpy as np
+
+STORE_FORMAT_VERSION = 1
+ELEMENT_STORE_ENV_VAR = 'COACHING_ELEMENT_STORE'
+
+# Columns written for every edge, all int32 unless noted
+_EDGE_COLUMNS = ['edge_id', 'edge_source', 'edge_target', 'edge_relationship', 'edge_team', 'edge_mentor_status',
+                 'edge_source_position', 'edge_target_position', 'edge_source_level', 'edge_target_level',
+                 'edge_visualization_tracker', 'edge_year_offsets', 'edge_years']
+
+
+def _encode_level(level) -> int:
+    """Encoded positions are small ints, NaN (unlisted position) is stored as -1"""
+    if level is None or level != level:
+        return -1
+    return int(level)
+
+
+def _encode_elements(elements: list) -> tuple:
+    """
+    Dictionary-encodes a list of cytoscape elements into typed NumPy columns.
+
+    Returns:
+        tuple: (arrays, manifest), arrays being {array name: np.ndarray} and manifest the format version and counts
+    """
+    string_ids = {}
+    strings = []
+
+    def intern(value) -> int:
+        if value is None:
+            return -1
+        value = str(value)
+        if value not in string_ids:
+            string_ids[value] = len(strings)
+            strings.append(value)
+        return string_ids[value]
+
+    node_names = []
+    node_index = {}
+    edges = []
+    for el in elements:
+        data = el.get('data', {})
+        if 'source' in data:
+            edges.append(data)
+        else:
+            node_index[data.get('id')] = len(node_names)
+            node_names.append(intern(data.get('coach_name', data.get('id'))))
+
+    columns = {name: [] for name in _EDGE_COLUMNS}
+    columns['edge_year_offsets'].append(0)
+    for data in edges:
+        source_level, target_level = data.get('encoded_connection', (None, None))
+        years = data.get('years_of_connection', [])
+        columns['edge_id'].append(intern(data.get('id')))
+        columns['edge_source'].append(node_index[data.get('source')])
+        columns['edge_target'].append(node_index[data.get('target')])
+        columns['edge_relationship'].append(intern(data.get('relationship')))
+        columns['edge_team'].append(intern(data.get('team_of_connection')))
+        columns['edge_mentor_status'].append(intern(data.get('mentor_status')))
+        columns['edge_source_position'].append(intern(data.get('source_position')))
+        columns['edge_target_position'].append(intern(data.get('target_position')))
+        columns['edge_source_level'].append(_encode_level(source_level))
+        columns['edge_target_level'].append(_encode_level(target_level))
+        columns['edge_visualization_tracker'].append(int(data.get('visualization_tracker', 0)))
+        columns['edge_years'].extend(int(year) for year in years)
+        columns['edge_year_offsets'].append(len(columns['edge_years']))
+
+    encoded_strings = [s.encode('utf-8') for s in strings]
+    string_offsets = np.zeros(len(encoded_strings) + 1, dtype=np.int64)
+    string_offsets[1:] = np.cumsum([len(s) for s in encoded_strings])
+    arrays = {
+        'strings': np.frombuffer(b''.join(encoded_strings), dtype=np.uint8),
+        'string_offsets': string_offsets,
+        'node_name': np.asarray(node_names, dtype=np.int32),
+    }
+    for name, values in columns.items():
+        dtype = np.int64 if name == 'edge_year_offsets' else np.int32
+        arrays[name] = np.asarray(values, dtype=dtype)
+
+    # Indexes: edges grouped by team, teams in alphabetical order, years in descending order
+    edge_team = arrays['edge_team']
+    team_ids = sorted({t for t in columns['edge_team'] if t != -1}, key=lambda t: strings[t])
+    team_rank = np.full(len(strings) + 1, -1, dtype=np.int32)
+    team_rank[team_ids] = np.arange(len(team_ids), dtype=np.int32)
+    edge_team_rank = team_rank[edge_team]
+    team_edge_order = np.argsort(edge_team_rank, kind='stable').astype(np.int32)
+    arrays['team_ids'] = np.asarray(team_ids, dtype=np.int32)
+    arrays['team_edge_order'] = team_edge_order
+    arrays['team_edge_offsets'] = np.searchsorted(edge_team_rank[team_edge_order], np.arange(len(team_ids) + 1)).astype(np.int64)
+    arrays['years'] = np.unique(arrays['edge_years'])[::-1].copy()
+
+    manifest = {'format_version': STORE_FORMAT_VERSION, 'nodes': len(node_names), 'edges': len(edges)}
+    return arrays, manifest
+
+
+def build_element_store(elements: list, store_dir: str) -> None:
+    """
+    Writes a list of cytoscape elements as a memory-mappable binary store.
+
+    Args:
+        elements (list): Cytoscape elements, as produced by :func:`export_elements.export_elements` or
+            :func:`dash_graph_internals.nx_to_cytoscape`
+        store_dir (str): Directory to write the store into, created if needed
+
+    Behavior:
+        - Interns every string (ids, names, teams, positions, mentor statuses) into one UTF-8 blob with offsets
+        - Writes node names and every edge attribute as typed columns referencing the string table
+        - Writes the years of each edge as a CSR pair (offsets + flat years)
+        - Writes indexes: edge indices grouped by team (with offsets), the sorted team list and the sorted year list
+        - Writes a small 'manifest.json' with the format version and element counts, last, so its modification
+          time versions the whole store (see :func:`open_element_store`)
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    arrays, manifest = _encode_elements(elements)
+
+    # Each file is written under a temporary name then swapped in, so processes that still map the previous
+    # version keep reading its (unlinked) files until they reopen the store
+    def replace(name, write):
+        path = os.path.join(store_dir, name)
+        with open(f'{path}.tmp', 'wb') as f:
+            write(f)
+        os.replace(f'{path}.tmp', path)
+
+    replace('strings.bin', lambda f: f.write(arrays.pop('strings').tobytes()))
+    for name, array in arrays.items():
+        replace(f'{name}.npy', lambda f: np.save(f, array))
+    replace('manifest.json', lambda f: f.write(json.dumps(manifest).encode('utf-8')))
+
+
+def write_element_archive(elements: list, archive_path: str, compress: bool = True) -> None:
+    """
+    Writes a list of cytoscape elements as a single-file '.npz' archive, the portable counterpart of
+    :func:`build_element_store`, with the same string table, typed columns and indexes.
+
+    Args:
+        elements (list): Cytoscape elements, as produced by :func:`export_elements.export_elements`
+        archive_path (str): Path of the archive, '.npz' is appended by NumPy if missing
+        compress (bool): Whether to deflate the columns. Compressed archives are the smallest to ship,
+            uncompressed ones open slightly faster
+    """
+    arrays, manifest = _encode_elements(elements)
+    arrays['manifest'] = np.frombuffer(json.dumps(manifest).encode('utf-8'), dtype=np.uint8)
+    save = np.savez_compressed if compress else np.savez
+    save(archive_path, **arrays)
+
+
+class ElementStore:
+    """
+    Read-only view over a store written by :func:`build_element_store`.
+
+    Every array is memory-mapped, nothing is read from disk until it is used. Element dicts are rebuilt on
+    demand in the same format as the JSON dump, see :func:`dash_graph_internals.nx_to_cytoscape`, a whole column
+    at a time against the string table decoded once by :meth:`string_table`.
+
+    Attributes:
+        store_dir (str): Directory the store was opened from
+        node_count (int): Number of nodes in the store
+        edge_count (int): Number of edges in the store
+    """
+    def __init__(self, store_dir: str):
+        with open(os.path.join(store_dir, 'manifest.json'), encoding='utf-8') as f:
+            manifest = json.load(f)
+
+        def load(name):
+            return np.load(os.path.join(store_dir, f'{name}.npy'), mmap_mode='r')
+
+        strings = np.memmap(os.path.join(store_dir, 'strings.bin'), dtype=np.uint8, mode='r') \
+            if os.path.getsize(os.path.join(store_dir, 'strings.bin')) else np.zeros(0, dtype=np.uint8)
+        self.store_dir = store_dir
+        self._load_arrays(manifest, load, strings)
+
+    def _load_arrays(self, manifest: dict, load, strings) -> None:
+        if manifest.get('format_version') != STORE_FORMAT_VERSION:
+            raise ValueError(f"Element store at {self.store_dir} has format {manifest.get('format_version')}, "
+                             f"expected {STORE_FORMAT_VERSION}. Please rebuild it with element_store.py")
+
+        self.node_count = manifest['nodes']
+        self.edge_count = manifest['edges']
+        self._strings = strings
+        # Decoded strings are cached on the instance (not with lru_cache), so a replaced store is freed with its mappings
+        self._decoded_strings = {}
+        self._string_table = None
+        self._string_offsets = load('string_offsets')
+        self.node_name = load('node_name')
+        for name in _EDGE_COLUMNS:
+            setattr(self, name, load(name))
+        self.team_ids = load('team_ids')
+        self.team_edge_order = load('team_edge_order')
+        self.team_edge_offsets = load('team_edge_offsets')
+        self.years = load('years')
+
+    def string(self, string_id: int):
+        """Decodes one entry of the string table, -1 is the missing value"""
+        if string_id == -1:
+            return None
+        if self._string_table is not None:
+            return self._string_table[string_id]
+        if string_id not in self._decoded_strings:
+            start, end = self._string_offsets[string_id], self._string_offsets[string_id + 1]
+            self._decoded_strings[string_id] = bytes(self._strings[start:end]).decode('utf-8')
+        return self._decoded_strings[string_id]
+
+    def string_table(self) -> list:
+        """Decodes the whole string table once, the missing value -1 indexes the trailing None"""
+        if self._string_table is None:
+            blob = bytes(self._strings)
+            offsets = self._string_offsets.tolist()
+            self._string_table = [blob[start:end].decode('utf-8') for start, end in zip(offsets, offsets[1:])] + [None]
+        return self._string_table
+
+    def teams_list(self) -> list:
+        return [self.string(int(t)) for t in self.team_ids]
+
+    def years_list(self) -> list:
+        return [int(y) for y in self.years]
+
+    def node_element(self, node_idx: int) -> dict:
+        name = self.string(int(self.node_name[node_idx]))
+        return {'data': {'id': name, 'coach_name': name}}
+
+    def edge_element(self, edge_idx: int) -> dict:
+        return self._edge_elements(np.asarray([edge_idx]))[0]
+
+    def _node_elements(self, node_indices: np.ndarray) -> list:
+        table = self.string_table()
+        return [{'data': {'id': table[name], 'coach_name': table[name]}}
+                for name in np.asarray(self.node_name)[node_indices].tolist()]
+
+    def _edge_elements(self, edge_indices: np.ndarray) -> list:
+        """
+        Rebuilds the dicts of many edges at once: each column is gathered and decoded as a whole (NumPy fancy
+        indexing, then one list lookup per value in the decoded string table) instead of one array access per field
+        """
+        table = self.string_table()
+
+        def strings(column):
+            return [table[string_id] for string_id in np.asarray(column)[edge_indices].tolist()]
+
+        def levels(column):
+            return [float('nan') if level == -1 else level for level in np.asarray(column)[edge_indices].tolist()]
+
+        node_name = np.asarray(self.node_name)
+        sources = [table[name] for name in node_name[np.asarray(self.edge_source)[edge_indices]].tolist()]
+        targets = [table[name] for name in node_name[np.asarray(self.edge_target)[edge_indices]].tolist()]
+        year_offsets = np.asarray(self.edge_year_offsets)
+        all_years = np.asarray(self.edge_years).tolist()
+        year_ranges = zip(year_offsets[edge_indices].tolist(), year_offsets[edge_indices + 1].tolist())
+        relationships = strings(self.edge_relationship)
+
+        elements = []
+        for (edge_id, source, target, relationship, source_level, target_level, (year_start, year_end), team,
+             mentor_status, source_position, target_position, tracker) in zip(
+                strings(self.edge_id), sources, targets, relationships, levels(self.edge_source_level),
+                levels(self.edge_target_level), year_ranges, strings(self.edge_team), strings(self.edge_mentor_status),
+                strings(self.edge_source_position), strings(self.edge_target_position),
+                np.asarray(self.edge_visualization_tracker)[edge_indices].tolist()):
+            edge_data = {'id': edge_id, 'description': f'{source} -> {target}', 'source': source, 'target': target}
+            if relationship is not None:
+                edge_data['relationship'] = relationship
+            edge_data['encoded_connection'] = [source_level, target_level]
+            edge_data['years_of_connection'] = all_years[year_start:year_end]
+            edge_data['team_of_connection'] = team
+            edge_data['mentor_status'] = mentor_status
+            edge_data['source_position'] = source_position
+            edge_data['target_position'] = target_position
+            edge_data['visualization_tracker'] = tracker
+            elements.append({'data': edge_data})
+        return elements
+
+    def iter_elements(self, batch_size: int = 4096):
+        """Yields the element dicts one at a time, nodes first then edges, rebuilding batch_size of them at once"""
+        for start in range(0, self.node_count, batch_size):
+            yield from self._node_elements(np.arange(start, min(start + batch_size, self.node_count)))
+        for start in range(0, self.edge_count, batch_size):
+            yield from self._edge_elements(np.arange(start, min(start + batch_size, self.edge_count)))
+
+    def elements(self) -> list:
+        """Rebuilds the full element list, nodes first then edges (same order as the JSON dump)"""
+        return self._node_elements(np.arange(self.node_count)) + self._edge_elements(np.arange(self.edge_count))
+
+    def edge_indices_for_teams(self, teams) -> np.ndarray:
+        """Returns the indices of all edges whose 'team_of_connection' is in teams, using the team index"""
+        team_rank = {self.string(int(t)): rank for rank, t in enumerate(self.team_ids)}
+        chunks = [self.team_edge_order[self.team_edge_offsets[team_rank[team]]:self.team_edge_offsets[team_rank[team] + 1]]
+                  for team in set(teams) if team in team_rank]
+        if not chunks:
+            return np.zeros(0, dtype=np.int32)
+        return np.sort(np.concatenate(chunks))
+
+    def elements_for_teams(self, teams) -> list:
+        """
+        Rebuilds only the edges of the given teams plus the nodes they touch, which is all
+        :func:`dash_graph_internals.generate_legend_and_highlights` needs for a selection.
+        """
+        edge_indices = self.edge_indices_for_teams(teams)
+        node_indices = np.unique(np.concatenate([self.edge_source[edge_indices], self.edge_target[edge_indices]]))
+        return self._node_elements(node_indices) + self._edge_elements(edge_indices)
+
+
+class ElementArchive(ElementStore):
+    """
+    Read-only view over a single-file archive written by :func:`write_element_archive`.
+
+    Each column is decompressed once when the archive is opened (columns are small integer arrays), element
+    dicts are then rebuilt on demand exactly like :class:`ElementStore`.
+
+    Attributes:
+        store_dir (str): Path the archive was opened from
+        node_count (int): Number of nodes in the archive
+        edge_count (int): Number of edges in the archive
+    """
+    def __init__(self, archive_path: str):
+        with np.load(archive_path) as archive:
+            arrays = {name: archive[name] for name in archive.files}
+        self.store_dir = archive_path
+        self._load_arrays(json.loads(arrays.pop('manifest').tobytes()), arrays.__getitem__, arrays.pop('strings'))
+
+
+@lru_cache(maxsize=2)
+def _open_element_store(store_dir: str, _version: str) -> ElementStore:
+    if store_dir.endswith('.npz'):
+        return ElementArchive(store_dir)
+    return ElementStore(store_dir)
+
+
+def open_element_store(store_dir: str) -> ElementStore:
+    """
+    Opens the element store at store_dir, or the archive if store_dir is a '.npz' file, once per version
+    of its manifest (or archive), so a rebuilt store is reopened instead of serving stale mappings
+    """
+    from dash_graph_internals import dataset_version
+
+    return _open_element_store(store_dir, dataset_version(store_dir if store_dir.endswith('.npz')
+                                                          else os.path.join(store_dir, 'manifest.json')))
+
+
+def configured_element_store():
+    """
+    Returns the element store named by the 'COACHING_ELEMENT_STORE' environment variable,
+    or None if the app should read the JSON dump instead.
+    """
+    store_dir = os.environ.get(ELEMENT_STORE_ENV_VAR)
+    if not store_dir:
+        return None
+    return open_element_store(store_dir)
+
+
+if __name__ == '__main__':
+    import sys
+
+    compress = '--uncompressed' not in sys.argv
+    paths = [arg for arg in sys.argv[1:] if arg != '--uncompressed']
+    json_dump = paths[0] if len(paths) > 0 else 'data/visualization_elements_dump.json'
+    output_dir = paths[1] if len(paths) > 1 else 'data/element_store'
+    with open(json_dump, encoding='utf-8') as f:
+        dumped_elements = json.load(f)
+    if output_dir.endswith('.npz'):
+        write_element_archive(dumped_elements, output_dir, compress=compress)
+        print(f"Wrote element archive for {json_dump} to {output_dir}")
+    else:
+        build_element_store(dumped_elements, output_dir)
+        print(f"Wrote element store for {json_dump} to {output_dir}")
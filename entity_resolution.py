@@ -0,0 +1,283 @@
+"""
+Entity resolution for coach names, between 'clean_duplicates_json' and the CSV the graph is built from.
+
+On3 jobs only carry a coach's name, so name variants ("Mike"/"Michael", suffixes, punctuation) split one person into
+several nodes, and different people with the same name merge into one. Resolution works on source profiles: the jobs
+scraped from one On3 coach page (identified by 'Slug' when the scrape recorded it, else by consecutive jobs with the
+same name, which is how pages are written by :func:`On3_coaching_parsing.generate_coaching_database_json`).
+
+- Blocking: profiles are grouped by a phonetic key (Soundex) of their normalized surname, and only profiles in the
+  same block are compared, so the work grows with the size of the blocks instead of with every pair of coaches.
+- Matching: two profiles are the same coach when their first names match (after nickname and fuzzy comparison),
+  they share at least one team-season, and they were never on different staffs for more than one season.
+  Name similarity alone is not enough, ex: Mark and Mike Stoops coached together but are different people.
+- IDs: each resolved coach gets a stable 'Coach ID' (a slug of their name), kept across refreshes by a registry that
+  remembers the team-seasons of every ID. Different coaches with the same name are told apart by their first team.
+
+Run it as a pipeline stage with::
+
+    python entity_resolution.py coach_jobs_clean coach_jobs_resolved
+"""
+import json
+import os
+import re
+import unicodedata
+from difflib import SequenceMatcher
+from profiling import profiled
+
+COACH_ID_REGISTRY = 'data/coach_ids.json'
+
+NAME_SUFFIXES = {'jr', 'sr', 'ii', 'iii', 'iv', 'v'}
+
+NICKNAMES = {
+    'al': 'albert', 'alex': 'alexander', 'andy': 'andrew', 'drew': 'andrew', 'ben': 'benjamin', 'bill': 'william',
+    'billy': 'william', 'will': 'william', 'bob': 'robert', 'bobby': 'robert', 'rob': 'robert', 'robbie': 'robert',
+    'brad': 'bradley', 'charlie': 'charles', 'chuck': 'charles', 'chris': 'christopher', 'dan': 'daniel',
+    'danny': 'daniel', 'dave': 'david', 'don': 'donald', 'donnie': 'donald', 'ed': 'edward', 'eddie': 'edward',
+    'fred': 'frederick', 'greg': 'gregory', 'jake': 'jacob', 'jim': 'james', 'jimmy': 'james', 'jeff': 'jeffrey',
+    'jerry': 'gerald', 'joe': 'joseph', 'joey': 'joseph', 'johnny': 'john', 'jon': 'john', 'josh': 'joshua',
+    'ken': 'kenneth', 'kenny': 'kenneth', 'larry': 'lawrence', 'matt': 'matthew', 'mike': 'michael',
+    'mikey': 'michael', 'nate': 'nathan', 'nick': 'nicholas', 'pat': 'patrick', 'phil': 'phillip', 'rich': 'richard',
+    'rick': 'richard', 'ricky': 'richard', 'ron': 'ronald', 'ronnie': 'ronald', 'sam': 'samuel', 'steve': 'steven',
+    'terry': 'terrence', 'tim': 'timothy', 'tom': 'thomas', 'tommy': 'thomas', 'tony': 'anthony', 'wes': 'wesley',
+    'zach': 'zachary', 'zack': 'zachary',
+}
+
+# Seasons a coach may appear on two staffs, ex: a job ending in 2024 and the next one starting in 2024
+MAX_CONFLICTING_SEASONS = 1
+
+FIRST_NAME_SIMILARITY = 0.85
+
+
+def normalize_name(name: str) -> list:
+    """Lowercased, accent and punctuation free name parts without suffixes, ex: 'A.J. Milwee Jr.' -> ['aj', 'milwee']"""
+    ascii_name = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode()
+    parts = re.sub(r"[^a-z\s-]", '', ascii_name.lower()).replace('-', ' ').split()
+    return [part for part in parts if part not in NAME_SUFFIXES] or parts
+
+
+def soundex(word: str) -> str:
+    """American Soundex code of a word, ex: 'Robert' and 'Rupert' -> 'R163'"""
+    codes = {**dict.fromkeys('bfpv', '1'), **dict.fromkeys('cgjkqsxz', '2'), **dict.fromkeys('dt', '3'),
+             'l': '4', **dict.fromkeys('mn', '5'), 'r': '6'}
+    letters = [char for char in word.lower() if char.isalpha()]
+    if not letters:
+        return ''
+    encoded = letters[0].upper()
+    previous = codes.get(letters[0], '')
+    for char in letters[1:]:
+        code = codes.get(char, '')
+        if code and code != previous:
+            encoded += code
+        if char not in 'hw': # h and w do not separate letters with the same code
+            previous = code
+    return (encoded + '000')[:4]
+
+
+def blocking_key(name: str) -> str:
+    """Phonetic key of the surname, only profiles sharing it are compared"""
+    parts = normalize_name(name)
+    return soundex(parts[-1]) if parts else ''
+
+
+def first_names_match(name_a: str, name_b: str) -> bool:
+    """Whether two names (of the same block) can be the same person: same first name up to nicknames or a typo"""
+    parts_a, parts_b = normalize_name(name_a), normalize_name(name_b)
+    if not parts_a or not parts_b:
+        return False
+    first_a, first_b = NICKNAMES.get(parts_a[0], parts_a[0]), NICKNAMES.get(parts_b[0], parts_b[0])
+    return first_a == first_b or SequenceMatcher(None, first_a, first_b).ratio() >= FIRST_NAME_SIMILARITY
+
+
+def team_seasons(jobs: list) -> dict:
+    """{season: set of teams} of a list of jobs"""
+    seasons = {}
+    for job in jobs:
+        for season in job.get('Seasons at Position') or []:
+            seasons.setdefault(int(season), set()).add(job['Team'])
+    return seasons
+
+
+def careers_match(seasons_a: dict, seasons_b: dict) -> bool:
+    """
+    Whether two careers ({season: set of teams}) can belong to one coach: they share at least one team-season and
+    are on disjoint staffs in at most MAX_CONFLICTING_SEASONS seasons
+    """
+    shared = conflicts = 0
+    for season in seasons_a.keys() & seasons_b.keys():
+        if seasons_a[season] & seasons_b[season]:
+            shared += 1
+        else:
+            conflicts += 1
+    return shared > 0 and conflicts <= MAX_CONFLICTING_SEASONS
+
+
+def split_profiles(jobs: list) -> list:
+    """Groups jobs into source profiles, by 'Slug' when present, else by runs of consecutive jobs with the same name"""
+    profiles = []
+    profile_keys = {}
+    previous_name = None
+    for job in jobs:
+        if job.get('Slug'):
+            key = ('slug', job['Slug'])
+        elif job['Name'] == previous_name and profiles:
+            key = profiles[-1][0]
+        else:
+            key = ('run', len(profiles))
+        previous_name = job['Name']
+        if key not in profile_keys:
+            profile_keys[key] = len(profiles)
+            profiles.append((key, []))
+        profiles[profile_keys[key]][1].append(job)
+    return [profile_jobs for _, profile_jobs in profiles]
+
+
+def resolve_profiles(profiles: list) -> list:
+    """
+    Clusters source profiles into coaches.
+
+    Args:
+        profiles (list): Lists of jobs (dicts with 'Name', 'Team' and 'Seasons at Position'), see :func:`split_profiles`
+
+    Returns:
+        list: For each profile, the index of its coach (the smallest index of a profile of that coach)
+    """
+    parent = list(range(len(profiles)))
+
+    def find(idx):
+        while parent[idx] != idx:
+            parent[idx] = parent[parent[idx]]
+            idx = parent[idx]
+        return idx
+
+    blocks = {}
+    for idx, jobs in enumerate(profiles):
+        blocks.setdefault(blocking_key(jobs[0]['Name']), []).append(idx)
+
+    careers = [team_seasons(jobs) for jobs in profiles]
+    for members in blocks.values():
+        for position, idx_a in enumerate(members):
+            for idx_b in members[position + 1:]:
+                if find(idx_a) == find(idx_b):
+                    continue
+                if first_names_match(profiles[idx_a][0]['Name'], profiles[idx_b][0]['Name']) \
+                        and careers_match(careers[idx_a], careers[idx_b]):
+                    root_a, root_b = find(idx_a), find(idx_b)
+                    parent[max(root_a, root_b)] = min(root_a, root_b)
+    return [find(idx) for idx in range(len(profiles))]
+
+
+def slugify(text: str) -> str:
+    return '-'.join(re.sub(r"[^a-z0-9\s-]", '', unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode().lower()).split())
+
+
+def assign_coach_ids(coaches: list, registry: dict) -> list:
+    """
+    Gives each coach a stable ID.
+
+    Args:
+        coaches (list): (name, jobs) per resolved coach
+        registry (dict): {coach ID: list of 'team|season' keys}, the IDs of earlier runs. Updated in place
+
+    Returns:
+        list: Coach ID of each coach. A coach keeps the registered ID (of the same name) sharing the most team-seasons
+        with them, else gets the slug of their name, suffixed with '-2', '-3'... if it is already used
+    """
+    keys = [{f"{team}|{season}" for season, teams in team_seasons(jobs).items() for team in teams} for _, jobs in coaches]
+    order = sorted(range(len(coaches)), key=lambda idx: (min((int(season) for job in coaches[idx][1]
+                                                             for season in job.get('Seasons at Position') or []), default=0),
+                                                        coaches[idx][0]))
+    registered_keys = {coach_id: set(coach_keys) for coach_id, coach_keys in registry.items()}
+    ids_by_base = {}
+    for coach_id in registered_keys:
+        ids_by_base.setdefault(re.sub(r"-\d+$", '', coach_id), []).append(coach_id)
+    taken = set()
+    coach_ids = [None] * len(coaches)
+    for idx in order:
+        base = slugify(coaches[idx][0])
+        overlaps = [(len(registered_keys[coach_id] & keys[idx]), coach_id)
+                    for coach_id in ids_by_base.get(base, []) if coach_id not in taken]
+        best_overlap, best_id = max(overlaps, default=(0, None))
+        if best_overlap == 0:
+            best_id, suffix = base, 1
+            while best_id in taken or best_id in registered_keys:
+                suffix += 1
+                best_id = f"{base}-{suffix}"
+        taken.add(best_id)
+        coach_ids[idx] = best_id
+        registry[best_id] = sorted(keys[idx])
+    return coach_ids
+
+
+def resolve_coach_entities(jobs: list, registry: dict = None) -> list:
+    """
+    Resolves the coaches of a list of jobs.
+
+    Args:
+        jobs (list): Cleaned jobs, see :func:`On3_coaching_parsing.clean_duplicates_json`
+        registry (dict, optional): Coach ID registry, see :func:`assign_coach_ids`. Updated in place
+
+    Returns:
+        list: The jobs, each with a 'Coach ID' and a 'Name' unique to its coach: the most common name of the coach's
+        profiles, followed by their first team in parentheses when another coach has the same name
+    """
+    profiles = split_profiles(jobs)
+    profile_coach = resolve_profiles(profiles)
+
+    coach_profiles = {}
+    for idx, coach in enumerate(profile_coach):
+        coach_profiles.setdefault(coach, []).append(idx)
+
+    coaches = []
+    for members in coach_profiles.values():
+        names = [profiles[idx][0]['Name'] for idx in members]
+        name = max(names, key=lambda candidate: (names.count(candidate), len(candidate), candidate))
+        coaches.append((name, [job for idx in members for job in profiles[idx]]))
+
+    coach_ids = assign_coach_ids(coaches, registry if registry is not None else {})
+    name_counts = {}
+    for name, _ in coaches:
+        name_counts[name] = name_counts.get(name, 0) + 1
+
+    resolved = []
+    for (name, coach_jobs), coach_id in zip(coaches, coach_ids):
+        if name_counts[name] > 1:
+            first_job = min(coach_jobs, key=lambda job: (job.get('Starting Season') or 0, job['Team']))
+            name = f"{name} ({first_job['Team']})"
+        resolved.extend({**job, 'Name': name, 'Coach ID': coach_id} for job in coach_jobs)
+    return resolved
+
+
+@profiled
+def resolve_coach_entities_json(json_file_input, resolved_file_name, registry_path=COACH_ID_REGISTRY):
+    """
+    Pipeline stage: reads 'data/{json_file_input}.json', resolves its coaches and writes 'data/{resolved_file_name}.json',
+    keeping coach IDs stable through the registry at registry_path.
+    """
+    with open(f'data/{json_file_input}.json', 'r') as cleaned_data_file:
+        jobs = json.load(cleaned_data_file)
+
+    registry = {}
+    if os.path.exists(registry_path):
+        with open(registry_path, 'r') as registry_file:
+            registry = json.load(registry_file)
+
+    resolved = resolve_coach_entities(jobs, registry)
+
+    with open(f'data/{resolved_file_name}.json', 'w') as resolved_data_file:
+        json.dump(resolved, resolved_data_file, indent=4)
+    with open(registry_path, 'w') as registry_file:
+        json.dump(registry, registry_file, indent=4, sort_keys=True)
+    return resolved
+
+
+if __name__ == '__main__':
+    import sys
+    from profiling import enable_profiling_from_cli
+
+    enable_profiling_from_cli()
+    input_name = sys.argv[1] if len(sys.argv) > 1 else 'coach_jobs_clean'
+    output_name = sys.argv[2] if len(sys.argv) > 2 else 'coach_jobs_resolved'
+    resolved_jobs = resolve_coach_entities_json(input_name, output_name)
+    print(f"Resolved {len({job['Coach ID'] for job in resolved_jobs})} coaches from {len(resolved_jobs)} jobs "
+          f"in data/{input_name}.json, wrote data/{output_name}.json")
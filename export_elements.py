@@ -1,11 +1,26 @@
 import json
-from basic_graph_generation import create_nx_graph
-import pandas as pd
+from profiling import profiled, enable_profiling_from_cli
 
-# Load your data (adjust the path and filename as needed)
-df = pd.read_csv("data/clean_sorted_coach_jobs.csv")
-G = create_nx_graph(df)
+def iter_elements(G, full_elements):
+    '''
+    Yields a networkx graph's nodes and edges as cytoscape elements, one at a time, in the same order and with the
+    same edge ids as :func:`export_elements`. See :func:`export_elements` for full_elements.
+    '''
+    for node in G.nodes:
+        yield {'data': {'id': str(node), 'coach_name': str(node)}}
+
+    for idx, (source, target, data) in enumerate(G.edges(data=True)):
+        # Only include edges where visualization_tracker == 1 unless exporting full elements
+        if full_elements == True or data.get('visualization_tracker', 0) == 1:
+            yield {'data': {
+                'id': f'edge-{idx}',
+                'description': f'{source} -> {target}',
+                'source': str(source),
+                'target': str(target),
+                **data
+            }}
 
+@profiled
 def export_elements(G, full_elements):
     '''
     Exports a networkx graph's data as  JSON file for faster loading into a Dash graph.
@@ -16,41 +31,108 @@ def export_elements(G, full_elements):
 
     Use Guide: full_elements == False should be used if you only plan on using the Dash graph, full_elements == True should be used if doing graph exploration
     '''
-    elements = []
+    return list(iter_elements(G, full_elements))
 
-    for node in G.nodes:
-        elements.append({'data': {'id': str(node), 'coach_name': str(node)}})
+class _JSONArrayWriter:
+    '''
+    Writes a JSON array of elements one element at a time, so the file never has to exist in memory.
+    indent=None writes one compact element per line.
+    '''
+    def __init__(self, path, indent=None):
+        self.file = open(path, 'w', encoding='utf-8')
+        self.indent = indent
+        self.count = 0
+        self.file.write('[')
 
-    for idx, (source, target, data) in enumerate(G.edges(data=True)):
-        if full_elements == True:
-            edge_data = {
-                'id': f'edge-{idx}',
-                'description': f'{source} -> {target}',
-                'source': str(source),
-                'target': str(target),
-                **data
-            }
-            elements.append({'data': edge_data})    
-        
-        
-        # Only include edges where visualization_tracker == 1   
-        if full_elements == False:    
-            if data.get('visualization_tracker', 0) == 1:
-                edge_data = {
-                    'id': f'edge-{idx}',
-                    'description': f'{source} -> {target}',
-                    'source': str(source),
-                    'target': str(target),
-                    **data
-                }
-                elements.append({'data': edge_data})
-
-    return elements
-
-
-
-elements = export_elements(G, full_elements=False)
-
-# Be sure to change the file name! Recommended to swap between full_elements_dump and visualization_elements_dump
-with open('data/visualization_elements_dump.json', 'w', encoding='utf-8') as f:
-    f.write(json.dumps(elements, ensure_ascii=False, indent=2))
\ No newline at end of file
+    def write(self, element):
+        text = json.dumps(element, ensure_ascii=False, indent=self.indent)
+        if self.indent:
+            text = text.replace('\n', '\n' + ' ' * self.indent)
+            text = ' ' * self.indent + text
+        self.file.write(('\n' if self.count == 0 else ',\n') + text)
+        self.count += 1
+
+    def close(self):
+        self.file.write('\n]\n')
+        self.file.close()
+
+@profiled
+def write_element_dumps(G, full_path=None, visualization_path=None, indent=None, shard_dir=None):
+    '''
+    Streams the full and visualization JSON dumps of a networkx graph in a single pass over its nodes and edges.
+
+    Args:
+        G (nx.MultiDiGraph): Graph built by 'create_nx_graph' in 'basic_graph_generation.py'
+        full_path (str, optional): Where to write every edge (full_elements == True), skipped if None
+        visualization_path (str, optional): Where to write the visualization edges (full_elements == False), skipped if None
+        indent (int, optional): JSON indentation of each element, None writes one compact element per line
+        shard_dir (str, optional): Where to write per-team shards of the visualization elements (see 'element_shards.py'), skipped if None
+
+    Returns:
+        dict: Number of elements written to each path
+
+    Note:
+        Elements are written as soon as they are built, so memory use does not grow with the size of the graph.
+    '''
+    writers = {}
+    if full_path:
+        writers['full'] = _JSONArrayWriter(full_path, indent)
+    if visualization_path:
+        writers['visualization'] = _JSONArrayWriter(visualization_path, indent)
+    shard_writer = None
+    if shard_dir:
+        from element_shards import ElementShardWriter
+
+        shard_writer = ElementShardWriter(shard_dir)
+
+    try:
+        for element in iter_elements(G, full_elements=True):
+            data = element['data']
+            if 'full' in writers:
+                writers['full'].write(element)
+            if 'source' not in data or data.get('visualization_tracker', 0) == 1:
+                if 'visualization' in writers:
+                    writers['visualization'].write(element)
+                if shard_writer is not None:
+                    shard_writer.write(element)
+    finally:
+        for writer in writers.values():
+            writer.close()
+        if shard_writer is not None:
+            shard_writer.close()
+
+    return {path: writers[variant].count for variant, path in (('full', full_path), ('visualization', visualization_path))
+            if variant in writers}
+
+
+if __name__ == '__main__':
+    import argparse
+    import pandas as pd
+    from basic_graph_generation import create_nx_graph
+    from element_shards import ELEMENT_SHARDS_DIR
+
+    enable_profiling_from_cli()
+
+    parser = argparse.ArgumentParser(description="Exports the coaching graph for the Dash app. Pass '' as a path to skip that output.")
+    parser.add_argument('--csv', default='data/clean_sorted_coach_jobs.csv', help="Jobs CSV generated by On3_coaching_parsing")
+    parser.add_argument('--full', default='data/full_elements_dump.json', help="JSON dump with every edge, for graph exploration")
+    parser.add_argument('--visualization', default='data/visualization_elements_dump.json', help="JSON dump with the visualization edges, read by the Dash app")
+    parser.add_argument('--shards', default=ELEMENT_SHARDS_DIR, help="Directory for the per-team shards of the visualization elements (see element_shards.py)")
+    parser.add_argument('--archive', default='', help="Path of a '.npz' archive of the visualization elements (see element_store.py). "
+                                                      "Off by default: the archive is columnar, so it holds every visualization element in memory")
+    parser.add_argument('--indent', type=int, default=None, help="JSON indentation of each element, compact by default")
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.csv)
+    G = create_nx_graph(df)
+
+    for path, count in write_element_dumps(G, args.full, args.visualization, args.indent, args.shards).items():
+        print(f"Wrote {count} elements to {path}")
+    if args.shards:
+        print(f"Wrote per-team shards to {args.shards}")
+
+    if args.archive:
+        from element_store import write_element_archive
+
+        write_element_archive(export_elements(G, full_elements=False), args.archive)
+        print(f"Wrote element archive to {args.archive}")
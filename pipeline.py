@@ -0,0 +1,275 @@
+"""
+Memoized runner for the data pipeline, from the On3 scrape to the files the Dash app loads.
+
+Each stage declares the files it reads and writes, the parameters it depends on and the modules holding its code.
+Before running a stage, the runner hashes the contents of its inputs, its parameters and the source of those modules
+into a key. A stage is skipped when its key matches the key recorded in 'data/pipeline_state.json' by the last run,
+and its outputs still have the contents that run wrote. Stages whose inputs are ready run concurrently, in separate processes.
+
+The position-level lists of basic_graph_generation are parameters of the stages that encode positions, so changing
+a position mapping only reruns the graph export and the tables built from encoded positions, never the scrape. Editing
+'On3_coaching_parsing.py' does rerun the scrape, start from a later stage (--from resolve) to avoid it.
+
+The slug crawl has no input file, so its key changes every SLUG_MAX_AGE_DAYS days (and at the start of every year):
+the crawl, and the scrape after it, rerun at least that often to pick up new coaches. Pass --force slugs to crawl sooner.
+
+Usage::
+
+    python pipeline.py                        # Runs every stage that is out of date
+    python pipeline.py --from resolve         # Starts from the existing 'data/coach_jobs_clean.json', no scrape
+    python pipeline.py --force elements       # Reruns a stage even if it is up to date
+    python pipeline.py --dry-run              # Lists the stages that would run
+    python pipeline.py --slug-max-age 7       # Crawls the coach slugs again every week
+"""
+import hashlib
+import importlib.util
+import inspect
+import json
+import os
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+PIPELINE_STATE = 'data/pipeline_state.json'
+SLUG_MAX_AGE_DAYS = 30
+
+# modules: names of the modules holding the code the stage runs, their source is part of the stage key
+Stage = namedtuple('Stage', ['name', 'func', 'inputs', 'outputs', 'params', 'modules'], defaults=[()])
+
+
+def _scrape_slugs(slugs_name, url, params, first_year, refresh_period):
+    from On3_coaching_parsing import pull_coach_slugs
+    pull_coach_slugs(url, dict(params), slugs_name)
+
+
+def _scrape_histories(slugs_name, raw_name):
+    from On3_coaching_parsing import generate_coaching_database_json
+    generate_coaching_database_json(slugs_name, raw_name)
+
+
+def _clean(raw_name, clean_name):
+    from On3_coaching_parsing import clean_duplicates_json
+    clean_duplicates_json(raw_name, clean_name)
+
+
+def _resolve(clean_name, resolved_name, registry_path):
+    from entity_resolution import resolve_coach_entities_json
+    resolve_coach_entities_json(clean_name, resolved_name, registry_path)
+
+
+def _to_csv(resolved_name, csv_name):
+    from On3_coaching_parsing import cleaned_json_to_csv
+    cleaned_json_to_csv(resolved_name, csv_name)
+
+
+def _export_elements(csv_path, full_path, visualization_path, shard_dir, position_levels):
+    import pandas as pd
+    from basic_graph_generation import create_nx_graph
+    from export_elements import write_element_dumps
+
+    write_element_dumps(create_nx_graph(pd.read_csv(csv_path)), full_path, visualization_path, shard_dir=shard_dir)
+
+
+def _staff_metrics(csv_path, metrics_path, position_levels):
+    import pandas as pd
+    from staff_metrics import compute_staff_metrics
+
+    compute_staff_metrics(pd.read_csv(csv_path)).to_csv(metrics_path, index=False)
+
+
+def _team_flows(csv_path, flows_path):
+    import pandas as pd
+    from team_flow import compute_team_flows
+
+    compute_team_flows(pd.read_csv(csv_path)).to_csv(flows_path, index=False)
+
+
+def default_stages(slug_max_age_days: int = SLUG_MAX_AGE_DAYS) -> list:
+    """
+    The stages of the coaching pipeline, in dependency order. File names follow On3_coaching_parsing (names without
+    'data/' and '.json') and export_elements (paths)
+
+    Args:
+        slug_max_age_days (int): The slug crawl reruns when the current date falls in a new window of this many days
+    """
+    from datetime import date, datetime
+    from basic_graph_generation import level1_coach, level2_coach, level3_coach, level4_coach, level5_coach
+    from element_shards import ELEMENT_SHARDS_DIR
+    from entity_resolution import COACH_ID_REGISTRY
+    from On3_coaching_parsing import params, url
+    from staff_metrics import STAFF_METRICS_CSV
+    from team_flow import TEAM_FLOWS_CSV
+
+    position_levels = [level1_coach, level2_coach, level3_coach, level4_coach, level5_coach]
+    csv_path = 'data/clean_sorted_coach_jobs.csv'
+    visualization_path = 'data/visualization_elements_dump.json'
+    return [
+        # The slug crawl has no input file: it walks every year from the current one, so a new year reruns it, and
+        # refresh_period changes every slug_max_age_days days, so new coaches are picked up during the year too
+        Stage('slugs', _scrape_slugs, [], ['data/coach_slugs.json'],
+              {'slugs_name': 'coach_slugs', 'url': url, 'params': params, 'first_year': datetime.now().year,
+               'refresh_period': date.today().toordinal() // slug_max_age_days},
+              ('On3_coaching_parsing',)),
+        Stage('histories', _scrape_histories, ['data/coach_slugs.json'], ['data/coach_jobs_raw.json'],
+              {'slugs_name': 'coach_slugs', 'raw_name': 'coach_jobs_raw'}, ('On3_coaching_parsing',)),
+        Stage('clean', _clean, ['data/coach_jobs_raw.json'], ['data/coach_jobs_clean.json'],
+              {'raw_name': 'coach_jobs_raw', 'clean_name': 'coach_jobs_clean'}, ('On3_coaching_parsing',)),
+        Stage('resolve', _resolve, ['data/coach_jobs_clean.json'], ['data/coach_jobs_resolved.json'],
+              {'clean_name': 'coach_jobs_clean', 'resolved_name': 'coach_jobs_resolved', 'registry_path': COACH_ID_REGISTRY},
+              ('entity_resolution',)),
+        Stage('csv', _to_csv, ['data/coach_jobs_resolved.json'], [csv_path],
+              {'resolved_name': 'coach_jobs_resolved', 'csv_name': 'clean_sorted_coach_jobs'}, ('On3_coaching_parsing',)),
+        # The shards are streamed in the same pass as the dumps, see export_elements.write_element_dumps
+        Stage('elements', _export_elements, [csv_path],
+              ['data/full_elements_dump.json', visualization_path,
+               os.path.join(ELEMENT_SHARDS_DIR, 'shards.jsonl'), os.path.join(ELEMENT_SHARDS_DIR, 'manifest.json')],
+              {'csv_path': csv_path, 'full_path': 'data/full_elements_dump.json', 'visualization_path': visualization_path,
+               'shard_dir': ELEMENT_SHARDS_DIR, 'position_levels': position_levels},
+              ('basic_graph_generation', 'export_elements', 'element_shards')),
+        Stage('staff_metrics', _staff_metrics, [csv_path], [STAFF_METRICS_CSV],
+              {'csv_path': csv_path, 'metrics_path': STAFF_METRICS_CSV, 'position_levels': position_levels},
+              ('staff_metrics', 'basic_graph_generation')),
+        Stage('team_flows', _team_flows, [csv_path], [TEAM_FLOWS_CSV],
+              {'csv_path': csv_path, 'flows_path': TEAM_FLOWS_CSV}, ('team_flow', 'basic_graph_generation')),
+    ]
+
+
+def file_hash(path: str):
+    """sha256 of a file's contents, None if it does not exist"""
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def module_hash(module_name: str):
+    """sha256 of a module's source file, found without importing it"""
+    spec = importlib.util.find_spec(module_name)
+    return file_hash(spec.origin) if spec is not None and spec.origin else None
+
+
+def stage_key(stage: Stage) -> str:
+    """Hash of a stage's code (its function and the modules it declares), parameters and input contents"""
+    digest = hashlib.sha256()
+    digest.update(inspect.getsource(stage.func).encode())
+    for module_name in stage.modules:
+        digest.update(f"{module_name}:{module_hash(module_name)}".encode())
+    digest.update(json.dumps(stage.params, sort_keys=True, default=str).encode())
+    for path in stage.inputs:
+        digest.update(f"{path}:{file_hash(path)}".encode())
+    return digest.hexdigest()
+
+
+def stage_dependencies(stages: list) -> dict:
+    """{stage name: names of the stages writing one of its inputs}"""
+    writers = {path: stage.name for stage in stages for path in stage.outputs}
+    return {stage.name: {writers[path] for path in stage.inputs if path in writers} for stage in stages}
+
+
+def _load_state(state_path: str) -> dict:
+    if not os.path.exists(state_path):
+        return {}
+    with open(state_path, 'r') as f:
+        return json.load(f)
+
+
+def _save_state(state: dict, state_path: str) -> None:
+    with open(state_path, 'w') as f:
+        json.dump(state, f, indent=4, sort_keys=True)
+
+
+def is_up_to_date(stage: Stage, key: str, recorded: dict) -> bool:
+    """Whether the last run of a stage had the same key and its outputs were not changed since"""
+    return bool(recorded) and recorded.get('key') == key \
+        and all(file_hash(path) == recorded.get('outputs', {}).get(path) for path in stage.outputs)
+
+
+def run_pipeline(stages: list = None, state_path: str = PIPELINE_STATE, force: tuple = (), start: str = None,
+                 workers: int = None, dry_run: bool = False) -> dict:
+    """
+    Runs the stages that are out of date, each as soon as the stages it depends on are done.
+
+    Args:
+        stages (list, optional): :class:`Stage` list, :func:`default_stages` by default
+        state_path (str): JSON file recording the key and output hashes of each stage's last run
+        force (tuple): Names of stages to run even if they are up to date (their dependents then rerun as their inputs change)
+        start (str, optional): Name of the first stage to consider. The stages it depends on, directly or not, are
+            not run and their outputs are used as they are, ex: 'resolve' to skip the scrape
+        workers (int, optional): Maximum number of stages running at once, os.cpu_count() by default
+        dry_run (bool): Only report which stages are out of date, assuming each reruns its dependents
+
+    Returns:
+        dict: {stage name: 'ran', 'up to date', 'not run' (before start) or 'would run' (dry runs)}
+    """
+    stages = stages if stages is not None else default_stages()
+    by_name = {stage.name: stage for stage in stages}
+    dependencies = stage_dependencies(stages)
+    state = _load_state(state_path)
+
+    results = {}
+    if start is not None:
+        excluded = set()
+        pending_ancestors = list(dependencies[start])
+        while pending_ancestors:
+            name = pending_ancestors.pop()
+            if name not in excluded:
+                excluded.add(name)
+                pending_ancestors.extend(dependencies[name])
+        results.update(dict.fromkeys(excluded, 'not run'))
+
+    def ready_stages():
+        return [stage for stage in stages if stage.name not in results and stage.name not in running.values()
+                and all(dependency in results for dependency in dependencies[stage.name])]
+
+    running = {}
+    keys = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while True:
+            for stage in ready_stages():
+                key = stage_key(stage)
+                stale_dependency = any(results[dependency] == 'would run' for dependency in dependencies[stage.name])
+                if stage.name not in force and not stale_dependency and is_up_to_date(stage, key, state.get(stage.name)):
+                    results[stage.name] = 'up to date'
+                elif dry_run:
+                    results[stage.name] = 'would run'
+                else:
+                    print(f"Running stage '{stage.name}'")
+                    keys[stage.name] = key
+                    running[executor.submit(stage.func, **stage.params)] = stage.name
+            if not running:
+                if not ready_stages():
+                    break
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                future.result() # Raises the stage's exception, stopping the pipeline
+                # Inputs are only written by the stages this one waited for, so the key computed at submission still holds
+                state[name] = {'key': keys[name], 'outputs': {path: file_hash(path) for path in by_name[name].outputs}}
+                _save_state(state, state_path)
+                results[name] = 'ran'
+    return results
+
+
+if __name__ == '__main__':
+    import argparse
+    from profiling import enable_profiling_from_cli
+
+    enable_profiling_from_cli()
+    stage_names = [stage.name for stage in default_stages()]
+    parser = argparse.ArgumentParser(description="Runs the out of date stages of the coaching data pipeline.")
+    parser.add_argument('--from', dest='start', choices=stage_names, help="First stage to consider, earlier stages it depends on are not run")
+    parser.add_argument('--force', action='append', default=[], choices=stage_names, help="Stage to rerun even if it is up to date, can be repeated")
+    parser.add_argument('--workers', type=int, default=None, help="Maximum number of stages running at once")
+    parser.add_argument('--dry-run', action='store_true', help="Only list the stages that would run")
+    parser.add_argument('--slug-max-age', type=int, default=SLUG_MAX_AGE_DAYS,
+                        help="The coach slugs are crawled again every this many days, to pick up new coaches")
+    args = parser.parse_args()
+
+    results = run_pipeline(default_stages(args.slug_max_age), force=tuple(args.force), start=args.start,
+                           workers=args.workers, dry_run=args.dry_run)
+    for stage_name in stage_names:
+        print(f"{stage_name}: {results[stage_name]}")
@@ -0,0 +1,126 @@
+"""
+Opt-in profiling of pipeline stages and Dash helpers with cProfile and tracemalloc.
+
+Profiling is off by default and costs nothing when off. Turn it on without editing code by either:
+    - setting the 'COACHING_PROFILE' environment variable (ex: COACHING_PROFILE=1 python dash_graph.py)
+    - passing '--profile' to a script's entry point (ex: python export_elements.py --profile)
+
+Every invocation of a :func:`profiled` function then writes two files into the profiling directory
+('profiles' by default, or 'COACHING_PROFILE_DIR'):
+    - '<timestamp>-<function>.prof': the raw cProfile stats, readable with pstats or snakeviz
+    - '<timestamp>-<function>.txt': wall time, peak traced memory, the call's arguments, and the top-N functions
+      by cumulative time and the top-N allocation sites ('COACHING_PROFILE_TOP', 25 by default)
+"""
+import functools
+import os
+import sys
+import threading
+import time
+
+if __name__ == '__main__':
+    print("Error: you are running a file of function definitions, please run 'dash_graph.py' to generate the webpage")
+
+PROFILE_ENV_VAR = 'COACHING_PROFILE'
+PROFILE_DIR_ENV_VAR = 'COACHING_PROFILE_DIR'
+PROFILE_TOP_ENV_VAR = 'COACHING_PROFILE_TOP'
+PROFILE_CLI_FLAG = '--profile'
+
+# cProfile and tracemalloc are process-wide, so only one invocation is profiled at a time.
+# Nested profiled calls are already covered by the outer profile, concurrent calls in other threads run unprofiled.
+_profile_lock = threading.Lock()
+
+
+def profiling_enabled() -> bool:
+    return os.environ.get(PROFILE_ENV_VAR, '') not in ('', '0')
+
+
+def enable_profiling_from_cli(argv: list = None) -> bool:
+    """
+    Turns profiling on if '--profile' was passed on the command line, removing the flag so scripts that
+    read sys.argv positionally are unaffected.
+
+    Returns:
+        bool: Whether profiling is enabled
+    """
+    argv = sys.argv if argv is None else argv
+    if PROFILE_CLI_FLAG in argv:
+        argv.remove(PROFILE_CLI_FLAG)
+        os.environ[PROFILE_ENV_VAR] = '1'
+    return profiling_enabled()
+
+
+def _describe_arguments(args: tuple, kwargs: dict, max_length: int = 200) -> list:
+    """Short reprs of a call's arguments, so a profile can be matched to the selection that was slow"""
+    def short_repr(value):
+        if isinstance(value, (list, tuple, dict, set)) and len(value) > 20:
+            return f"<{type(value).__name__} of {len(value)} items>"
+        text = repr(value)
+        return text if len(text) <= max_length else text[:max_length] + '...'
+
+    return ([f"  arg {idx}: {short_repr(value)}" for idx, value in enumerate(args)]
+            + [f"  {name}: {short_repr(value)}" for name, value in kwargs.items()])
+
+
+def _write_profile(func_name: str, profiler, snapshot, wall_time: float, peak_memory: int, arguments: list) -> str:
+    import io
+    import pstats
+
+    profile_dir = os.environ.get(PROFILE_DIR_ENV_VAR, 'profiles')
+    top_n = int(os.environ.get(PROFILE_TOP_ENV_VAR, 25))
+    os.makedirs(profile_dir, exist_ok=True)
+    base_name = os.path.join(profile_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{func_name}")
+
+    profiler.dump_stats(f"{base_name}.prof")
+
+    stats_output = io.StringIO()
+    pstats.Stats(profiler, stream=stats_output).sort_stats('cumulative').print_stats(top_n)
+
+    summary = [f"Function: {func_name}",
+               f"Wall time: {wall_time:.3f} s",
+               f"Peak traced memory: {peak_memory / 1024 / 1024:.1f} MiB",
+               "Arguments:"] + arguments
+    summary += ["", f"Top {top_n} functions by cumulative time:", stats_output.getvalue()]
+    summary += [f"Top {top_n} allocation sites:"]
+    summary += [f"  {stat}" for stat in snapshot.statistics('lineno')[:top_n]]
+
+    with open(f"{base_name}.txt", 'w', encoding='utf-8') as f:
+        f.write('\n'.join(summary) + '\n')
+    return base_name
+
+
+def profiled(func):
+    """
+    Decorator profiling each call of func with cProfile and tracemalloc when profiling is enabled
+    (see module docstring). Calls run unchanged when profiling is disabled.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not profiling_enabled() or not _profile_lock.acquire(blocking=False):
+            return func(*args, **kwargs)
+
+        import cProfile
+        import tracemalloc
+
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        try:
+            profiler.enable()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler.disable()
+                wall_time = time.perf_counter() - start
+                _, peak_memory = tracemalloc.get_traced_memory()
+                snapshot = tracemalloc.take_snapshot()
+                if started_tracing:
+                    tracemalloc.stop()
+                base_name = _write_profile(func.__name__, profiler, snapshot, wall_time, peak_memory,
+                                           _describe_arguments(args, kwargs))
+                print(f"Profile of {func.__name__} written to {base_name}.prof/.txt")
+        finally:
+            _profile_lock.release()
+    return wrapper
@@ -0,0 +1,141 @@
+"""
+Year-sliced snapshots of the coaching network, for scrubbing through seasons in the Dash app.
+
+A snapshot over a window of seasons [first, last] holds every edge with a year of connection in the window,
+and every coach touched by one of those edges. :class:`SeasonSnapshots` indexes edges and coaches by season once
+per dataset version, and precomputes the delta (edges and coaches added and removed) between each pair of
+consecutive single seasons. Moving the slider then only sends those additions and removals to the browser
+(see :func:`dash_graph_internals.patch_from_delta`), instead of rescanning and resending the whole network.
+"""
+from bisect import bisect_left
+from functools import cached_property, lru_cache
+
+if __name__ == '__main__':
+    print("Error: you are running a file of function definitions, please run 'dash_graph.py' to generate the webpage")
+
+
+def _in_window(years: tuple, first: int, last: int) -> bool:
+    """Whether a sorted tuple of years has at least one year within [first, last]"""
+    idx = bisect_left(years, first)
+    return idx < len(years) and years[idx] <= last
+
+
+class SeasonSnapshots:
+    """
+    Season index of the cytoscape elements.
+
+    Attributes:
+        years (list): Every season with at least one edge, in ascending order
+        node_elements (dict): {coach: trimmed node element}
+        edge_elements (dict): {edge id: trimmed edge element}
+        element_years (dict): {element id: sorted tuple of the seasons it is active in}, for coaches and edges
+        ids_by_year (dict): {season: [ids of the coaches and edges active that season]}
+        season_deltas (dict): {season: (removed ids, added ids)} going from the previous season to this one
+    """
+    def __init__(self, cytoscape_elements: list):
+        from dash_graph_internals import trim_element
+
+        self.node_elements = {}
+        self.edge_elements = {}
+        node_years = {}
+        edge_years = {}
+        for el in cytoscape_elements:
+            data = el.get('data', {})
+            if 'source' not in data:
+                self.node_elements[data['id']] = trim_element(el)
+                continue
+            years = data.get('years_of_connection') or []
+            years = set(years) if isinstance(years, list) else {years}
+            if not years:
+                continue
+            self.edge_elements[data['id']] = trim_element(el)
+            edge_years[data['id']] = years
+            for coach in (data['source'], data['target']):
+                node_years.setdefault(coach, set()).update(years)
+
+        self.element_years = {element_id: tuple(sorted(years))
+                              for element_id, years in list(node_years.items()) + list(edge_years.items())}
+        self.ids_by_year = {}
+        for element_id, years in self.element_years.items():
+            for year in years:
+                self.ids_by_year.setdefault(year, []).append(element_id)
+        self.years = sorted(self.ids_by_year)
+
+        self.season_deltas = {year: self.window_delta((year - 1, year - 1), (year, year))
+                              for year in self.years if year - 1 in self.ids_by_year}
+        # Memoized per instance rather than with lru_cache on the method, so old snapshots are freed once
+        # _load_season_snapshots drops them
+        self._snapshot_ids_cache = lru_cache(maxsize=64)(self._build_snapshot_ids)
+
+    @cached_property
+    def node_positions(self) -> dict:
+        """Preset positions of every coach active in some season, fixed so coaches stay in place while scrubbing"""
+        from dash_graph_internals import circle_layout_positions
+
+        return circle_layout_positions(sorted(coach for coach in self.node_elements if coach in self.element_years))
+
+    def element(self, element_id: str) -> dict:
+        return self.edge_elements.get(element_id) or self.node_elements.get(element_id)
+
+    def snapshot_ids(self, first: int, last: int) -> frozenset:
+        """Ids of every coach and edge active in [first, last]"""
+        return self._snapshot_ids_cache(first, last)
+
+    def _build_snapshot_ids(self, first: int, last: int) -> frozenset:
+        return frozenset(element_id for year in range(first, last + 1) for element_id in self.ids_by_year.get(year, ()))
+
+    def snapshot(self, first: int, last: int) -> list:
+        """Trimmed elements of the network over [first, last], coaches first then edges"""
+        ids = self.snapshot_ids(first, last)
+        return ([self.node_elements[element_id] for element_id in ids if element_id in self.node_elements]
+                + [self.edge_elements[element_id] for element_id in ids if element_id in self.edge_elements])
+
+    def window_delta(self, old_window: tuple, new_window: tuple):
+        """
+        Computes the change between two snapshots by only looking at the seasons entering and leaving the window.
+
+        Returns:
+            tuple: (removed ids (set), added ids (list))
+        """
+        (old_first, old_last), (new_first, new_last) = old_window, new_window
+        if (old_first, old_last) == (new_first, new_last):
+            return set(), []
+        leaving = [year for year in range(old_first, old_last + 1) if not new_first <= year <= new_last]
+        entering = [year for year in range(new_first, new_last + 1) if not old_first <= year <= old_last]
+
+        removed = {element_id for year in leaving for element_id in self.ids_by_year.get(year, ())
+                   if not _in_window(self.element_years[element_id], new_first, new_last)}
+        added = list(dict.fromkeys(element_id for year in entering for element_id in self.ids_by_year.get(year, ())
+                                   if not _in_window(self.element_years[element_id], old_first, old_last)))
+        return removed, added
+
+    def delta(self, old_window: tuple, new_window: tuple):
+        """
+        Returns the (removed ids, added elements) between two windows, from the precomputed season deltas when
+        moving a single-season window by one season, else from :meth:`window_delta`.
+        """
+        old_first, old_last = old_window
+        new_first, new_last = new_window
+        if old_first == old_last and new_first == new_last and new_first == old_first + 1 and new_first in self.season_deltas:
+            removed, added = self.season_deltas[new_first]
+        else:
+            removed, added = self.window_delta(old_window, new_window)
+        added_elements = [self.element(element_id) for element_id in added]
+        # Coaches before edges, so cytoscape never receives an edge whose coach is missing
+        added_elements.sort(key=lambda el: 'source' in el['data'])
+        return removed, added_elements
+
+
+@lru_cache(maxsize=2)
+def _load_season_snapshots(_version: str) -> SeasonSnapshots:
+    from dash_graph_internals import parse_json_file
+
+    elements, _, _ = parse_json_file()
+    return SeasonSnapshots(elements)
+
+
+def load_season_snapshots() -> SeasonSnapshots:
+    """Returns the season index of the loaded elements (see :func:`dash_graph_internals.parse_json_file`), built once per dataset version"""
+    from dash_graph_internals import dataset_version
+
+    return _load_season_snapshots(dataset_version())
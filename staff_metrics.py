@@ -0,0 +1,144 @@
+"""
+Staff continuity metrics for every (team, season), computed in one batch over the jobs table.
+
+The jobs table is turned into a sparse team-season x coach incidence matrix once. Every metric is then a sparse
+matrix product or an elementwise operation over that matrix, with a single loop over seasons (about 25 iterations)
+to accumulate shared history over time. There is no loop over teams, so recomputing every program and year takes
+seconds, which keeps metric definitions cheap to iterate on.
+
+Write the table for the Dash app (and for analysis) with::
+
+    python staff_metrics.py data/clean_sorted_coach_jobs.csv data/staff_continuity_metrics.csv
+"""
+import os
+from functools import lru_cache
+
+STAFF_METRICS_CSV = 'data/staff_continuity_metrics.csv'
+
+METRIC_COLUMNS = ['Team', 'Season', 'Staff Size', 'Returning Staff', 'Retention',
+                  'Head Coach', 'Share With Head Coach History', 'Mean Pairwise Shared Seasons']
+
+
+def compute_staff_metrics(coach_jobs_df):
+    """
+    Computes staff continuity metrics for every team-season of the jobs table.
+
+    Args:
+        coach_jobs_df (pd.DataFrame): A pandas DataFrame generated from On3_coaching_parsing, with the columns
+            'Team', 'Name', 'Position' and 'Seasons at Position'
+
+    Returns:
+        pd.DataFrame: One row per (team, season), sorted by team then season, with the columns:
+            - 'Staff Size': Number of distinct coaches on the staff
+            - 'Returning Staff': Coaches also on the team's staff the previous season (NaN if that season is not in the data)
+            - 'Retention': Returning Staff divided by the previous season's staff size
+            - 'Head Coach': Head coach(es) of the staff, joined by ' / '
+            - 'Share With Head Coach History': Share of the other coaches who shared a staff with a head coach of this
+              staff in an earlier season, at any team (NaN without a listed head coach)
+            - 'Mean Pairwise Shared Seasons': Mean, over every pair of coaches on the staff, of the team-seasons they
+              have shared up to and including this one (NaN for staffs of fewer than two coaches)
+
+    Behavior:
+        - Expands each job into one row per season with :func:`basic_graph_generation.parse_seasons`
+        - Builds P, a sparse (team-season x coach) 0/1 matrix, and H, the same matrix restricted to head coaches
+        - Retention: row-wise overlap of P with P shifted to the previous season of the same team
+        - For each season s, in order, with W the (coach x coach) matrix of team-seasons shared before s:
+            - Head coach history: nonzeros of (H_s @ W) restricted to the non-head-coach staff of P_s
+            - W is updated with P_s.T @ P_s
+            - Shared seasons: sum over staff pairs of W, as rowsum((P_s @ W) * P_s) minus the diagonal of W
+    """
+    import numpy as np
+    import pandas as pd
+    from scipy import sparse
+    from basic_graph_generation import level1_coach, parse_seasons
+
+    jobs = coach_jobs_df.loc[:, ['Team', 'Name', 'Position', 'Seasons at Position']].copy()
+    jobs['Season'] = jobs['Seasons at Position'].map(parse_seasons)
+    jobs = jobs.explode('Season').dropna(subset=['Season'])
+    jobs['Season'] = jobs['Season'].astype(int)
+    jobs['Is Head Coach'] = jobs['Position'].isin(level1_coach)
+    staff_rows = jobs.groupby(['Team', 'Season', 'Name'], sort=True)['Is Head Coach'].any().reset_index()
+
+    coach_codes, coach_names = pd.factorize(staff_rows['Name'])
+    team_seasons = pd.MultiIndex.from_frame(staff_rows[['Team', 'Season']]).drop_duplicates()
+    team_season_codes = team_seasons.get_indexer(pd.MultiIndex.from_frame(staff_rows[['Team', 'Season']]))
+    shape = (len(team_seasons), len(coach_names))
+
+    is_head = staff_rows['Is Head Coach'].to_numpy()
+    staff = sparse.csr_matrix((np.ones(len(staff_rows)), (team_season_codes, coach_codes)), shape=shape)
+    head_coaches = sparse.csr_matrix((np.ones(is_head.sum()), (team_season_codes[is_head], coach_codes[is_head])), shape=shape)
+    staff_size = np.asarray(staff.sum(axis=1)).ravel()
+    head_count = np.asarray(head_coaches.sum(axis=1)).ravel()
+
+    teams = team_seasons.get_level_values('Team')
+    seasons = team_seasons.get_level_values('Season').to_numpy()
+
+    # Retention from the previous season of the same team
+    previous = team_seasons.get_indexer(pd.MultiIndex.from_arrays([teams, seasons - 1]))
+    has_previous = previous >= 0
+    returning = np.full(len(team_seasons), np.nan)
+    retention = np.full(len(team_seasons), np.nan)
+    returning[has_previous] = np.asarray(staff[has_previous].multiply(staff[previous[has_previous]]).sum(axis=1)).ravel()
+    retention[has_previous] = returning[has_previous] / staff_size[previous[has_previous]]
+
+    # Shared history, accumulated one season at a time across every team
+    with_head_history = np.zeros(len(team_seasons))
+    pairwise_shared = np.zeros(len(team_seasons))
+    shared_before = sparse.csr_matrix((shape[1], shape[1]))
+    for season in np.unique(seasons):
+        rows = np.flatnonzero(seasons == season)
+        season_staff = staff[rows]
+        season_heads = head_coaches[rows]
+
+        other_staff = season_staff - season_heads
+        with_head_history[rows] = np.asarray(((season_heads @ shared_before).multiply(other_staff) > 0).sum(axis=1)).ravel()
+
+        shared_before = shared_before + (season_staff.T @ season_staff)
+        pair_totals = np.asarray((season_staff @ shared_before).multiply(season_staff).sum(axis=1)).ravel()
+        pairwise_shared[rows] = pair_totals - season_staff @ shared_before.diagonal()
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        head_history_share = np.where(head_count > 0, with_head_history / (staff_size - head_count), np.nan)
+        mean_pairwise = np.where(staff_size > 1, pairwise_shared / (staff_size * (staff_size - 1)), np.nan)
+
+    head_names = staff_rows[is_head].groupby(['Team', 'Season'])['Name'].agg(' / '.join)
+    return pd.DataFrame({
+        'Team': teams,
+        'Season': seasons,
+        'Staff Size': staff_size.astype(int),
+        'Returning Staff': returning,
+        'Retention': retention,
+        'Head Coach': head_names.reindex(team_seasons).to_numpy(),
+        'Share With Head Coach History': head_history_share,
+        'Mean Pairwise Shared Seasons': mean_pairwise,
+    }, columns=METRIC_COLUMNS)
+
+
+@lru_cache(maxsize=2)
+def _load_staff_metrics(jobs_csv_path: str, metrics_csv_path: str, _version: str):
+    import pandas as pd
+
+    if os.path.exists(metrics_csv_path) and os.path.getmtime(metrics_csv_path) >= os.path.getmtime(jobs_csv_path):
+        return pd.read_csv(metrics_csv_path)
+    return compute_staff_metrics(pd.read_csv(jobs_csv_path))
+
+
+def load_staff_metrics(jobs_csv_path: str = 'data/clean_sorted_coach_jobs.csv', metrics_csv_path: str = STAFF_METRICS_CSV):
+    """
+    Returns the staff continuity metrics table, read from metrics_csv_path if it is up to date with the jobs CSV,
+    otherwise computed from the jobs CSV. Loaded once per version of both files.
+    """
+    from dash_graph_internals import dataset_version
+
+    return _load_staff_metrics(jobs_csv_path, metrics_csv_path,
+                               f"{dataset_version(jobs_csv_path)}:{dataset_version(metrics_csv_path)}")
+
+
+if __name__ == '__main__':
+    import sys
+    import pandas as pd
+
+    jobs_csv = sys.argv[1] if len(sys.argv) > 1 else 'data/clean_sorted_coach_jobs.csv'
+    output_csv = sys.argv[2] if len(sys.argv) > 2 else STAFF_METRICS_CSV
+    compute_staff_metrics(pd.read_csv(jobs_csv)).to_csv(output_csv, index=False)
+    print(f"Wrote staff continuity metrics for {jobs_csv} to {output_csv}")
@@ -0,0 +1,128 @@
+"""
+Materialized staff rosters: (team, season) -> every coach on that staff, their position and encoded level.
+
+The roster is built once from the jobs table (the CSV generated by On3_coaching_parsing), so opening a staff
+hierarchy in the Dash app is a dictionary lookup plus a small local computation, instead of scanning every
+edge of the cytoscape elements.
+"""
+from functools import lru_cache
+
+if __name__ == '__main__':
+    print("Error: you are running a file of function definitions, please run 'dash_graph.py' to generate the webpage")
+
+# Positions missing from the 'level#_coach' lists (see basic_graph_generation) are placed below every listed level
+UNLISTED_LEVEL = 6
+
+
+def build_staff_roster(coach_jobs_df) -> dict:
+    """
+    Builds the roster of every team-season from the jobs table.
+
+    Args:
+        coach_jobs_df (pd.DataFrame): A pandas DataFrame generated from On3_coaching_parsing, with the columns
+            'Team', 'Name', 'Position' and 'Seasons at Position'
+
+    Returns:
+        roster (dict): {(team, season): [(coach name, position, encoded level), ...]}, each staff sorted by
+        encoded level then name. A coach listed in several positions on the same staff appears once, at their
+        most senior level, with the positions joined by ' / '
+
+    Behavior:
+        - Encodes positions with :func:`basic_graph_generation.position_encoding`
+        - Expands each job into one row per season with :func:`basic_graph_generation.parse_seasons`
+        - Groups the rows by (team, season) in a single pass
+    """
+    from basic_graph_generation import parse_seasons, position_encoding
+
+    jobs = coach_jobs_df.loc[:, ['Team', 'Name', 'Position', 'Seasons at Position']].copy()
+    position_encoding(jobs)
+    jobs['Encoded Position'] = jobs['Encoded Position'].fillna(UNLISTED_LEVEL).astype(int)
+    jobs['Season'] = jobs['Seasons at Position'].map(parse_seasons)
+    jobs = jobs.explode('Season').dropna(subset=['Season'])
+    jobs['Season'] = jobs['Season'].astype(int)
+
+    staffs = {}
+    for team, season, name, position, level in jobs[['Team', 'Season', 'Name', 'Position', 'Encoded Position']].itertuples(index=False):
+        staffs.setdefault((team, season), []).append((name, position, level))
+
+    return {team_season: merge_staff_entries(entries) for team_season, entries in staffs.items()}
+
+
+def merge_staff_entries(entries) -> list:
+    """
+    Merges the jobs of one staff into roster entries.
+
+    Args:
+        entries (iterable): (coach name, position, encoded level) per job, in jobs table order
+
+    Returns:
+        list: [(coach name, position, encoded level), ...] sorted by encoded level then name, one entry per coach at
+        their most senior level, with their positions joined by ' / '
+    """
+    staff = {}
+    for name, position, level in entries:
+        if name in staff:
+            current_position, current_level = staff[name]
+            if position not in current_position.split(' / '):
+                position = f"{current_position} / {position}" if current_level <= level else f"{position} / {current_position}"
+            else:
+                position = current_position
+            level = min(level, current_level)
+        staff[name] = (position, level)
+
+    return sorted(((name, position, level) for name, (position, level) in staff.items()),
+                  key=lambda entry: (entry[2], entry[0]))
+
+
+@lru_cache(maxsize=2)
+def _load_staff_roster(csv_path: str, _version: str) -> dict:
+    import pandas as pd
+
+    return build_staff_roster(pd.read_csv(csv_path))
+
+
+def load_staff_roster(csv_path: str = 'data/clean_sorted_coach_jobs.csv') -> dict:
+    """Returns the roster built from the jobs CSV (see :func:`build_staff_roster`), built once per version of the file"""
+    from dash_graph_internals import dataset_version
+
+    return _load_staff_roster(csv_path, dataset_version(csv_path))
+
+
+def staff_hierarchy_elements(staff: list):
+    """
+    Creates the elements of a staff hierarchy subgraph from one roster entry.
+
+    Hierarchy edges are derived by level adjacency: each coach is connected to every coach on the next
+    encoded level present on the staff. This handles staffs without continuous levels (ex: 1, 2, 5).
+
+    Args:
+        staff (list): Roster of one team-season, [(coach name, position, encoded level), ...], see :func:`build_staff_roster`
+
+    Returns:
+        tuple: A tuple containing:
+            - sub_graph_elements (list): Nodes (with a 'subgraph_label' of "{coach}: {position}") followed by edges
+            - node_levels (dict): {coach name: index of their level among the levels on the staff}, for
+              :func:`dash_graph_internals.hierarchy_layout_positions`
+    """
+    levels_on_staff = sorted({level for _, _, level in staff})
+    level_index = {level: idx for idx, level in enumerate(levels_on_staff)}
+    coaches_by_level = [[] for _ in levels_on_staff]
+
+    nodes = []
+    node_levels = {}
+    for name, position, level in staff:
+        nodes.append({'data': {'id': name, 'coach_name': name, 'subgraph_label': f"{name}: {position}"}})
+        node_levels[name] = level_index[level]
+        coaches_by_level[level_index[level]].append(name)
+
+    edges = []
+    for upper_level, lower_level in zip(coaches_by_level, coaches_by_level[1:]):
+        for senior_coach in upper_level:
+            for junior_coach in lower_level:
+                edges.append({'data': {
+                    'id': f"staff-edge-{len(edges)}",
+                    'source': senior_coach,
+                    'target': junior_coach
+                }})
+
+    return nodes + edges, node_levels
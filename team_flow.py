@@ -0,0 +1,148 @@
+"""
+Program-to-program coaching flow: how many coaches moved from team A to team B, and in which season.
+
+The jobs table is turned into a sparse (coach-season x team) incidence matrix once, and each coach-season row is
+paired with the coach's next listed season. A coach departs the teams they are on this season but not the next, and
+arrives at the teams they are on the next season but not this one. The team x team flow of a season is then a single
+sparse product, departures.T @ arrivals, over the rows arriving that season, so no coach pairs are enumerated.
+
+Write the table for the Dash app (and for analysis) with::
+
+    python team_flow.py data/clean_sorted_coach_jobs.csv data/team_flows.csv
+"""
+import os
+from functools import lru_cache
+
+TEAM_FLOWS_CSV = 'data/team_flows.csv'
+
+FLOW_COLUMNS = ['From Team', 'To Team', 'Season', 'Coaches']
+
+
+def compute_team_flows(coach_jobs_df):
+    """
+    Computes the number of coaches who moved between every pair of teams, per season.
+
+    Args:
+        coach_jobs_df (pd.DataFrame): A pandas DataFrame generated from On3_coaching_parsing, with the columns
+            'Team', 'Name' and 'Seasons at Position'
+
+    Returns:
+        pd.DataFrame: One row per (from team, to team, season) with at least one move, sorted by season then by
+        decreasing count, with the columns:
+            - 'From Team': Team the coaches left
+            - 'To Team': Team the coaches joined
+            - 'Season': First season at 'To Team'
+            - 'Coaches': Number of coaches who made that move
+
+    Behavior:
+        - Expands each job into one row per season with :func:`basic_graph_generation.parse_seasons`
+        - Builds X, a sparse (coach-season x team) 0/1 matrix, and N, the rows of X for each coach's next listed
+          season (seasons out of the data, ex: in the NFL, are skipped, so the move is dated by the return season)
+        - Departures D = X - X * N and arrivals A = N - X * N (elementwise), so coaches staying on a staff never count
+        - For each season s, the flow is D_s.T @ A_s, with D_s and A_s the rows whose next season is s
+    """
+    import numpy as np
+    import pandas as pd
+    from scipy import sparse
+    from basic_graph_generation import parse_seasons
+
+    jobs = coach_jobs_df.loc[:, ['Team', 'Name', 'Seasons at Position']].copy()
+    jobs['Season'] = jobs['Seasons at Position'].map(parse_seasons)
+    jobs = jobs.explode('Season').dropna(subset=['Season'])
+    jobs['Season'] = jobs['Season'].astype(int)
+    jobs = jobs.drop_duplicates(['Name', 'Season', 'Team']).sort_values(['Name', 'Season'])
+
+    team_codes, team_names = pd.factorize(jobs['Team'], sort=True)
+    coach_seasons = pd.MultiIndex.from_frame(jobs[['Name', 'Season']]).drop_duplicates()
+    row_codes = coach_seasons.get_indexer(pd.MultiIndex.from_frame(jobs[['Name', 'Season']]))
+    incidence = sparse.csr_matrix((np.ones(len(jobs)), (row_codes, team_codes)), shape=(len(coach_seasons), len(team_names)))
+
+    # Coach-season rows are sorted by coach then season, so the next listed season of a coach is the next row
+    names = coach_seasons.get_level_values('Name')
+    seasons = coach_seasons.get_level_values('Season').to_numpy()
+    has_next = np.append(names[1:] == names[:-1], False)
+    current_rows = np.flatnonzero(has_next)
+    current = incidence[current_rows]
+    following = incidence[current_rows + 1]
+    stayed = current.multiply(following)
+    departures = (current - stayed).tocsr()
+    arrivals = (following - stayed).tocsr()
+    arrival_seasons = seasons[current_rows + 1]
+
+    flows = []
+    for season in np.unique(arrival_seasons):
+        rows = np.flatnonzero(arrival_seasons == season)
+        season_flow = (departures[rows].T @ arrivals[rows]).tocoo()
+        if season_flow.nnz:
+            flows.append(pd.DataFrame({
+                'From Team': team_names[season_flow.row],
+                'To Team': team_names[season_flow.col],
+                'Season': season,
+                'Coaches': season_flow.data.astype(int),
+            }))
+
+    if not flows:
+        return pd.DataFrame(columns=FLOW_COLUMNS)
+    return (pd.concat(flows, ignore_index=True)
+            .sort_values(['Season', 'Coaches', 'From Team', 'To Team'], ascending=[True, False, True, True])
+            .reset_index(drop=True))
+
+
+def flow_matrix(team_flows, start_year: int = None, end_year: int = None, top_teams: int = None):
+    """
+    Sums the flows of a window of seasons into a team x team matrix.
+
+    Args:
+        team_flows (pd.DataFrame): Table from :func:`compute_team_flows`
+        start_year (int, optional): First arrival season counted
+        end_year (int, optional): Last arrival season counted
+        top_teams (int, optional): Only keep the teams with the most coaches moving in and out, ex: for a readable heatmap
+
+    Returns:
+        pd.DataFrame: Coaches moved, indexed by 'From Team' with one column per 'To Team', over the same teams in
+        the same order on both axes
+    """
+    window = team_flows
+    if start_year is not None:
+        window = window[window['Season'] >= start_year]
+    if end_year is not None:
+        window = window[window['Season'] <= end_year]
+
+    matrix = window.pivot_table(index='From Team', columns='To Team', values='Coaches', aggfunc='sum', fill_value=0)
+    teams = matrix.index.union(matrix.columns)
+    matrix = matrix.reindex(index=teams, columns=teams, fill_value=0)
+    if top_teams:
+        volume = matrix.sum(axis=0) + matrix.sum(axis=1)
+        teams = volume.sort_values(ascending=False, kind='stable').index[:top_teams]
+        matrix = matrix.loc[teams, teams]
+    return matrix
+
+
+@lru_cache(maxsize=2)
+def _load_team_flows(jobs_csv_path: str, flows_csv_path: str, _version: str):
+    import pandas as pd
+
+    if os.path.exists(flows_csv_path) and os.path.getmtime(flows_csv_path) >= os.path.getmtime(jobs_csv_path):
+        return pd.read_csv(flows_csv_path)
+    return compute_team_flows(pd.read_csv(jobs_csv_path))
+
+
+def load_team_flows(jobs_csv_path: str = 'data/clean_sorted_coach_jobs.csv', flows_csv_path: str = TEAM_FLOWS_CSV):
+    """
+    Returns the team flow table, read from flows_csv_path if it is up to date with the jobs CSV, otherwise
+    computed from the jobs CSV. Loaded once per version of both files.
+    """
+    from dash_graph_internals import dataset_version
+
+    return _load_team_flows(jobs_csv_path, flows_csv_path,
+                            f"{dataset_version(jobs_csv_path)}:{dataset_version(flows_csv_path)}")
+
+
+if __name__ == '__main__':
+    import sys
+    import pandas as pd
+
+    jobs_csv = sys.argv[1] if len(sys.argv) > 1 else 'data/clean_sorted_coach_jobs.csv'
+    output_csv = sys.argv[2] if len(sys.argv) > 2 else TEAM_FLOWS_CSV
+    compute_team_flows(pd.read_csv(jobs_csv)).to_csv(output_csv, index=False)
+    print(f"Wrote team to team coaching flows for {jobs_csv} to {output_csv}")
@@ -0,0 +1,184 @@
+"""
+Interval index over job tenures, for "who was on staff at Team T in year Y" and "who coached with X between
+2015 and 2019" queries.
+
+Every job of the jobs table (a coach, team and position) is split into tenures: runs of consecutive seasons. The
+tenures are stored in centered interval trees, one per team plus one over every team, so a stabbing query (every
+tenure containing a season) or an overlap query (every tenure intersecting a range of seasons) costs
+O(log n + matches) instead of a scan of the jobs table or of the cytoscape elements. Tenures come from the jobs
+table, so coaches who never shared a staff with another coach in the data (and have no edges) are included.
+"""
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from functools import lru_cache
+
+if __name__ == '__main__':
+    print("Error: you are running a file of function definitions, please run 'dash_graph.py' to generate the webpage")
+
+Tenure = namedtuple('Tenure', ['coach', 'team', 'position', 'level', 'start', 'end'])
+
+
+def season_runs(seasons) -> list:
+    """Splits seasons into (first, last) runs of consecutive seasons, ex: [2019, 2020, 2023] -> [(2019, 2020), (2023, 2023)]"""
+    runs = []
+    for season in sorted(set(seasons)):
+        if runs and season == runs[-1][1] + 1:
+            runs[-1][1] = season
+        else:
+            runs.append([season, season])
+    return [tuple(run) for run in runs]
+
+
+class _IntervalNode:
+    __slots__ = ('center', 'starts', 'by_start', 'ends', 'by_end', 'left', 'right')
+
+    def __init__(self, center, intervals, left, right):
+        self.center = center
+        self.by_start = sorted(intervals, key=lambda interval: interval[0])
+        self.starts = [interval[0] for interval in self.by_start]
+        self.by_end = sorted(intervals, key=lambda interval: interval[1])
+        self.ends = [interval[1] for interval in self.by_end]
+        self.left = left
+        self.right = right
+
+
+class IntervalTree:
+    """
+    Static centered interval tree over closed intervals [start, end].
+
+    Each node holds the intervals containing its center, sorted by start and by end, and the intervals entirely
+    left or right of the center go to its children. The center is the median endpoint, so the tree has O(log n)
+    depth and every query visits one root-to-leaf path, plus both subtrees only where the queried range spans a center.
+
+    Args:
+        intervals (iterable): (start, end, item) triples
+    """
+    def __init__(self, intervals):
+        self.root = self._build(list(intervals))
+
+    @classmethod
+    def _build(cls, intervals):
+        if not intervals:
+            return None
+        endpoints = sorted(endpoint for start, end, _ in intervals for endpoint in (start, end))
+        center = endpoints[len(endpoints) // 2]
+        left = [interval for interval in intervals if interval[1] < center]
+        right = [interval for interval in intervals if interval[0] > center]
+        here = [interval for interval in intervals if interval[0] <= center <= interval[1]]
+        return _IntervalNode(center, here, cls._build(left), cls._build(right))
+
+    def overlapping(self, low, high) -> list:
+        """Items of every interval intersecting [low, high] (a stabbing query when low == high)"""
+        found = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            if high < node.center:
+                # Every interval here ends at or after the center, so it overlaps iff it starts by high
+                found.extend(item for _, _, item in node.by_start[:bisect_right(node.starts, high)])
+                stack.append(node.left)
+            elif low > node.center:
+                # Every interval here starts at or before the center, so it overlaps iff it ends by low or later
+                found.extend(item for _, _, item in node.by_end[bisect_left(node.ends, low):])
+                stack.append(node.right)
+            else:
+                found.extend(item for _, _, item in node.by_start)
+                stack.append(node.left)
+                stack.append(node.right)
+        return found
+
+    def stab(self, point) -> list:
+        """Items of every interval containing point"""
+        return self.overlapping(point, point)
+
+
+class TenureIndex:
+    """
+    Tenures of every coach, indexed by season.
+
+    Attributes:
+        tenures (list): Every :class:`Tenure`, in jobs table order
+        coach_tenures (dict): {coach name: [tenure ids]}
+        team_trees (dict): {team: :class:`IntervalTree` of that team's tenure ids}
+        all_tenures (IntervalTree): Tenure ids of every team
+    """
+    def __init__(self, coach_jobs_df):
+        from basic_graph_generation import parse_seasons, position_encoding
+        from staff_roster import UNLISTED_LEVEL
+
+        jobs = coach_jobs_df.loc[:, ['Team', 'Name', 'Position', 'Seasons at Position']].copy()
+        position_encoding(jobs)
+        jobs['Encoded Position'] = jobs['Encoded Position'].fillna(UNLISTED_LEVEL).astype(int)
+
+        self.tenures = []
+        self.coach_tenures = {}
+        team_intervals = {}
+        for team, name, position, seasons, level in jobs[['Team', 'Name', 'Position', 'Seasons at Position', 'Encoded Position']].itertuples(index=False):
+            for start, end in season_runs(int(season) for season in parse_seasons(seasons)):
+                tenure_id = len(self.tenures)
+                self.tenures.append(Tenure(name, team, position, level, start, end))
+                self.coach_tenures.setdefault(name, []).append(tenure_id)
+                team_intervals.setdefault(team, []).append((start, end, tenure_id))
+
+        self.team_trees = {team: IntervalTree(intervals) for team, intervals in team_intervals.items()}
+        self.all_tenures = IntervalTree(interval for intervals in team_intervals.values() for interval in intervals)
+
+    def overlapping(self, start_year: int, end_year: int, team: str = None) -> list:
+        """Tenures intersecting [start_year, end_year], at team or at every team, in jobs table order"""
+        tree = self.all_tenures if team is None else self.team_trees.get(team)
+        if tree is None:
+            return []
+        return [self.tenures[tenure_id] for tenure_id in sorted(tree.overlapping(start_year, end_year))]
+
+    def at(self, team: str, year: int) -> list:
+        """Tenures at team that include year, in jobs table order"""
+        return self.overlapping(year, year, team)
+
+    def staff(self, team: str, year: int) -> list:
+        """
+        Staff of team in year, in the format of :func:`staff_roster.build_staff_roster`: [(coach name, position,
+        encoded level), ...] sorted by encoded level then name
+        """
+        from staff_roster import merge_staff_entries
+
+        return merge_staff_entries((tenure.coach, tenure.position, tenure.level) for tenure in self.at(team, year))
+
+    def colleagues(self, coach: str, start_year: int = None, end_year: int = None) -> list:
+        """
+        Finds every coach who shared a staff with coach, optionally within [start_year, end_year].
+
+        Returns:
+            list: (colleague, team, first shared season, last shared season, number of shared seasons) rows, one per
+            (colleague, team), sorted by decreasing number of shared seasons then colleague name
+        """
+        shared = {}
+        for tenure_id in self.coach_tenures.get(coach, []):
+            tenure = self.tenures[tenure_id]
+            low = tenure.start if start_year is None else max(tenure.start, start_year)
+            high = tenure.end if end_year is None else min(tenure.end, end_year)
+            if low > high:
+                continue
+            for other_id in self.team_trees[tenure.team].overlapping(low, high):
+                other = self.tenures[other_id]
+                if other.coach == coach:
+                    continue
+                shared.setdefault((other.coach, tenure.team), set()).update(range(max(low, other.start), min(high, other.end) + 1))
+
+        rows = [(colleague, team, min(seasons), max(seasons), len(seasons)) for (colleague, team), seasons in shared.items()]
+        return sorted(rows, key=lambda row: (-row[4], row[0], row[1]))
+
+
+@lru_cache(maxsize=2)
+def _load_tenure_index(csv_path: str, _version: str) -> TenureIndex:
+    import pandas as pd
+
+    return TenureIndex(pd.read_csv(csv_path))
+
+
+def load_tenure_index(csv_path: str = 'data/clean_sorted_coach_jobs.csv') -> TenureIndex:
+    """Returns the tenure index of the jobs CSV, built once per version of the file"""
+    from dash_graph_internals import dataset_version
+
+    return _load_tenure_index(csv_path, dataset_version(csv_path))
@@ -0,0 +1,39 @@
+"""
+Shared fixtures. The modules under test live at the repository root, next to 'dash_graph.py'.
+"""
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+POSITIONS = ['Head Coach', 'Offensive Coordinator', 'Defensive Coordinator', 'Running Backs Coach',
+             'Offensive Line Coach', 'Quality Control Coach', 'Graduate Assistant']
+
+
+@pytest.fixture
+def make_jobs():
+    """
+    Returns a function building a small random jobs table, in the format written by On3_coaching_parsing:
+    one row per (team, coach, position) with the seasons as a list literal. Coaches move between a handful of
+    teams, skip seasons and hold several positions, so overlaps, gaps and moves all occur.
+    """
+    import pandas as pd
+
+    def build(seed: int = 0, coaches: int = 40, teams: int = 6, first_season: int = 2010, last_season: int = 2020):
+        rng = random.Random(seed)
+        rows = []
+        for coach in range(coaches):
+            for _ in range(rng.randint(1, 4)):
+                start = rng.randint(first_season, last_season)
+                seasons = sorted({season for season in range(start, min(start + rng.randint(0, 4), last_season) + 1)
+                                  if rng.random() > 0.15} or {start})
+                rows.append({'Starting Season': seasons[0], 'Team': f'Team {rng.randrange(teams)}',
+                             'Name': f'Coach {coach}', 'Position': rng.choice(POSITIONS),
+                             'Seasons at Position': str(seasons)})
+        jobs = pd.DataFrame(rows)
+        return jobs.drop_duplicates(['Team', 'Name', 'Position']).reset_index(drop=True)
+
+    return build
@@ -0,0 +1,70 @@
+"""Degrees-of-separation search (basic_graph_generation.CoachAdjacency.find_connection) against networkx BFS"""
+import itertools
+
+import networkx as nx
+import pytest
+
+from basic_graph_generation import CoachAdjacency, create_nx_graph
+
+FILTERS = [(None, None, 1), (2013, 2017, 1), (None, 2014, 2), (2016, None, 3)]
+
+
+def filtered_graph(coaching_graph, start_year, end_year, min_overlap):
+    """Brute force: coaches are linked if they shared at least min_overlap seasons in the range at one team"""
+    shared = {}
+    for source, target, data in coaching_graph.edges(data=True):
+        if source == target: # A coach holding two positions on one staff
+            continue
+        years = {year for year in data['years_of_connection']
+                 if (start_year is None or year >= start_year) and (end_year is None or year <= end_year)}
+        shared.setdefault((frozenset((source, target)), data['team_of_connection']), set()).update(years)
+
+    graph = nx.Graph()
+    graph.add_nodes_from(coaching_graph.nodes)
+    graph.add_edges_from(tuple(pair) for (pair, _), years in shared.items() if len(years) >= min_overlap)
+    return graph, shared
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_connections_are_shortest_and_respect_filters(seed, make_jobs):
+    coaching_graph = create_nx_graph(make_jobs(seed=seed, coaches=30))
+    adjacency = CoachAdjacency.from_graph(coaching_graph)
+    coaches = sorted(coaching_graph.nodes)
+
+    for start_year, end_year, min_overlap in FILTERS:
+        graph, shared = filtered_graph(coaching_graph, start_year, end_year, min_overlap)
+        for coach_a, coach_b in itertools.combinations(coaches, 2):
+            hops = adjacency.find_connection(coach_a, coach_b, start_year, end_year, min_overlap)
+            if not nx.has_path(graph, coach_a, coach_b):
+                assert hops is None
+                continue
+
+            assert len(hops) == nx.shortest_path_length(graph, coach_a, coach_b)
+            assert hops[0][0] == coach_a and hops[-1][1] == coach_b
+            assert all(hop[1] == next_hop[0] for hop, next_hop in zip(hops, hops[1:]))
+            for coach, next_coach, team, years in hops:
+                assert len(years) >= min_overlap
+                assert set(years) <= shared[(frozenset((coach, next_coach)), team)]
+
+
+def test_same_and_unknown_coaches(make_jobs):
+    coaching_graph = create_nx_graph(make_jobs(seed=0, coaches=10))
+    adjacency = CoachAdjacency.from_graph(coaching_graph)
+    coach = next(iter(coaching_graph.nodes))
+
+    assert adjacency.find_connection(coach, coach) == []
+    assert adjacency.find_connection(coach, 'Nobody') is None
+
+
+def test_elements_and_graph_build_the_same_adjacency(make_jobs):
+    from export_elements import export_elements
+
+    coaching_graph = create_nx_graph(make_jobs(seed=2, coaches=20))
+    from_graph = CoachAdjacency.from_graph(coaching_graph)
+    from_elements = CoachAdjacency.from_elements(export_elements(coaching_graph, False))
+
+    def links(adjacency):
+        return {(frozenset((adjacency.names[coach], adjacency.names[neighbor])), adjacency.link_stints[link_id])
+                for coach, neighbors in enumerate(adjacency.neighbors) for neighbor, link_id in neighbors}
+
+    assert links(from_graph) == links(from_elements)
@@ -0,0 +1,101 @@
+"""Delta refresh of the scraped dataset (On3_coaching_parsing.delta_refresh) with a fake On3 API"""
+import json
+
+import pytest
+
+import On3_coaching_parsing
+from On3_coaching_parsing import delta_refresh, listing_fingerprint, merge_coach_histories
+
+
+def listing(name, slug, school, salary=1000000, rank=1):
+    return {'fullName': name, 'slug': slug, 'position': 'Head Coach', 'organization': {'name': school},
+            'totalSalary': salary, 'rank': rank, 'updatedAt': '2025-01-01'}
+
+
+def job(name, team, seasons, slug=None):
+    job = {'Name': name, 'Team': team, 'Position': 'Head Coach', 'Starting Season': seasons[0], 'Seasons at Position': seasons}
+    if slug:
+        job['Slug'] = slug
+    return job
+
+
+def test_fingerprint_ignores_volatile_fields():
+    base = listing('Coach A', 'coach-a', 'Team 1')
+    assert listing_fingerprint(base) == listing_fingerprint(listing('Coach A', 'coach-a', 'Team 1', salary=5, rank=40))
+    assert listing_fingerprint(base) == listing_fingerprint(dict(reversed(list(base.items()))))
+    assert listing_fingerprint(base) != listing_fingerprint(listing('Coach A', 'coach-a', 'Team 2'))
+
+
+def test_merge_keeps_homonyms_jobs():
+    jobs = [job('Kevin Smith', 'UCF', [2016, 2017]), job('Jim Jones', 'UCF', [2016]), job('Kevin Smith', 'Urbana', [2012])]
+    history = [job('Kevin Smith', 'UCF', [2016, 2017], 'kevin-smith'), job('Kevin Smith', 'Army', [2018], 'kevin-smith')]
+    merged = merge_coach_histories(jobs, [({'Name': 'Kevin Smith', 'Slug': 'kevin-smith'}, history)])
+    assert merged == jobs[1:] + history
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, body):
+        self.body = body
+
+    def json(self):
+        return self.body
+
+
+class FakeSession:
+    """One page per two coaches of the current listing"""
+    listings = []
+
+    def get(self, url, params=None):
+        pages = [self.listings[start:start + 2] for start in range(0, len(self.listings), 2)] or [[]]
+        return FakeResponse({'pagination': {'pageCount': len(pages)}, 'list': pages[params['page'] - 1]})
+
+
+@pytest.fixture
+def on3(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'data').mkdir()
+    monkeypatch.setattr(On3_coaching_parsing.requests, 'Session', FakeSession)
+    histories = {}
+    scraped = []
+
+    def scrape_coach_history(coach, session):
+        scraped.append(coach['Slug'])
+        return histories[coach['Slug']]
+    monkeypatch.setattr(On3_coaching_parsing, 'scrape_coach_history', scrape_coach_history)
+
+    def refresh(listings):
+        FakeSession.listings = listings
+        scraped.clear()
+        summary = delta_refresh('https://example.test/salaries', {'page': 1}, 'coach_jobs_clean', 'data/registry.json')
+        with open('data/coach_jobs_clean.json') as f:
+            return summary, list(scraped), json.load(f)
+    return histories, refresh
+
+
+def test_delta_refresh_only_scrapes_new_and_changed_coaches(on3):
+    histories, refresh = on3
+    crawled = [job('Coach A', 'Team 1', [2023, 2024, 2025], 'coach-a'), job('Coach B', 'Team 2', [2024, 2025])]
+    with open('data/coach_jobs_clean.json', 'w') as f:
+        json.dump(crawled, f)
+
+    # First refresh after a full crawl: coaches already scraped (by slug, or by name before slugs) are only recorded
+    histories['coach-c'] = [job('Coach C', 'Team 3', [2025], 'coach-c')]
+    listings = [listing('Coach A', 'coach-a', 'Team 1'), listing('Coach B', 'coach-b', 'Team 2'), listing('Coach C', 'coach-c', 'Team 3')]
+    summary, scraped, jobs = refresh(listings)
+    assert scraped == ['coach-c']
+    assert summary == {'listed': 3, 'new': 1, 'changed': 0, 'jobs': 3}
+    assert jobs == crawled + histories['coach-c']
+
+    # Raises are ignored, a new job re-scrapes the coach and replaces the jobs scraped before slugs were recorded
+    histories['coach-b'] = [job('Coach B', 'Team 2', [2024, 2025], 'coach-b'), job('Coach B', 'Team 4', [2026], 'coach-b')]
+    listings = [listing('Coach A', 'coach-a', 'Team 1', salary=2000000, rank=3), listing('Coach B', 'coach-b', 'Team 4'),
+                listing('Coach C', 'coach-c', 'Team 3')]
+    summary, scraped, jobs = refresh(listings)
+    assert scraped == ['coach-b']
+    assert summary == {'listed': 3, 'new': 0, 'changed': 1, 'jobs': 4}
+    assert jobs == [crawled[0]] + histories['coach-c'] + histories['coach-b']
+
+    summary, scraped, _ = refresh(listings)
+    assert scraped == [] and summary['new'] == summary['changed'] == 0
@@ -0,0 +1,58 @@
+"""Per-team element shards (element_shards.ElementShards) written alongside the JSON dumps by export_elements"""
+import json
+
+import pytest
+
+from element_shards import ElementShards, write_element_shards
+from export_elements import write_element_dumps
+
+
+@pytest.fixture
+def exported(tmp_path, make_jobs):
+    """Visualization dump and shards of a random jobs table, written in one pass"""
+    from basic_graph_generation import create_nx_graph
+
+    dump_path = tmp_path / 'visualization.json'
+    write_element_dumps(create_nx_graph(make_jobs(seed=1)), visualization_path=str(dump_path), shard_dir=str(tmp_path / 'shards'))
+    with open(dump_path, encoding='utf-8') as f:
+        return json.load(f), ElementShards(str(tmp_path / 'shards'))
+
+
+def edges_of(elements):
+    return [el for el in elements if 'source' in el['data']]
+
+
+def test_manifest_lists_sorted_teams_and_years(exported):
+    elements, shards = exported
+    edges = edges_of(elements)
+
+    assert shards.teams == sorted({el['data']['team_of_connection'] for el in edges})
+    assert shards.years == sorted({year for el in edges for year in el['data']['years_of_connection']}, reverse=True)
+
+
+def test_shards_hold_the_same_elements_as_the_dump(exported):
+    elements, shards = exported
+    by_id = lambda els: {el['data']['id']: el for el in els}
+
+    assert shards.nodes() == [el for el in elements if 'source' not in el['data']]
+    assert by_id(shards.elements()) == by_id(elements)
+
+
+def test_team_selection_reads_only_those_teams(exported):
+    elements, shards = exported
+    teams = shards.teams[:2]
+    expected_edges = [el for el in edges_of(elements) if el['data']['team_of_connection'] in teams]
+
+    selected = shards.elements_for_teams(teams + ['Unknown Team'])
+    assert sorted(el['data']['id'] for el in edges_of(selected)) == sorted(el['data']['id'] for el in expected_edges)
+    assert {el['data']['id'] for el in selected if 'source' not in el['data']} \
+        == {name for el in expected_edges for name in (el['data']['source'], el['data']['target'])}
+    assert shards.team_edges('Unknown Team') == []
+
+
+def test_streamed_shards_match_shards_written_from_the_dump(exported, tmp_path):
+    elements, _ = exported
+    write_element_shards(elements, str(tmp_path / 'from_dump'))
+
+    for name in ('shards.jsonl', 'manifest.json'):
+        assert (tmp_path / 'from_dump' / name).read_bytes() == (tmp_path / 'shards' / name).read_bytes()
@@ -0,0 +1,102 @@
+"""Soundex-blocked coach resolution (entity_resolution) against comparing every pair of profiles"""
+import random
+
+import pytest
+
+from entity_resolution import (blocking_key, careers_match, first_names_match, normalize_name, resolve_coach_entities,
+                               resolve_profiles, soundex, split_profiles, team_seasons)
+
+
+def job(name, team, seasons, slug=None):
+    seasons = list(seasons)
+    job = {'Name': name, 'Team': team, 'Position': 'Linebackers Coach', 'Starting Season': seasons[0],
+           'Seasons at Position': seasons}
+    if slug:
+        job['Slug'] = slug
+    return job
+
+
+@pytest.mark.parametrize('word, code', [('Robert', 'R163'), ('Rupert', 'R163'), ('Rubin', 'R150'), ('Ashcraft', 'A261'),
+                                        ('Tymczak', 'T522'), ('Pfister', 'P236'), ('Honeyman', 'H555'), ('Lee', 'L000')])
+def test_soundex(word, code):
+    assert soundex(word) == code
+
+
+def test_normalize_name():
+    assert normalize_name('A.J. Milwee Jr.') == ['aj', 'milwee']
+    assert normalize_name('José Núñez-Smith') == ['jose', 'nunez', 'smith']
+    assert blocking_key('Jon Smyth III') == blocking_key('John Smith') == 'S530'
+
+
+def brute_force_clusters(profiles):
+    """Connected components of every matching pair of profiles in the same block, labelled by their smallest index"""
+    careers = [team_seasons(jobs) for jobs in profiles]
+    labels = list(range(len(profiles)))
+    changed = True
+    while changed:
+        changed = False
+        for idx_a in range(len(profiles)):
+            for idx_b in range(len(profiles)):
+                name_a, name_b = profiles[idx_a][0]['Name'], profiles[idx_b][0]['Name']
+                if labels[idx_b] < labels[idx_a] and blocking_key(name_a) == blocking_key(name_b) \
+                        and first_names_match(name_a, name_b) and careers_match(careers[idx_a], careers[idx_b]):
+                    labels[idx_a] = labels[idx_b]
+                    changed = True
+    return labels
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_resolve_profiles_matches_every_pair(seed):
+    rng = random.Random(seed)
+    first_names = ['Mike', 'Michael', 'Mark', 'Jim', 'James', 'Kevin', 'Bob']
+    surnames = ['Smith', 'Smyth', 'Stoops', 'Jones', 'Johnson']
+    profiles = []
+    for _ in range(60):
+        start = rng.randint(2008, 2020)
+        name = f"{rng.choice(first_names)} {rng.choice(surnames)}"
+        profiles.append([job(name, f"Team {rng.randint(0, 3)}", range(start, start + rng.randint(1, 4)))])
+    assert resolve_profiles(profiles) == brute_force_clusters(profiles)
+
+
+def test_split_profiles():
+    jobs = [job('Kevin Smith', 'UCF', [2020]), job('Kevin Smith', 'Urbana', [2012]), job('Jim Jones', 'UCF', [2020]),
+            job('Kevin Smith', 'Army', [2015], slug='kevin-smith-2'), job('Kevin Smith', 'Navy', [2016], slug='kevin-smith-2')]
+    assert [[j['Team'] for j in profile] for profile in split_profiles(jobs)] == [['UCF', 'Urbana'], ['UCF'],
+                                                                                  ['Army', 'Navy']]
+
+
+def test_name_variants_merge_and_homonyms_split():
+    # Mark Stoops' jobs are one On3 page, the Mike/Michael Stoops pages overlap at Oklahoma
+    jobs = [job('Mike Stoops', 'Oklahoma', range(1999, 2004)),
+            job('Mark Stoops', 'Florida State', range(2010, 2013)),
+            job('Mark Stoops', 'Kentucky', range(2013, 2020)),
+            job('Michael Stoops', 'Oklahoma', range(2003, 2005)),
+            job('Kevin Smith', 'UCF', range(2016, 2020)),
+            job('Jim Jones', 'UCF', [2017]),
+            job('Kevin Smith', 'Urbana', range(2016, 2019))]
+    resolved = resolve_coach_entities(jobs)
+
+    names = {(j['Team'], j['Seasons at Position'][0]): j['Name'] for j in resolved}
+    assert names[('Oklahoma', 1999)] == names[('Oklahoma', 2003)] == 'Michael Stoops'
+    assert names[('Florida State', 2010)] == names[('Kentucky', 2013)] == 'Mark Stoops'
+    assert names[('UCF', 2016)] == 'Kevin Smith (UCF)'
+    assert names[('Urbana', 2016)] == 'Kevin Smith (Urbana)'
+    assert len({j['Coach ID'] for j in resolved}) == 5
+
+
+def test_coach_ids_are_stable_across_refreshes():
+    jobs = [job('Kevin Smith', 'UCF', range(2016, 2020)),
+            job('Jim Jones', 'UCF', [2016]),
+            job('Kevin Smith', 'Urbana', range(2012, 2019))]
+    registry = {}
+    first_ids = {(j['Team'], j['Name']): j['Coach ID'] for j in resolve_coach_entities(jobs, registry)}
+    assert sorted(first_ids.values()) == ['jim-jones', 'kevin-smith', 'kevin-smith-2']
+
+    # A later refresh lists the coaches in another order, adds a season and a new Kevin Smith
+    refreshed = [job('Kevin Smith', 'Army', [2024]), jobs[1], jobs[2], job('Bob Jones', 'Army', [2024]),
+                 job('Kevin Smith', 'UCF', range(2016, 2021))]
+    second_ids = {(j['Team'], j['Name']): j['Coach ID'] for j in resolve_coach_entities(refreshed, registry)}
+    assert second_ids[('UCF', 'Kevin Smith (UCF)')] == first_ids[('UCF', 'Kevin Smith (UCF)')]
+    assert second_ids[('Urbana', 'Kevin Smith (Urbana)')] == first_ids[('Urbana', 'Kevin Smith (Urbana)')]
+    assert second_ids[('UCF', 'Jim Jones')] == 'jim-jones'
+    assert second_ids[('Army', 'Kevin Smith (Army)')] == 'kevin-smith-3'
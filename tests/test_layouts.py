@@ -0,0 +1,31 @@
+"""Server-computed preset layouts (dash_graph_internals.circle_layout_positions, hierarchy_layout_positions)"""
+import math
+
+from dash_graph_internals import circle_layout_positions, hierarchy_layout_positions
+
+
+def test_circle_layout_places_every_node_on_one_circle():
+    node_ids = [f'coach {idx}' for idx in range(50)]
+    positions = circle_layout_positions(node_ids, node_spacing=30)
+
+    assert list(positions) == node_ids
+    radii = {round(math.hypot(p['x'], p['y'])) for p in positions.values()}
+    assert radii == {round(50 * 30 / (2 * math.pi))}
+    assert positions['coach 0'] == {'x': 0.0, 'y': round(-50 * 30 / (2 * math.pi), 2)} # Starts at the top
+
+
+def test_circle_layout_keeps_distinct_positions_for_tiny_graphs():
+    assert circle_layout_positions([]) == {}
+    positions = circle_layout_positions(['a', 'b'], node_spacing=30)
+    assert positions['a'] != positions['b']
+    assert math.isclose(math.hypot(positions['a']['x'], positions['a']['y']), 30)
+
+
+def test_hierarchy_layout_centers_each_level_top_down():
+    node_levels = {'head': 1, 'oc': 2, 'dc': 2, 'qc1': 5, 'qc2': 5, 'qc3': 5}
+    positions = hierarchy_layout_positions(node_levels, level_spacing=100, node_spacing=10)
+
+    assert {node: p['y'] for node, p in positions.items()} == {'head': 0, 'oc': 100, 'dc': 100, 'qc1': 200, 'qc2': 200, 'qc3': 200}
+    assert positions['head']['x'] == 0
+    assert sorted(p['x'] for node, p in positions.items() if node_levels[node] == 2) == [-5, 5]
+    assert sorted(p['x'] for node, p in positions.items() if node_levels[node] == 5) == [-10, 0, 10]
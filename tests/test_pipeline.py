@@ -0,0 +1,102 @@
+"""Memoized stage runs (pipeline.run_pipeline) on a toy pipeline of text files"""
+import pytest
+
+from pipeline import Stage, run_pipeline
+
+# Each run forks its stage workers, while the worker threads of the previous run's pool may still be exiting
+pytestmark = pytest.mark.filterwarnings('ignore:This process .* is multi-threaded:DeprecationWarning')
+
+
+# Stage functions run in worker processes, so they live at module level
+def upper(source, target):
+    with open(source) as f, open(target, 'w') as out:
+        out.write(f.read().upper())
+
+
+def count(source, target, suffix):
+    with open(source) as f, open(target, 'w') as out:
+        out.write(f"{len(f.read())}{suffix}")
+
+
+@pytest.fixture
+def toy(tmp_path):
+    paths = {name: str(tmp_path / f"{name}.txt") for name in ('a', 'b', 'c', 'other', 'other_upper')}
+    for name in ('a', 'other'):
+        with open(paths[name], 'w') as f:
+            f.write(f"{name} text")
+
+    def stages(suffix='', modules=()):
+        return [Stage('upper', upper, (paths['a'],), (paths['b'],), {'source': paths['a'], 'target': paths['b']}, modules),
+                Stage('count', count, (paths['b'],), (paths['c'],), {'source': paths['b'], 'target': paths['c'], 'suffix': suffix}),
+                Stage('other', upper, (paths['other'],), (paths['other_upper'],),
+                      {'source': paths['other'], 'target': paths['other_upper']})]
+
+    def run(**kwargs):
+        return run_pipeline(kwargs.pop('stages', None) or stages(), state_path=str(tmp_path / 'state.json'), workers=2, **kwargs)
+
+    return paths, stages, run
+
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+
+def test_second_run_is_up_to_date(toy):
+    paths, _, run = toy
+    assert run() == {'upper': 'ran', 'count': 'ran', 'other': 'ran'}
+    assert read(paths['c']) == '6'
+    assert run() == dict.fromkeys(('upper', 'count', 'other'), 'up to date')
+
+
+def test_input_change_reruns_only_dependents(toy):
+    paths, stages, run = toy
+    run()
+    with open(paths['a'], 'w') as f:
+        f.write('longer a text')
+    assert run() == {'upper': 'ran', 'count': 'ran', 'other': 'up to date'}
+    assert read(paths['c']) == '13'
+
+    # Same output contents, so the stages reading it stay up to date
+    with open(paths['a'], 'w') as f:
+        f.write('LONGER A TEXT')
+    assert run() == {'upper': 'ran', 'count': 'up to date', 'other': 'up to date'}
+
+
+def test_param_change_and_force(toy):
+    paths, stages, run = toy
+    run()
+    assert run(stages=stages(suffix=' chars')) == {'upper': 'up to date', 'count': 'ran', 'other': 'up to date'}
+    assert read(paths['c']) == '6 chars'
+    assert run(stages=stages(suffix=' chars'), force=('upper',))['upper'] == 'ran'
+
+
+def test_edited_output_reruns_its_stage(toy):
+    paths, _, run = toy
+    run()
+    with open(paths['b'], 'w') as f:
+        f.write('edited by hand')
+    assert run() == {'upper': 'ran', 'count': 'up to date', 'other': 'up to date'}
+    assert read(paths['b']) == 'A TEXT'
+
+
+def test_dry_run_and_start(toy):
+    paths, _, run = toy
+    run()
+    with open(paths['a'], 'w') as f:
+        f.write('new a text')
+    assert run(dry_run=True) == {'upper': 'would run', 'count': 'would run', 'other': 'up to date'}
+    assert read(paths['b']) == 'A TEXT'
+    assert run(start='count') == {'upper': 'not run', 'count': 'up to date', 'other': 'up to date'}
+
+
+def test_declared_module_edit_reruns_stage(toy, tmp_path, monkeypatch):
+    paths, stages, run = toy
+    module = tmp_path / 'toy_helpers.py'
+    module.write_text("FACTOR = 1\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    run(stages=stages(modules=('toy_helpers',)))
+    assert run(stages=stages(modules=('toy_helpers',)))['upper'] == 'up to date'
+
+    module.write_text("FACTOR = 2\n")
+    assert run(stages=stages(modules=('toy_helpers',))) == {'upper': 'ran', 'count': 'up to date', 'other': 'up to date'}
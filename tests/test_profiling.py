@@ -0,0 +1,41 @@
+"""Opt-in profiling hooks (profiling.profiled, profiling.enable_profiling_from_cli)"""
+import os
+
+import profiling
+from profiling import enable_profiling_from_cli, profiled
+
+
+@profiled
+def build_squares(count):
+    return [idx * idx for idx in range(count)]
+
+
+def test_profiled_calls_run_unchanged_and_write_nothing_when_disabled(tmp_path, monkeypatch):
+    monkeypatch.delenv(profiling.PROFILE_ENV_VAR, raising=False)
+    monkeypatch.setenv(profiling.PROFILE_DIR_ENV_VAR, str(tmp_path))
+
+    assert build_squares(5) == [0, 1, 4, 9, 16]
+    assert os.listdir(tmp_path) == []
+
+
+def test_profiled_calls_write_stats_and_summary_when_enabled(tmp_path, monkeypatch):
+    monkeypatch.setenv(profiling.PROFILE_ENV_VAR, '1')
+    monkeypatch.setenv(profiling.PROFILE_DIR_ENV_VAR, str(tmp_path))
+    monkeypatch.setenv(profiling.PROFILE_TOP_ENV_VAR, '5')
+
+    assert build_squares(1000)[-1] == 999 * 999
+    files = sorted(os.listdir(tmp_path))
+    assert [os.path.splitext(name)[1] for name in files] == ['.prof', '.txt']
+    assert all(name.endswith('-build_squares' + os.path.splitext(name)[1]) for name in files)
+    summary = (tmp_path / files[1]).read_text(encoding='utf-8')
+    assert 'Function: build_squares' in summary
+    assert 'arg 0: 1000' in summary
+
+
+def test_cli_flag_enables_profiling_and_is_removed_from_argv(monkeypatch):
+    monkeypatch.setenv(profiling.PROFILE_ENV_VAR, '0') # Restored after the test, as the flag sets it
+    argv = ['export_elements.py', '--profile', 'data/out.json']
+
+    assert enable_profiling_from_cli(argv)
+    assert argv == ['export_elements.py', 'data/out.json']
+    assert os.environ[profiling.PROFILE_ENV_VAR] == '1'
@@ -0,0 +1,66 @@
+"""Batch staff continuity metrics (staff_metrics.compute_staff_metrics) against a per-staff brute force"""
+import itertools
+import math
+
+import pytest
+
+from basic_graph_generation import level1_coach, parse_seasons
+from staff_metrics import METRIC_COLUMNS, compute_staff_metrics
+
+
+def brute_force_metrics(jobs):
+    staffs = {}
+    heads = {}
+    for team, name, position, seasons in jobs[['Team', 'Name', 'Position', 'Seasons at Position']].itertuples(index=False):
+        for season in parse_seasons(seasons):
+            staffs.setdefault((team, season), set()).add(name)
+            if position in level1_coach:
+                heads.setdefault((team, season), set()).add(name)
+
+    def shared_seasons(coach_a, coach_b, through_season):
+        return sum(1 for (_, season), staff in staffs.items() if season <= through_season and {coach_a, coach_b} <= staff)
+
+    rows = {}
+    for (team, season), staff in staffs.items():
+        previous = staffs.get((team, season - 1))
+        head_coaches = heads.get((team, season), set())
+        others = staff - head_coaches
+        pairs = list(itertools.combinations(sorted(staff), 2))
+        if head_coaches and others:
+            with_history = [other for other in others
+                            if any(shared_seasons(head, other, season - 1) for head in head_coaches)]
+            head_share = len(with_history) / len(others)
+        else:
+            head_share = math.nan
+        rows[(team, season)] = {
+            'Staff Size': len(staff),
+            'Returning Staff': len(staff & previous) if previous else math.nan,
+            'Retention': len(staff & previous) / len(previous) if previous else math.nan,
+            'Head Coach': ' / '.join(sorted(head_coaches)) if head_coaches else None,
+            'Share With Head Coach History': head_share,
+            'Mean Pairwise Shared Seasons': (sum(shared_seasons(a, b, season) for a, b in pairs) / len(pairs)
+                                             if pairs else math.nan),
+        }
+    return rows
+
+
+def same_value(actual, expected):
+    if isinstance(expected, float) and math.isnan(expected):
+        return actual != actual
+    if isinstance(expected, float):
+        return math.isclose(actual, expected)
+    return actual == expected or (expected is None and actual != actual)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_metrics_match_brute_force(seed, make_jobs):
+    jobs = make_jobs(seed=seed)
+    metrics = compute_staff_metrics(jobs)
+    expected = brute_force_metrics(jobs)
+
+    assert list(metrics.columns) == METRIC_COLUMNS
+    assert list(zip(metrics['Team'], metrics['Season'])) == sorted(expected)
+    for row in metrics.to_dict('records'):
+        expected_row = expected[(row['Team'], row['Season'])]
+        for column, expected_value in expected_row.items():
+            assert same_value(row[column], expected_value), (row['Team'], row['Season'], column, row[column], expected_value)
@@ -0,0 +1,58 @@
+"""Sparse program-to-program flows (team_flow.compute_team_flows, flow_matrix) against a per-coach brute force"""
+from collections import Counter
+
+import pytest
+
+from basic_graph_generation import parse_seasons
+from team_flow import FLOW_COLUMNS, compute_team_flows, flow_matrix
+
+
+def brute_force_flows(jobs):
+    teams_by_season = {}
+    for team, name, seasons in jobs[['Team', 'Name', 'Seasons at Position']].itertuples(index=False):
+        for season in parse_seasons(seasons):
+            teams_by_season.setdefault(name, {}).setdefault(season, set()).add(team)
+
+    moves = Counter()
+    for seasons in teams_by_season.values():
+        listed = sorted(seasons)
+        for season, next_season in zip(listed, listed[1:]):
+            current, following = seasons[season], seasons[next_season]
+            for from_team in current - following:
+                for to_team in following - current:
+                    moves[(from_team, to_team, next_season)] += 1
+    return moves
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_flows_match_brute_force(seed, make_jobs):
+    jobs = make_jobs(seed=seed)
+    flows = compute_team_flows(jobs)
+
+    assert list(flows.columns) == FLOW_COLUMNS
+    actual = {(row['From Team'], row['To Team'], row['Season']): row['Coaches'] for row in flows.to_dict('records')}
+    assert actual == dict(brute_force_flows(jobs))
+    assert list(flows['Season']) == sorted(flows['Season'])
+
+
+def test_seasons_out_of_the_data_date_the_move_by_the_return_season(make_jobs):
+    jobs = make_jobs().iloc[:0]
+    jobs.loc[0] = [2010, 'Team 0', 'Coach 0', 'Head Coach', '[2010, 2011]']
+    jobs.loc[1] = [2014, 'Team 1', 'Coach 0', 'Head Coach', '[2014]']
+    flows = compute_team_flows(jobs)
+    assert flows.to_dict('records') == [{'From Team': 'Team 0', 'To Team': 'Team 1', 'Season': 2014, 'Coaches': 1}]
+
+
+def test_flow_matrix_sums_the_window(make_jobs):
+    flows = compute_team_flows(make_jobs(seed=1))
+    matrix = flow_matrix(flows, 2013, 2016)
+
+    window = flows[flows['Season'].between(2013, 2016)]
+    assert list(matrix.index) == list(matrix.columns)
+    assert matrix.to_numpy().sum() == window['Coaches'].sum()
+    for (from_team, to_team), coaches in window.groupby(['From Team', 'To Team'])['Coaches'].sum().items():
+        assert matrix.loc[from_team, to_team] == coaches
+
+    top = flow_matrix(flows, 2013, 2016, top_teams=3)
+    volume = matrix.sum(axis=0) + matrix.sum(axis=1)
+    assert list(top.index) == list(top.columns) == list(volume.sort_values(ascending=False, kind='stable').index[:3])
@@ -0,0 +1,70 @@
+"""Interval index over job tenures (tenure_index.IntervalTree, TenureIndex) against scans of the jobs table"""
+import random
+
+import pytest
+
+from basic_graph_generation import parse_seasons
+from staff_roster import build_staff_roster
+from tenure_index import IntervalTree, TenureIndex, season_runs
+
+
+def test_season_runs():
+    assert season_runs([2023, 2019, 2020, 2020]) == [(2019, 2020), (2023, 2023)]
+    assert season_runs([]) == []
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_interval_tree_matches_scan(seed):
+    rng = random.Random(seed)
+    intervals = []
+    for item in range(200):
+        start = rng.randint(1990, 2025)
+        intervals.append((start, start + rng.randint(0, 8), item))
+    tree = IntervalTree(intervals)
+
+    for _ in range(100):
+        low = rng.randint(1985, 2030)
+        high = low + rng.randint(0, 6)
+        assert sorted(tree.overlapping(low, high)) == [item for start, end, item in intervals if start <= high and low <= end]
+        assert sorted(tree.stab(low)) == [item for start, end, item in intervals if start <= low <= end]
+
+
+def test_empty_interval_tree():
+    assert IntervalTree([]).overlapping(2000, 2020) == []
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_staff_matches_roster(seed, make_jobs):
+    jobs = make_jobs(seed=seed)
+    index = TenureIndex(jobs)
+    roster = build_staff_roster(jobs)
+
+    for (team, season), staff in roster.items():
+        assert index.staff(team, season) == staff
+    assert index.staff('Team 0', 1900) == []
+    assert index.at('Unknown Team', 2015) == []
+
+
+@pytest.mark.parametrize('seed', range(3))
+@pytest.mark.parametrize('window', [(None, None), (2013, 2016), (2018, 2018)])
+def test_colleagues_match_scan(seed, window, make_jobs):
+    jobs = make_jobs(seed=seed)
+    index = TenureIndex(jobs)
+    start_year, end_year = window
+
+    seasons_by_job = {}
+    for team, name, seasons in jobs[['Team', 'Name', 'Seasons at Position']].itertuples(index=False):
+        seasons_by_job.setdefault((name, team), set()).update(
+            season for season in parse_seasons(seasons)
+            if (start_year is None or season >= start_year) and (end_year is None or season <= end_year))
+
+    for coach in jobs['Name'].unique():
+        expected = []
+        for (colleague, team), seasons in seasons_by_job.items():
+            shared = seasons & seasons_by_job.get((coach, team), set())
+            if colleague != coach and shared:
+                expected.append((colleague, team, min(shared), max(shared), len(shared)))
+        expected.sort(key=lambda row: (-row[4], row[0], row[1]))
+        assert index.colleagues(coach, start_year, end_year) == expected
+
+    assert index.colleagues('Unknown Coach') == []